@@ -0,0 +1,164 @@
+"""
+In-memory audio decoding for Stash API.
+Pipes a remote media stream through one ffmpeg decode straight to 16 kHz mono PCM,
+so recognition never touches /tmp.
+"""
+
+import http.cookiejar
+import io
+import logging
+import subprocess
+import threading
+import time
+import wave
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Shazam's signature generator works on 16 kHz mono signed 16-bit samples
+SAMPLE_RATE = 16000
+CHANNELS = 1
+SAMPLE_WIDTH = 2
+BYTES_PER_SECOND = SAMPLE_RATE * SAMPLE_WIDTH * CHANNELS
+
+# Protocols ffmpeg can read directly (DASH fragments / f4m / ism need yt_dlp's downloader)
+PIPEABLE_PROTOCOLS = {"http", "https", "m3u8", "m3u8_native"}
+
+
+def ffmpeg_cookies(cookies: Iterable[http.cookiejar.Cookie]) -> str:
+    """Cookies in ffmpeg's -cookies format: one Set-Cookie style line per cookie (as yt_dlp's FFmpegFD builds it).
+
+    ffmpeg reads each line as a single cookie and skips lines without a domain, so
+    yt_dlp's "a=1; b=2" info["cookies"] string would only send its first cookie.
+    """
+    return "".join(f"{c.name}={c.value}; path={c.path}; domain={c.domain};\r\n" for c in cookies)
+
+
+def select_stream(info: dict, cookiejar: Optional[http.cookiejar.CookieJar] = None) -> Optional[tuple[str, dict, str]]:
+    """Pick a directly readable audio stream from yt_dlp info.
+
+    `cookiejar` is the extracting YoutubeDL's jar (read it before the instance is reused).
+    Returns (media_url, http_headers, ffmpeg cookies) or None if nothing can be piped.
+    """
+    candidates = info.get("requested_formats") or [info]
+    for fmt in candidates:
+        if fmt.get("acodec") == "none":
+            continue
+        if fmt.get("protocol", "https") not in PIPEABLE_PROTOCOLS or not fmt.get("url"):
+            continue
+        cookies = ffmpeg_cookies(cookiejar.get_cookies_for_url(fmt["url"])) if cookiejar is not None else ""
+        return fmt["url"], fmt.get("http_headers") or info.get("http_headers") or {}, cookies
+    return None
+
+
+def decode_stream_to_pcm(
+    media_url: str,
+    headers: Optional[dict] = None,
+    cookies: str = "",
+    start: float = 0,
+    duration: float = 15,
+    timeout: float = 30,
+    cancel: Optional[threading.Event] = None,
+) -> Optional[bytes]:
+    """Decode [start, start + duration) of a remote stream to raw s16le PCM in memory.
+
+    Setting `cancel` kills the ffmpeg process (used when a racing download already won).
+    """
+    cmd = ["ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error"]
+    if headers:
+        cmd += ["-headers", "".join(f"{k}: {v}\r\n" for k, v in headers.items())]
+    if cookies:
+        cmd += ["-cookies", cookies]
+    if start:
+        cmd += ["-ss", str(start)]
+    cmd += [
+        "-t", str(duration),
+        "-i", media_url,
+        "-vn", "-ac", str(CHANNELS), "-ar", str(SAMPLE_RATE),
+        "-f", "s16le", "pipe:1",
+    ]
+
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        logger.warning("Stream decode failed: %s", e)
+        return None
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            # Short polls so a cancel or timeout can interrupt; retrying communicate() loses no output
+            stdout, stderr = proc.communicate(timeout=0.25 if cancel else max(deadline - time.monotonic(), 0.01))
+            break
+        except subprocess.TimeoutExpired:
+            if (cancel and cancel.is_set()) or time.monotonic() >= deadline:
+                proc.kill()
+                proc.communicate()
+                logger.debug("Stream decode %s", "cancelled" if cancel and cancel.is_set() else "timed out")
+                return None
+
+    if proc.returncode != 0 or not stdout:
+        logger.warning("Stream decode failed (exit %s): %s", proc.returncode, stderr.decode(errors="ignore")[-300:])
+        return None
+
+    logger.debug("Decoded %.1fs of audio in memory", len(stdout) / BYTES_PER_SECOND)
+    return stdout
+
+
+def pcm_to_wav(pcm: bytes) -> bytes:
+    """Wrap raw PCM in a WAV header (no re-encode) so Shazam can read it from bytes."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(CHANNELS)
+        wav.setsampwidth(SAMPLE_WIDTH)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(pcm)
+    return buf.getvalue()
+
+
+class StreamSource:
+    """A resolved remote audio stream, decoded into an in-memory PCM buffer window by window."""
+
+    def __init__(self, media_url: str, headers: Optional[dict] = None, cookies: str = "") -> None:
+        self.media_url = media_url
+        self.headers = headers or {}
+        self.cookies = cookies
+        self.pcm = b""
+        self.exhausted = False
+
+    @property
+    def seconds(self) -> float:
+        return len(self.pcm) / BYTES_PER_SECOND
+
+    def pending(self, end: float) -> Optional[tuple[float, float]]:
+        """(start, duration) still to decode to reach `end` seconds, or None if there is nothing left to read."""
+        start = self.seconds
+        if self.exhausted or end <= start:
+            return None
+        return start, end - start
+
+    def append(self, chunk: Optional[bytes], duration: float) -> bool:
+        """Add a decoded window of `duration` seconds. Returns False if nothing new was read."""
+        if not chunk:
+            self.exhausted = True
+            return False
+
+        self.pcm += chunk
+        # A short read means the media ended before the window did
+        if len(chunk) < duration * BYTES_PER_SECOND * 0.9:
+            self.exhausted = True
+        return True
+
+    def extend(self, end: float, cancel: Optional[threading.Event] = None) -> bool:
+        """Decode audio from the end of the buffer up to `end` seconds. Returns False if nothing new was read."""
+        window = self.pending(end)
+        if window is None:
+            return False
+        start, duration = window
+        chunk = decode_stream_to_pcm(
+            self.media_url, self.headers, self.cookies, start=start, duration=duration, cancel=cancel,
+        )
+        return self.append(chunk, duration)
+
+    def wav(self) -> bytes:
+        return pcm_to_wav(self.pcm)
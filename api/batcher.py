@@ -0,0 +1,106 @@
+"""
+Micro-batching for Stash API.
+Collects individual async lookups for a short window and resolves them with one batched call.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Generic, List, Optional, Sequence, Set, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Groups `submit()` calls into batches of up to `max_batch` items.
+
+    A batch is flushed when it is full or `max_wait` seconds after its first
+    item arrived. `batch_fn` receives the items and returns one result per
+    item; a None result (or a failed batch) falls back to `item_fn` for
+    those items only.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[T]], Awaitable[Sequence[Optional[R]]]],
+        item_fn: Callable[[T], Awaitable[R]],
+        max_batch: int = 20,
+        max_wait: float = 0.05,
+        name: str = "batcher",
+    ) -> None:
+        self.batch_fn = batch_fn
+        self.item_fn = item_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.name = name
+        self._pending: List[Tuple[T, "asyncio.Future[R]"]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self.items = 0
+        self.batches = 0
+        self.fallbacks = 0
+
+    async def submit(self, item: T) -> R:
+        if self.max_batch <= 1:
+            return await self.item_fn(item)
+
+        future: "asyncio.Future[R]" = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        self.items += 1
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            # Hold a reference so the batch task isn't garbage collected mid-flight
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[T, "asyncio.Future[R]"]]) -> None:
+        items = [item for item, _ in batch]
+        self.batches += 1
+        try:
+            results: Sequence[Optional[Any]] = await self.batch_fn(items)
+            if len(results) != len(items):
+                raise ValueError(f"expected {len(items)} results, got {len(results)}")
+        except Exception as e:
+            logger.warning("%s batch of %d failed, falling back to single calls: %s", self.name, len(items), e)
+            results = [None] * len(items)
+
+        retries = [(item, future) for (item, future), result in zip(batch, results) if result is None]
+        for (_, future), result in zip(batch, results):
+            if result is not None and not future.done():
+                future.set_result(result)
+        if retries:
+            self.fallbacks += len(retries)
+            await asyncio.gather(*(self._run_single(item, future) for item, future in retries))
+
+    async def _run_single(self, item: T, future: "asyncio.Future[R]") -> None:
+        try:
+            result = await self.item_fn(item)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "pending": len(self._pending),
+            "items": self.items,
+            "batches": self.batches,
+            "fallbacks": self.fallbacks,
+            "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
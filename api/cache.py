@@ -0,0 +1,164 @@
+"""
+In-process caching primitives for Stash API.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+
+def approx_size(value: Any) -> int:
+    """Rough deep size in bytes of plain data (str/bytes/numbers/tuples/lists/dicts)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (tuple, list)):
+        size += sum(approx_size(v) for v in value)
+    elif isinstance(value, dict):
+        size += sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    return size
+
+
+class TTLCache:
+    """LRU cache with per-entry expiry, an optional memory budget and counters.
+
+    Lookups and inserts are O(1): entries live in an OrderedDict ordered by
+    recency, so the least recently used key is always at the front and
+    eviction never scans. Expired entries are dropped when read or when
+    they reach the front. Misses can be cached with a shorter `negative_ttl`.
+    Thread-safe: every operation holds an internal lock.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        name: str = "cache",
+        negative_ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = approx_size,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.name = name
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        # key -> (expires_at, value, size)
+        self._data: "OrderedDict[str, tuple[float, Any, int]]" = OrderedDict()
+        # Caches are shared by the event loop and threadpool endpoints / download workers
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.negative_sets = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting least recently used entries past maxsize / max_bytes."""
+        size = self._sizeof(key) + self._sizeof(value) if self.max_bytes else 0
+        with self._lock:
+            self._set(key, value, ttl, size)
+
+    def _set(self, key: str, value: Any, ttl: Optional[float], size: int) -> None:
+        now = time.monotonic()
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (now + (self.ttl if ttl is None else ttl), value, size)
+        self.bytes += size
+
+        # Opportunistically drop an expired entry sitting at the LRU end (amortized O(1))
+        oldest_key, oldest = next(iter(self._data.items()))
+        if oldest_key != key and oldest[0] <= now:
+            self._remove(oldest_key)
+            self.expirations += 1
+
+        while len(self._data) > self.maxsize or (self.max_bytes and self.bytes > self.max_bytes and len(self._data) > 1):
+            self._remove(next(iter(self._data)))
+            self.evictions += 1
+
+    def set_negative(self, key: str, value: Any) -> None:
+        """Cache a miss ("not found") with the shorter negative TTL."""
+        size = self._sizeof(key) + self._sizeof(value) if self.max_bytes else 0
+        with self._lock:
+            self.negative_sets += 1
+            self._set(key, value, self.negative_ttl, size)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Add to an integer entry, creating it (with `ttl`) if missing. Keeps the original expiry."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._set(key, amount, ttl, self._sizeof(key) + self._sizeof(amount) if self.max_bytes else 0)
+                return amount
+            value = entry[1] + amount
+            self._data[key] = (entry[0], value, entry[2])
+            self._data.move_to_end(key)
+            return value
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._data.pop(key)
+        self.bytes -= size
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    # Awaitable twins of get/set/set_negative/delete, so async code can treat this and a shared
+    # BackendCache alike. In-process lookups never block, so these run inline on the loop.
+    async def aget(self, key: str) -> Optional[Any]:
+        return self.get(key)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.set(key, value, ttl=ttl)
+
+    async def aset_negative(self, key: str, value: Any) -> None:
+        self.set_negative(key, value)
+
+    async def adelete(self, key: str) -> None:
+        self.delete(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Counters for monitoring / debugging."""
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "bytes": self.bytes if self.max_bytes else None,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "negative_sets": self.negative_sets,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
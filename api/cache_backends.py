@@ -0,0 +1,288 @@
+"""
+Pluggable cache / shared-state backends for Stash API.
+Lets several uvicorn workers or serverless instances share cached results:
+
+- MemoryBackend: in-process (default, per worker)
+- SQLiteBackend: on-disk file, survives warm restarts, shared by workers on one host
+- RedisBackend: any Redis-protocol server, shared across hosts
+
+Values must be JSON-serializable (tuples come back as lists).
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+from api.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(ABC):
+    """Key/value store with per-key TTL and an atomic counter."""
+
+    name = "backend"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored value, or None if missing/expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store a value for `ttl` seconds."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove a key if present."""
+
+    @abstractmethod
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Atomically add to an integer counter and return the new value.
+
+        `ttl` is applied only when the counter is created.
+        """
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """In-process backend on top of TTLCache (which does its own locking)."""
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = 100_000, default_ttl: float = 3600) -> None:
+        self._cache = TTLCache(maxsize=maxsize, ttl=default_ttl, name="memory-backend")
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._cache.set(key, value, ttl=ttl)
+
+    def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        return self._cache.incr(key, amount, ttl=ttl)
+
+
+class SQLiteBackend(CacheBackend):
+    """On-disk backend. WAL mode lets several worker processes share one file."""
+
+    name = "sqlite"
+
+    # Purge expired rows every N writes instead of on every write
+    PURGE_EVERY = 500
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=1.0, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._writes = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, separators=(",", ":")), time.time() + ttl),
+            )
+            self._maybe_purge()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so read-modify-write is atomic across processes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row:
+                    value, expires_at = int(json.loads(row[0])) + amount, row[1]
+                else:
+                    value, expires_at = amount, now + (ttl if ttl is not None else 3600)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), expires_at),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._maybe_purge()
+        return value
+
+    def _maybe_purge(self) -> None:
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisBackend(CacheBackend):
+    """Redis-protocol backend (Redis, Valkey, KeyDB, Dragonfly or a local stand-in)."""
+
+    name = "redis"
+
+    def __init__(self, url: str, socket_timeout: float = 0.5) -> None:
+        import redis  # Imported lazily: only needed when CACHE_BACKEND=redis
+
+        self.url = url
+        self._client = redis.Redis.from_url(url, socket_timeout=socket_timeout, socket_connect_timeout=socket_timeout)
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._client.set(key, json.dumps(value, separators=(",", ":")), px=max(1, int(ttl * 1000)))
+
+    def delete(self, key: str) -> None:
+        self._client.delete(key)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        pipe = self._client.pipeline(transaction=True)
+        # SET NX creates the counter with its TTL only if it doesn't exist yet
+        pipe.set(key, 0, px=max(1, int((ttl if ttl is not None else 3600) * 1000)), nx=True)
+        pipe.incrby(key, amount)
+        return int(pipe.execute()[1])
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def create_backend(kind: str, sqlite_path: str = "", redis_url: str = "") -> CacheBackend:
+    """Build the configured backend. Falls back to memory if the shared one can't be opened."""
+    kind = kind.lower()
+    try:
+        if kind == "sqlite":
+            return SQLiteBackend(sqlite_path)
+        if kind == "redis":
+            return RedisBackend(redis_url)
+    except Exception as e:
+        logger.error("Cache backend '%s' unavailable (%s). Falling back to in-memory cache.", kind, e)
+        return MemoryBackend()
+    if kind != "memory":
+        logger.warning("Unknown CACHE_BACKEND '%s'. Using in-memory cache.", kind)
+    return MemoryBackend()
+
+
+def make_cache(
+    backend: CacheBackend,
+    name: str,
+    maxsize: int,
+    ttl: float,
+    negative_ttl: Optional[float] = None,
+    max_bytes: Optional[int] = None,
+) -> "TTLCache | BackendCache":
+    """Per-worker TTLCache for the memory backend, otherwise a namespace on the shared backend.
+
+    Both are safe to use from the event loop and worker threads at once.
+    """
+    if isinstance(backend, MemoryBackend):
+        return TTLCache(maxsize=maxsize, ttl=ttl, name=name, negative_ttl=negative_ttl, max_bytes=max_bytes)
+    return BackendCache(backend, name=name, ttl=ttl, negative_ttl=negative_ttl)
+
+
+class BackendCache:
+    """TTLCache-compatible view of one namespace on a shared backend.
+
+    Backend errors are logged and treated as misses so a cache outage never
+    fails a request.
+    """
+
+    def __init__(self, backend: CacheBackend, name: str, ttl: float, negative_ttl: Optional[float] = None) -> None:
+        self.backend = backend
+        self.name = name
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.negative_sets = 0
+
+    def _key(self, key: str) -> str:
+        return f"stash:{self.name}:{key}"
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            value = self.backend.get(self._key(key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Cache %s read failed: %s", self.name, e)
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        try:
+            self.backend.set(self._key(key), value, self.ttl if ttl is None else ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Cache %s write failed: %s", self.name, e)
+
+    def set_negative(self, key: str, value: Any) -> None:
+        self.negative_sets += 1
+        self.set(key, value, ttl=self.negative_ttl)
+
+    def delete(self, key: str) -> None:
+        try:
+            self.backend.delete(self._key(key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Cache %s delete failed: %s", self.name, e)
+
+    # SPEED: Redis round trips and SQLite reads/writes block, so async callers run them in a
+    # thread instead of stalling the event loop (and every other request) behind them.
+    async def aget(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    async def aset_negative(self, key: str, value: Any) -> None:
+        await asyncio.to_thread(self.set_negative, key, value)
+
+    async def adelete(self, key: str) -> None:
+        await asyncio.to_thread(self.delete, key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "negative_sets": self.negative_sets,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
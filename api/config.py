@@ -26,6 +26,10 @@ def _load_env_bool(key: str, default: bool = False) -> bool:
     return os.getenv(key, str(default)).lower() == "true"
 
 
+def _load_env_int_list(key: str, default: str = "") -> List[int]:
+    return [int(part) for part in os.getenv(key, default).split(",") if part.strip()]
+
+
 def _load_numbered_cookies(base_name: str, extra_names: List[str] | None = None) -> List[str]:
     """Load cookie values from env vars: BASE_NAME, then BASE_NAME_1, BASE_NAME_2, etc."""
     cookies: List[str] = []
@@ -71,16 +75,109 @@ class Settings:
 
         # Rate Limiting
         self.RATE_LIMIT_PER_DAY: int = _load_env_int("RATE_LIMIT_PER_DAY", 10)
+        self.RATE_LIMIT_WINDOW: int = _load_env_int("RATE_LIMIT_WINDOW", 86400)
+        self.RATE_LIMIT_SWEEP_INTERVAL: int = _load_env_int("RATE_LIMIT_SWEEP_INTERVAL", 300)
+
+        # Batch Recognition: max URLs per /recognize_batch call and how many run at once
+        self.RECOGNIZE_BATCH_MAX: int = _load_env_int("RECOGNIZE_BATCH_MAX", 50)
+        self.RECOGNIZE_BATCH_CONCURRENCY: int = _load_env_int("RECOGNIZE_BATCH_CONCURRENCY", 4)
+
+        # Batch Save: max track IDs per /save_tracks call
+        self.SAVE_TRACKS_MAX: int = _load_env_int("SAVE_TRACKS_MAX", 500)
+
+        # Recognition Jobs: POST /recognize/jobs + GET /recognize/jobs/{id}; store is "memory" or "sqlite"
+        self.JOB_STORE: str = _load_env_str("JOB_STORE", "memory")
+        self.JOB_SQLITE_PATH: str = _load_env_str("JOB_SQLITE_PATH", "/tmp/stash_jobs.sqlite3")
+        self.JOB_WORKERS: int = _load_env_int("JOB_WORKERS", 4)
+        self.JOB_QUEUE_SIZE: int = _load_env_int("JOB_QUEUE_SIZE", 100)
+        self.JOB_TTL: int = _load_env_int("JOB_TTL", 3600)
+
+        # Cache Backend: "memory" (per worker), "sqlite" (on-disk, shared per host) or "redis" (shared)
+        self.CACHE_BACKEND: str = _load_env_str("CACHE_BACKEND", "memory")
+        self.CACHE_SQLITE_PATH: str = _load_env_str("CACHE_SQLITE_PATH", "/tmp/stash_cache.sqlite3")
+        self.CACHE_REDIS_URL: str = _load_env_str("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+        # Recognition Cache (keyed by canonical media ID)
+        self.RECOGNITION_CACHE_SIZE: int = _load_env_int("RECOGNITION_CACHE_SIZE", 5000)
+        self.RECOGNITION_CACHE_TTL: int = _load_env_int("RECOGNITION_CACHE_TTL", 21600)  # 6 hours
+        self.RECOGNITION_NEGATIVE_TTL: int = _load_env_int("RECOGNITION_NEGATIVE_TTL", 600)  # "no match"
+        self.RECOGNITION_FAILURE_TTL: int = _load_env_int("RECOGNITION_FAILURE_TTL", 60)  # download failed
+
+        # Spotify Search Cache
+        self.SPOTIFY_CACHE_SIZE: int = _load_env_int("SPOTIFY_CACHE_SIZE", 10000)
+        self.SPOTIFY_CACHE_TTL: int = _load_env_int("SPOTIFY_CACHE_TTL", 3600)  # 1 hour
+        self.SPOTIFY_NEGATIVE_TTL: int = _load_env_int("SPOTIFY_NEGATIVE_TTL", 300)  # "Not found on Spotify"
+        self.SPOTIFY_CACHE_MAX_BYTES: int = _load_env_int("SPOTIFY_CACHE_MAX_BYTES", 16 * 1024 * 1024)
 
         # API Keys
         self.GEMINI_API_KEY: str = _load_env_str("GEMINI_API_KEY")
         self.SPOTIFY_CLIENT_ID: str = _load_env_str("SPOTIFY_CLIENT_ID")
         self.SPOTIFY_CLIENT_SECRET: str = _load_env_str("SPOTIFY_CLIENT_SECRET")
 
+        # Upstream Endpoints (only overridden to point at local stand-ins, e.g. scripts/bench_load.py)
+        self.SPOTIFY_API_URL: str = _load_env_str("SPOTIFY_API_URL", "https://api.spotify.com/v1")
+        self.SPOTIFY_TOKEN_URL: str = _load_env_str("SPOTIFY_TOKEN_URL", "https://accounts.spotify.com/api/token")
+        self.GEMINI_API_URL: str = _load_env_str("GEMINI_API_URL", "https://generativelanguage.googleapis.com/v1beta")
+        self.SHAZAM_API_URL: str = _load_env_str("SHAZAM_API_URL")  # empty = shazamio's own hosts
+
         # Feature Flags
         self.ENABLE_GENRE_DETECTION: bool = _load_env_bool("ENABLE_GENRE_DETECTION", True)
         self.ENABLE_DEBUG_LOGS: bool = _load_env_bool("ENABLE_DEBUG_LOGS", False)
 
+        # Request Profiling: /recognize with header X-Stash-Profile: <PROFILING_TOKEN> writes a folded-stack profile
+        self.PROFILING_ENABLED: bool = _load_env_bool("PROFILING_ENABLED", False)
+        self.PROFILING_TOKEN: str = _load_env_str("PROFILING_TOKEN")
+        self.PROFILING_DIR: str = _load_env_str("PROFILING_DIR", "/tmp/stash_profiles")
+        self.PROFILING_INTERVAL_MS: int = _load_env_int("PROFILING_INTERVAL_MS", 5)
+
+        # Genre Cache (keyed by Spotify track ID and normalized track|artist; genres don't change)
+        self.GENRE_CACHE_SIZE: int = _load_env_int("GENRE_CACHE_SIZE", 20000)
+        self.GENRE_CACHE_TTL: int = _load_env_int("GENRE_CACHE_TTL", 30 * 86400)
+        self.GENRE_FAILURE_TTL: int = _load_env_int("GENRE_FAILURE_TTL", 300)  # Gemini errors
+        # Deferred Genre Enrichment: non-smart_sort saves return before the genre is known (poll /track_genre)
+        self.DEFER_GENRE_ENRICHMENT: bool = _load_env_bool("DEFER_GENRE_ENRICHMENT", False)
+        self.GENRE_ENRICHMENT_CONCURRENCY: int = _load_env_int("GENRE_ENRICHMENT_CONCURRENCY", 4)
+        self.GENRE_ENRICHMENT_QUEUE_SIZE: int = _load_env_int("GENRE_ENRICHMENT_QUEUE_SIZE", 1000)
+
+        # Spotify Artist Genres (tags per artist ID, tried before Gemini)
+        self.ARTIST_GENRE_CACHE_SIZE: int = _load_env_int("ARTIST_GENRE_CACHE_SIZE", 50000)
+        self.ARTIST_GENRE_CACHE_TTL: int = _load_env_int("ARTIST_GENRE_CACHE_TTL", 7 * 86400)
+        # Gemini Micro-batching: classify up to N songs per request, waiting at most this long to fill a batch
+        self.GENRE_BATCH_SIZE: int = _load_env_int("GENRE_BATCH_SIZE", 20)
+        self.GENRE_BATCH_WAIT_MS: int = _load_env_int("GENRE_BATCH_WAIT_MS", 50)
+
+        # Smart Sort Playlist Index (per user: Stash playlist name -> ID)
+        self.PLAYLIST_INDEX_CACHE_SIZE: int = _load_env_int("PLAYLIST_INDEX_CACHE_SIZE", 10000)
+        self.PLAYLIST_INDEX_TTL: int = _load_env_int("PLAYLIST_INDEX_TTL", 600)
+
+        # Audio Pipeline: decode the media stream to PCM in memory instead of writing mp3s to /tmp
+        self.STREAM_AUDIO: bool = _load_env_bool("STREAM_AUDIO", True)
+        # Progressive recognition: fingerprint 0-5s first, only decode further when Shazam finds nothing
+        self.RECOGNITION_WINDOWS: List[int] = sorted(_load_env_int_list("RECOGNITION_WINDOWS", "5,10,15,30")) or [15]
+
+        # Download Pool: dedicated bounded executor for yt_dlp + ffmpeg (503 + Retry-After when full)
+        self.DOWNLOAD_WORKERS: int = _load_env_int("DOWNLOAD_WORKERS", 4)
+        self.DOWNLOAD_QUEUE_SIZE: int = _load_env_int("DOWNLOAD_QUEUE_SIZE", 16)
+        self.DOWNLOAD_USE_PROCESSES: bool = _load_env_bool("DOWNLOAD_USE_PROCESSES", False)
+
+        # Warmed YoutubeDL instances kept idle per option profile
+        self.YTDLP_POOL_SIZE: int = _load_env_int("YTDLP_POOL_SIZE", self.DOWNLOAD_WORKERS)
+
+        # Download Hedging: race cookieless and cookie downloads on platforms where cookies often win
+        self.DOWNLOAD_HEDGE_ENABLED: bool = _load_env_bool("DOWNLOAD_HEDGE_ENABLED", True)
+        self.DOWNLOAD_HEDGE_DELAY_MS: int = _load_env_int("DOWNLOAD_HEDGE_DELAY_MS", 750)
+        self.DOWNLOAD_HEDGE_MIN_COOKIE_WIN_PCT: int = _load_env_int("DOWNLOAD_HEDGE_MIN_COOKIE_WIN_PCT", 15)
+        self.DOWNLOAD_HEDGE_WORKERS: int = _load_env_int("DOWNLOAD_HEDGE_WORKERS", 2 * self.DOWNLOAD_WORKERS)
+
+        # Shazam Client: one pooled keepalive session shared by all recognitions
+        self.SHAZAM_CONNECTION_LIMIT: int = _load_env_int("SHAZAM_CONNECTION_LIMIT", 20)
+        self.SHAZAM_TIMEOUT: int = _load_env_int("SHAZAM_TIMEOUT", 15)  # seconds per call
+        self.SHAZAM_KEEPALIVE: int = _load_env_int("SHAZAM_KEEPALIVE", 60)
+
+        # Spotify App Client: async, pooled session for search/track lookups
+        self.SPOTIFY_CONNECTION_LIMIT: int = _load_env_int("SPOTIFY_CONNECTION_LIMIT", 20)
+        self.SPOTIFY_TIMEOUT: int = _load_env_int("SPOTIFY_TIMEOUT", 10)  # seconds per call
+
         # Environment
         self.ENVIRONMENT: str = _load_env_str("ENVIRONMENT", "production")
 
@@ -0,0 +1,126 @@
+"""
+Bounded worker pools for blocking media work (yt_dlp + ffmpeg).
+Keeps downloads off the default executor and rejects work early when the queue is full.
+"""
+
+import asyncio
+import contextvars
+import math
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class QueueFullError(Exception):
+    """Raised when a BoundedExecutor is at capacity. `retry_after` is a hint in seconds."""
+
+    def __init__(self, name: str, retry_after: int) -> None:
+        super().__init__(f"{name} queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _timed_call(fn: Callable[..., Any], *args: Any) -> tuple[float, Any]:
+    # Module-level so it can be pickled for process pools; wall clock is comparable across processes
+    return time.time(), fn(*args)
+
+
+class BoundedExecutor:
+    """Fixed-size thread or process pool with a bounded queue and wait-time accounting.
+
+    Accounting happens on the event loop thread, so counters need no locking.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue: int,
+        use_processes: bool = False,
+        name: str = "executor",
+        on_complete: Optional[Callable[[float, float], None]] = None,
+        initializer: Optional[Callable[..., None]] = None,
+        initargs: tuple = (),
+    ) -> None:
+        self.name = name
+        # Called with (wait, run) seconds for every finished job, e.g. to feed metrics
+        self.on_complete = on_complete
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self._pool: Executor
+        if use_processes:
+            # spawn: forked children would inherit the parent's (dead) thread pools
+            # initializer(*initargs) runs once per worker process (e.g. to hand it process-shared objects)
+            self._pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initializer,
+                initargs=initargs,
+            )
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"stash-{name}")
+
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+        self.total_run = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.max_workers)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn(*args) in the pool. Raises QueueFullError instead of queueing past max_queue."""
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(self.name, self.retry_after())
+
+        self.in_flight += 1
+        submitted_at = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            if self.use_processes:
+                started_at, result = await loop.run_in_executor(self._pool, _timed_call, fn, *args)
+            else:
+                # Threads run in a copy of the caller's context, so contextvars (e.g. progress reporting) carry over
+                context = contextvars.copy_context()
+                started_at, result = await loop.run_in_executor(self._pool, context.run, _timed_call, fn, *args)
+        finally:
+            self.in_flight -= 1
+
+        wait = max(0.0, started_at - submitted_at)
+        self.completed += 1
+        self.last_wait = wait
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        run = time.time() - started_at
+        self.total_run += run
+        if self.on_complete:
+            self.on_complete(wait, run)
+        return result
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely free, from the average job duration."""
+        avg_run = self.total_run / self.completed if self.completed else 10.0
+        return max(1, min(60, math.ceil(avg_run * (self.queue_depth + 1) / self.max_workers)))
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "mode": "process" if self.use_processes else "thread",
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / self.completed * 1000, 1) if self.completed else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "last_wait_ms": round(self.last_wait * 1000, 1),
+        }
@@ -0,0 +1,106 @@
+"""
+Spotify genre tag -> Stash playlist genre mapping.
+Spotify artists carry fine-grained tags ("melodic techno", "uk drill", "indie pop");
+smart sort files tracks into one coarse "Stash: <Genre>" playlist per genre.
+"""
+
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+# Whole tags that the keyword rules below would misfile
+TAG_OVERRIDES = {
+    "electropop": "Pop",
+    "dance pop": "Pop",
+    "synthpop": "Pop",
+    "pop punk": "Punk",
+    "pop rock": "Rock",
+    "country rock": "Country",
+    "folk rock": "Folk",
+    "trap latino": "Reggaeton",
+    # One-word spellings (as the Gemini fallback answers) of tags the rules match with a space/dash
+    "hiphop": "Hip-Hop",
+    "hip-hop": "Hip-Hop",
+    "rnb": "R&B",
+    "kpop": "K-Pop",
+    "drum & bass": "DnB",
+}
+
+# (keyword, genre), most specific first: a tag takes the first rule whose keyword it contains
+GENRE_RULES = (
+    ("drum and bass", "DnB"),
+    ("dnb", "DnB"),
+    ("jungle", "DnB"),
+    ("dubstep", "Dubstep"),
+    ("trance", "Trance"),
+    ("techno", "Techno"),
+    ("house", "House"),
+    ("ambient", "Ambient"),
+    ("lo-fi", "LoFi"),
+    ("lofi", "LoFi"),
+    ("k-pop", "K-Pop"),
+    ("hip hop", "Hip-Hop"),
+    ("rap", "Hip-Hop"),
+    ("trap", "Hip-Hop"),
+    ("drill", "Hip-Hop"),
+    ("grime", "Hip-Hop"),
+    ("r&b", "R&B"),
+    ("soul", "Soul"),
+    ("funk", "Funk"),
+    ("disco", "Disco"),
+    ("reggaeton", "Reggaeton"),
+    ("afrobeat", "Afrobeats"),
+    ("amapiano", "Afrobeats"),
+    ("latin", "Latin"),
+    ("metal", "Metal"),
+    ("punk", "Punk"),
+    ("indie", "Indie"),
+    ("rock", "Rock"),
+    ("jazz", "Jazz"),
+    ("blues", "Blues"),
+    ("classical", "Classical"),
+    ("country", "Country"),
+    ("folk", "Folk"),
+    ("reggae", "Reggae"),
+    ("edm", "Electronic"),
+    ("electro", "Electronic"),
+    ("pop", "Pop"),
+)
+
+# Genre -> rank of its first rule, for tie-breaking
+_PRIORITY: Dict[str, int] = {}
+for _keyword, _genre in GENRE_RULES:
+    _PRIORITY.setdefault(_genre, len(_PRIORITY))
+
+
+def map_genre_tag(tag: str) -> Optional[str]:
+    """Stash genre for one Spotify tag, or None if the taxonomy doesn't cover it."""
+    tag = tag.lower().strip()
+    if tag in TAG_OVERRIDES:
+        return TAG_OVERRIDES[tag]
+    for keyword, genre in GENRE_RULES:
+        if keyword in tag:
+            return genre
+    return None
+
+
+def map_spotify_genres(artist_tags: Iterable[Iterable[str]]) -> Optional[str]:
+    """Pick one Stash genre from each artist's tags (primary artist first).
+
+    Every mapped tag is a vote; the primary artist's votes count double. Ties
+    go to the more specific genre (earlier in GENRE_RULES).
+    """
+    votes: Counter = Counter()
+    for position, tags in enumerate(artist_tags):
+        weight = 2 if position == 0 else 1
+        for tag in tags:
+            genre = map_genre_tag(tag)
+            if genre:
+                votes[genre] += weight
+    if not votes:
+        return None
+    return min(votes, key=lambda genre: (-votes[genre], _PRIORITY.get(genre, len(_PRIORITY))))
+
+
+def track_artist_ids(track: dict) -> List[str]:
+    """Artist IDs from a Spotify track object, primary artist first."""
+    return [artist["id"] for artist in track.get("artists", []) if artist.get("id")]
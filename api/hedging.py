@@ -0,0 +1,64 @@
+"""
+Download hedging statistics for Stash API.
+Tracks, per platform, whether the cookieless or the cookie-authenticated download
+wins, so racing both is only done where it actually pays off.
+"""
+
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+COOKIELESS = "cookieless"
+COOKIES = "cookies"
+FAILED = "failed"
+
+
+class HedgeStats:
+    """Rolling window of download outcomes per platform."""
+
+    def __init__(self, window: int = 50, min_samples: int = 10, min_cookie_win_rate: float = 0.15) -> None:
+        self.window = window
+        self.min_samples = min_samples
+        self.min_cookie_win_rate = min_cookie_win_rate
+        self._outcomes: Dict[str, Deque[str]] = {}
+        # Outcomes not yet drained (bounded: only download worker processes drain them)
+        self._undrained: Deque[Tuple[str, str]] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, platform: str, outcome: str) -> None:
+        with self._lock:
+            self._outcomes.setdefault(platform, deque(maxlen=self.window)).append(outcome)
+            self._undrained.append((platform, outcome))
+
+    def drain(self) -> List[Tuple[str, str]]:
+        """(platform, outcome) pairs recorded since the last drain, to merge() into another process's stats."""
+        with self._lock:
+            outcomes = list(self._undrained)
+            self._undrained.clear()
+        return outcomes
+
+    def merge(self, outcomes: List[Tuple[str, str]]) -> None:
+        for platform, outcome in outcomes:
+            self.record(platform, outcome)
+
+    def should_hedge(self, platform: str) -> bool:
+        """Hedge until we have data, then only where cookies win often enough to matter."""
+        with self._lock:
+            outcomes = list(self._outcomes.get(platform, ()))
+        if len(outcomes) < self.min_samples:
+            return True
+        return outcomes.count(COOKIES) / len(outcomes) >= self.min_cookie_win_rate
+
+    def stats(self) -> dict:
+        with self._lock:
+            snapshot = {platform: list(outcomes) for platform, outcomes in self._outcomes.items()}
+        return {
+            platform: {
+                "samples": len(outcomes),
+                COOKIELESS: outcomes.count(COOKIELESS),
+                COOKIES: outcomes.count(COOKIES),
+                FAILED: outcomes.count(FAILED),
+                "hedging": self.should_hedge(platform),
+            }
+            for platform, outcomes in snapshot.items()
+        }
@@ -0,0 +1,59 @@
+"""
+App-scoped pooled HTTP sessions for Stash API.
+One aiohttp session per upstream keeps TLS connections alive between requests.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class PooledSession:
+    """Lazily created aiohttp session with a bounded keepalive connection pool.
+
+    Started/closed by the FastAPI lifespan, but also created on first use so
+    serverless runtimes that skip lifespan events still work. The session is
+    rebuilt if it is used from a different event loop.
+    """
+
+    def __init__(self, name: str, limit: int = 20, timeout: float = 20, keepalive: float = 60) -> None:
+        self.name = name
+        self.limit = limit
+        self.timeout = timeout
+        self.keepalive = keepalive
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def get(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.limit,
+                    keepalive_timeout=self.keepalive,
+                    ttl_dns_cache=300,
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._loop = loop
+            logger.debug("Opened pooled HTTP session for %s (limit=%d)", self.name, self.limit)
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    def stats(self) -> dict:
+        connector = self._session.connector if self._session and not self._session.closed else None
+        return {
+            "name": self.name,
+            "open": connector is not None,
+            "limit": self.limit,
+            "acquired": len(getattr(connector, "_acquired", ())) if connector else 0,
+        }
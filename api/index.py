@@ -1,26 +1,49 @@
 import os
+import re
 import time
 import json
 import glob
 import logging
 import random
+import threading
 from uuid import uuid4
 import asyncio
+import contextvars
+import multiprocessing
+from contextlib import asynccontextmanager, contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from functools import lru_cache
-from typing import Optional
-from collections import defaultdict
+from typing import Iterator, Optional, Union
 
+import anyio
 import requests
 import spotipy
-import yt_dlp
 import shutil
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from spotipy.oauth2 import SpotifyClientCredentials
 from shazamio import Shazam
 
+from api import jobs
+from api.audio import StreamSource, decode_stream_to_pcm, select_stream
+from api.batcher import MicroBatcher
+from api.cache_backends import create_backend, make_cache
 from api.config import settings
+from api.executor import BoundedExecutor, QueueFullError
+from api.genres import map_genre_tag, map_spotify_genres, track_artist_ids
+from api.hedging import COOKIELESS, COOKIES, FAILED, HedgeStats
+from api.http import PooledSession
+from api.media import canonical_media_id, media_platform
+from api.metrics import Registry
+from api.profiling import RequestProfiler, profile_thread
+from api.progress import ProgressHub, report
+from api.ratelimit import SlidingWindowLimiter
+from api.shazam_client import create_shazam
+from api.singleflight import SingleFlight
+from api.spotify_client import AsyncSpotifyClient
+from api.tasks import BackgroundQueue
+from api.ytdl_pool import YoutubeDLPool
 
 # Configure module logger
 logger = logging.getLogger(__name__)
@@ -29,48 +52,192 @@ logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(message)s",
 )
 
-# Helper to get Spotify client (Handles missing credentials gracefully)
-def get_spotify_client() -> Optional[spotipy.Spotify]:
-    """Create a Spotify client using client credentials flow."""
-    if not settings.SPOTIFY_CLIENT_ID or not settings.SPOTIFY_CLIENT_SECRET:
-        return None
-    try:
-        return spotipy.Spotify(auth_manager=SpotifyClientCredentials(
-            client_id=settings.SPOTIFY_CLIENT_ID,
-            client_secret=settings.SPOTIFY_CLIENT_SECRET
-        ))
-    except Exception as e:
-        logger.error("Spotify Client Error: %s", e)
-        return None
+# --- Metrics (Prometheus text format at /metrics; scrape-time gauges are registered next to it) ---
+metrics = Registry()
+STAGE_SECONDS = metrics.histogram(
+    "stash_stage_duration_seconds",
+    "Latency of each pipeline stage (recognize, save_track, gemini).",
+    ["pipeline", "stage"],
+)
+SHAZAM_RETRIES = metrics.counter("stash_shazam_retries_total", "Shazam attempts that failed and were retried.")
+# Label values must come from fixed sets (media_platform(), never a host from the request)
+COOKIE_FALLBACKS = metrics.counter(
+    "stash_cookie_fallbacks_total",
+    "Downloads that needed the cookie-authenticated attempt (sequential retry or hedged race).",
+    ["platform", "mode"],
+)
+
+def _stage_done(pipeline: str, stage: str, started: float) -> float:
+    """Record a stage that began at `started` (perf_counter). Returns now, to chain the next stage."""
+    now = time.perf_counter()
+    STAGE_SECONDS.observe(now - started, pipeline=pipeline, stage=stage)
+    return now
+
+# --- Spotify app client (async: a slow Spotify response must not stall the event loop) ---
+_spotify_session = PooledSession(
+    name="spotify",
+    limit=settings.SPOTIFY_CONNECTION_LIMIT,
+    timeout=settings.SPOTIFY_TIMEOUT,
+)
+spotify_client = AsyncSpotifyClient(
+    client_id=settings.SPOTIFY_CLIENT_ID,
+    client_secret=settings.SPOTIFY_CLIENT_SECRET,
+    session=_spotify_session,
+    api_url=settings.SPOTIFY_API_URL,
+    token_url=settings.SPOTIFY_TOKEN_URL,
+)
 
-sp = get_spotify_client()
+def _user_spotify(token: str) -> spotipy.Spotify:
+    """Spotify client acting as the user (their OAuth token)."""
+    user_sp = spotipy.Spotify(auth=token)
+    user_sp.prefix = settings.SPOTIFY_API_URL.rstrip("/") + "/"
+    return user_sp
 
-# --- Spotify search cache (TTL-based) ---
-_spotify_cache: dict[str, tuple[float, dict]] = {}
-SPOTIFY_CACHE_TTL = 3600  # 1 hour
+# --- Cache / shared-state backend (memory per worker, or SQLite/Redis shared across workers) ---
+_cache_backend = create_backend(
+    settings.CACHE_BACKEND,
+    sqlite_path=settings.CACHE_SQLITE_PATH,
+    redis_url=settings.CACHE_REDIS_URL,
+)
+
+# --- Spotify search cache (bounded LRU + TTL, misses cached with a shorter TTL) ---
+_spotify_cache = make_cache(
+    _cache_backend,
+    maxsize=settings.SPOTIFY_CACHE_SIZE,
+    ttl=settings.SPOTIFY_CACHE_TTL,
+    negative_ttl=settings.SPOTIFY_NEGATIVE_TTL,
+    max_bytes=settings.SPOTIFY_CACHE_MAX_BYTES,
+    name="spotify",
+)
 
-def _get_cached_spotify(track: str, artist: str) -> Optional[dict]:
+# Compact entries: a tuple of payload fields instead of the full dict; () marks "Not found on Spotify"
+_SPOTIFY_FIELDS = ("track", "artist", "album_art", "spotify_uri", "spotify_url", "preview_url")
+
+def _spotify_cache_key(track: str, artist: str) -> str:
+    return f"{track.lower().strip()}|{artist.lower().strip()}"
+
+async def _get_cached_spotify(track: str, artist: str) -> Optional[dict]:
     """Return cached Spotify result if still fresh."""
-    key = f"{track.lower().strip()}|{artist.lower().strip()}"
-    entry = _spotify_cache.get(key)
-    if entry and (time.time() - entry[0]) < SPOTIFY_CACHE_TTL:
-        logger.debug("Spotify cache HIT for %s - %s", track, artist)
-        return entry[1]
-    return None
+    entry = await _spotify_cache.aget(_spotify_cache_key(track, artist))
+    if entry is None:
+        return None
+    logger.debug("Spotify cache HIT for %s - %s", track, artist)
+    if not entry:
+        return {"success": False, "error": "Not found on Spotify"}
+    return {"success": True, **dict(zip(_SPOTIFY_FIELDS, entry)), "confidence": 0.99}
 
-def _set_cached_spotify(track: str, artist: str, result: dict) -> None:
+async def _set_cached_spotify(track: str, artist: str, result: dict) -> None:
     """Store a Spotify result in cache."""
-    key = f"{track.lower().strip()}|{artist.lower().strip()}"
-    _spotify_cache[key] = (time.time(), result)
+    key = _spotify_cache_key(track, artist)
+    if result.get("success"):
+        await _spotify_cache.aset(key, tuple(result.get(field) for field in _SPOTIFY_FIELDS))
+    else:
+        await _spotify_cache.aset_negative(key, ())
+
+# --- Recognition result cache (keyed by canonical media ID) ---
+# Viral reels get pasted by many users; replaying the final payload skips download + Shazam.
+_recognition_cache = make_cache(
+    _cache_backend,
+    maxsize=settings.RECOGNITION_CACHE_SIZE,
+    ttl=settings.RECOGNITION_CACHE_TTL,
+    name="recognition",
+)
 
-    # Evict stale entries if cache grows large
-    if len(_spotify_cache) > 500:
-        now = time.time()
-        stale_keys = [k for k, (ts, _) in _spotify_cache.items() if now - ts > SPOTIFY_CACHE_TTL]
-        for k in stale_keys:
-            del _spotify_cache[k]
+# File fallback (no streaming) fetches one fixed clip instead of progressive windows
+FILE_CLIP_SECONDS = 15
 
-app = FastAPI(title="Stash Engine API v1.1.0")
+DOWNLOAD_FAILED_DETAIL = "Could not download audio. Instagram/TikTok might be blocking the request. Try a different link."
+
+async def _cache_recognition(media_id: str, result: dict) -> dict:
+    """Store a final /recognize payload. Misses and download failures get shorter TTLs."""
+    if result.get("success"):
+        ttl = settings.RECOGNITION_CACHE_TTL
+    elif result.get("status_code"):
+        ttl = settings.RECOGNITION_FAILURE_TTL
+    else:
+        ttl = settings.RECOGNITION_NEGATIVE_TTL
+    await _recognition_cache.aset(media_id, result, ttl=ttl)
+    return result
+
+# Every yt_dlp / ffmpeg run (download attempts, hedged legs, later decode windows) holds a slot, so
+# DOWNLOAD_WORKERS also bounds hedge legs still winding down after their job returned.
+# Process mode shares one semaphore with the workers (handed over by the pool initializer).
+if settings.DOWNLOAD_USE_PROCESSES:
+    _fetch_slots = multiprocessing.get_context("spawn").BoundedSemaphore(settings.DOWNLOAD_WORKERS)
+else:
+    _fetch_slots = threading.BoundedSemaphore(settings.DOWNLOAD_WORKERS)
+
+def _share_fetch_slots(slots) -> None:
+    """Download worker process initializer: count work against the API process's slots."""
+    global _fetch_slots
+    _fetch_slots = slots
+
+@contextmanager
+def _fetch_slot() -> Iterator[None]:
+    _fetch_slots.acquire()
+    try:
+        yield
+    finally:
+        _fetch_slots.release()
+
+# Dedicated pool for yt_dlp + ffmpeg so a burst of downloads can't starve everything else
+_download_executor = BoundedExecutor(
+    max_workers=settings.DOWNLOAD_WORKERS,
+    max_queue=settings.DOWNLOAD_QUEUE_SIZE,
+    use_processes=settings.DOWNLOAD_USE_PROCESSES,
+    name="downloads",
+    on_complete=lambda wait, run: STAGE_SECONDS.observe(wait, pipeline="recognize", stage="queue_wait"),
+    initializer=_share_fetch_slots,
+    initargs=(_fetch_slots,),
+)
+
+# Concurrent /recognize calls for the same reel share one download + Shazam run
+_recognition_flights = SingleFlight(name="recognition")
+
+# Stage events per media ID for /recognize/stream
+_progress = ProgressHub()
+
+# Opt-in profiles of single /recognize calls (event loop tasks + download thread)
+_profiler = RequestProfiler(
+    enabled=settings.PROFILING_ENABLED,
+    token=settings.PROFILING_TOKEN,
+    directory=settings.PROFILING_DIR,
+    interval_ms=settings.PROFILING_INTERVAL_MS,
+)
+
+def _replay_cached_recognition(entry: dict) -> dict:
+    """Return a cached payload, re-raising cached download failures."""
+    if entry.get("status_code"):
+        raise HTTPException(status_code=entry["status_code"], detail=entry["error"])
+    return entry
+
+# --- Shazam client (app-scoped: one keepalive session instead of a TLS handshake per recognition) ---
+_shazam_session = PooledSession(
+    name="shazam",
+    limit=settings.SHAZAM_CONNECTION_LIMIT,
+    timeout=settings.SHAZAM_TIMEOUT,
+    keepalive=settings.SHAZAM_KEEPALIVE,
+)
+shazam_client = create_shazam(_shazam_session, base_url=settings.SHAZAM_API_URL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open pooled upstream sessions on startup and release them (and worker pools) on shutdown."""
+    await _shazam_session.get()
+    await _spotify_session.get()
+    _profiler.install(asyncio.get_running_loop())
+    sweeper = asyncio.create_task(_sweep_rate_limits())
+    yield
+    sweeper.cancel()
+    await _shazam_session.close()
+    await _spotify_session.close()
+    _download_executor.shutdown()
+    await _genre_enrichment.close()
+    await _shutdown_jobs()
+    _job_store.close()
+    _cache_backend.close()
+
+app = FastAPI(title="Stash Engine API v1.1.0", lifespan=lifespan)
 
 # Configure CORS with environment-based origins (SECURE)
 app.add_middleware(
@@ -90,34 +257,150 @@ def health_check():
     return {"status": "Antigravity Engine Online 🟢"}
 
 
-# Rate limiting storage (in-memory for now)
-request_log = defaultdict(list)
+# Rate limiting: sliding window per client IP (shared across workers when the cache backend is)
+recognize_limiter = SlidingWindowLimiter(
+    limit=settings.RATE_LIMIT_PER_DAY,
+    window=settings.RATE_LIMIT_WINDOW,
+    backend=_cache_backend if _cache_backend.name != "memory" else None,
+    name="ratelimit:recognize",
+)
+
+async def _sweep_rate_limits() -> None:
+    """Periodically forget clients that have been idle for a full window."""
+    while True:
+        await asyncio.sleep(settings.RATE_LIMIT_SWEEP_INTERVAL)
+        swept = recognize_limiter.sweep()
+        if swept:
+            logger.debug("Rate limiter swept %d idle clients", swept)
 
-@app.post("/recognize")
-async def recognize_reel(req: ReelRequest, request: Request):
-    # Get client IP for rate limiting
+@app.get("/stats")
+def service_stats() -> dict:
+    """Cache, queue and hedging counters for monitoring."""
+    return {
+        "cache_backend": _cache_backend.name,
+        "rate_limit": recognize_limiter.stats(),
+        "recognition_cache": _recognition_cache.stats(),
+        "spotify_cache": _spotify_cache.stats(),
+        "genre_cache": _genre_cache.stats(),
+        "genre_flights": _genre_flights.stats(),
+        "genre_batches": _genre_batcher.stats(),
+        "artist_genre_cache": _artist_genre_cache.stats(),
+        "artist_batches": _artist_batcher.stats(),
+        "genre_enrichment": _genre_enrichment.stats(),
+        "playlist_index": _playlist_index_cache.stats(),
+        "recognition_flights": _recognition_flights.stats(),
+        "progress": _progress.stats(),
+        "profiling": _profiler.stats(),
+        "job_store": _job_store.name,
+        "job_queue": _job_queue.stats(),
+        "download_queue": _download_executor.stats(),
+        "download_hedging": _hedge_stats.stats(),
+        "ytdl_pool": _ytdl_pool.stats(),
+        "shazam_session": _shazam_session.stats(),
+        "spotify_session": _spotify_session.stats(),
+    }
+
+# --- Scrape-time metrics: read from the same counters /stats exposes ---
+_in_flight_requests = 0
+
+class _InFlightMiddleware:
+    """Counts HTTP requests until their last body chunk is sent, so streaming responses count while they stream.
+
+    Pure ASGI (no BaseHTTPMiddleware request/response wrapping) to keep per-request overhead minimal.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        global _in_flight_requests
+        _in_flight_requests += 1
+        finished = False
+
+        def finish() -> None:
+            global _in_flight_requests
+            nonlocal finished
+            if not finished:
+                finished = True
+                _in_flight_requests -= 1
+
+        async def send_counted(message) -> None:
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        try:
+            await self.app(scope, receive, send_counted)
+        finally:
+            finish()  # Errors and disconnects before the final body
+
+app.add_middleware(_InFlightMiddleware)
+
+def _metric_caches() -> dict:
+    return {
+        "recognition": _recognition_cache,
+        "spotify": _spotify_cache,
+        "genre": _genre_cache,
+        "artist_genres": _artist_genre_cache,
+        "playlist_index": _playlist_index_cache,
+    }
+
+def _cache_counter(attr: str):
+    # BackendCache (sqlite/redis) has no local evictions; those report 0
+    return lambda: [((name,), getattr(cache, attr, 0)) for name, cache in _metric_caches().items()]
+
+metrics.callback("stash_cache_hits_total", "Cache hits.", _cache_counter("hits"), ["cache"], kind="counter")
+metrics.callback("stash_cache_misses_total", "Cache misses.", _cache_counter("misses"), ["cache"], kind="counter")
+metrics.callback("stash_cache_evictions_total", "Entries evicted to stay within cache bounds.", _cache_counter("evictions"), ["cache"], kind="counter")
+metrics.callback(
+    "stash_rate_limit_rejections_total", "Requests rejected by the rate limiter.",
+    lambda: [(("recognize",), recognize_limiter.rejected)], ["limiter"], kind="counter",
+)
+metrics.callback(
+    "stash_executor_queue_depth", "Jobs waiting for a worker.",
+    lambda: [
+        (("downloads",), _download_executor.queue_depth),
+        (("jobs",), _job_queue.stats()["pending"] - _job_queue.running),
+    ],
+    ["executor"],
+)
+metrics.callback(
+    "stash_executor_in_flight", "Jobs currently running.",
+    lambda: [
+        (("downloads",), _download_executor.in_flight - _download_executor.queue_depth),
+        (("jobs",), _job_queue.running),
+    ],
+    ["executor"],
+)
+metrics.callback("stash_recognitions_in_flight", "Distinct recognitions currently running (after coalescing).", lambda: [((), len(_recognition_flights))])
+metrics.callback("stash_http_requests_in_flight", "HTTP requests currently being served.", lambda: [((), _in_flight_requests)])
+
+@app.get("/metrics")
+def prometheus_metrics() -> Response:
+    """Prometheus text exposition of latency histograms, counters and gauges."""
+    return Response(content=metrics.render(), media_type=Registry.CONTENT_TYPE)
+
+def _client_ip(request: Request) -> str:
     client_ip = "unknown"
     try:
         # Try to get real IP from headers (for proxies/load balancers)
         client_ip = request.headers.get("x-forwarded-for", "unknown").split(",")[0].strip()
     except (AttributeError, IndexError):
         pass
-    
-    # Rate limiting: 10 reels per IP per day
-    now = time.time()
-    request_log[client_ip] = [t for t in request_log[client_ip] if now - t < 86400]  # Keep last 24h
-    
-    if len(request_log[client_ip]) >= settings.RATE_LIMIT_PER_DAY:
-        raise HTTPException(
-            status_code=429, 
-            detail=f"Daily limit reached ({settings.RATE_LIMIT_PER_DAY} reels/day). Upgrade to Pro for unlimited access!"
-        )
-    
-    request_log[client_ip].append(now)
-    
-    logger.debug("Processing: %s (IP: %s, Count: %d)", req.url, client_ip, len(request_log[client_ip]))
+    return client_ip
 
-    # 0. CHECK CONFIGURATION
+def _rate_limit_error(limit) -> HTTPException:
+    return HTTPException(
+        status_code=429, 
+        detail=f"Daily limit reached ({settings.RATE_LIMIT_PER_DAY} reels/day). Upgrade to Pro for unlimited access!",
+        headers=limit.headers(),
+    )
+
+def _check_recognize_config() -> None:
     if not settings.SPOTIFY_CLIENT_ID or not settings.SPOTIFY_CLIENT_SECRET:
         raise HTTPException(
             status_code=503, 
@@ -127,63 +410,325 @@ async def recognize_reel(req: ReelRequest, request: Request):
     if not settings.GEMINI_API_KEY:
         logger.warning("Gemini API Key missing. Genre detection will be disabled.")
 
-    # 1. DOWNLOAD AUDIO
-    loop = asyncio.get_running_loop()
-    audio_filename = await loop.run_in_executor(None, download_audio, req.url)
-    if not audio_filename:
-        # Return 422 (Unprocessable Entity) instead of 500 so frontend handles it gracefully
-        raise HTTPException(status_code=422, detail="Could not download audio. Instagram/TikTok might be blocking the request. Try a different link.")
+async def recognize_url(url: str, media_id: str) -> dict:
+    """Cached result for a reel, or one shared download -> Shazam -> Spotify run."""
+    # SPEED: Replay a cached result for this reel (shared links resolve to the same media ID)
+    cached = await _recognition_cache.aget(media_id)
+    if cached is not None:
+        logger.debug("Recognition cache HIT for %s", media_id)
+        return _replay_cached_recognition(cached)
+
+    # Rate limit is still charged per caller; only the work is shared
+    return await _recognition_flights.do(media_id, lambda: _recognize_media(url, media_id))
+
+@app.post("/recognize")
+async def recognize_reel(req: ReelRequest, request: Request, response: Response):
+    # Get client IP for rate limiting
+    client_ip = _client_ip(request)
+    
+    # Rate limiting: 10 reels per IP per day
+    limit = await recognize_limiter.ahit(client_ip)
+    if not limit.allowed:
+        raise _rate_limit_error(limit)
+    response.headers.update(limit.headers())
+    
+    logger.debug("Processing: %s (IP: %s, Remaining: %d)", req.url, client_ip, limit.remaining)
+
+    # 0. CHECK CONFIGURATION
+    _check_recognize_config()
+
+    profile_id = _profiler.requested(request.headers)
+    if profile_id:
+        response.headers["X-Profile-Id"] = profile_id
+        with _profiler.profile(profile_id, url=req.url):
+            return await recognize_url(req.url, canonical_media_id(req.url))
+    return await recognize_url(req.url, canonical_media_id(req.url))
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.get("/recognize/stream")
+async def recognize_stream(url: str, request: Request):
+    """/recognize as Server-Sent Events: one `stage` event per real pipeline step, then `result` or `error`."""
+    client_ip = _client_ip(request)
+    limit = await recognize_limiter.ahit(client_ip)
+    if not limit.allowed:
+        raise _rate_limit_error(limit)
+    _check_recognize_config()
 
+    media_id = canonical_media_id(url)
+    started = time.monotonic()
+
+    def elapsed_ms(at: Optional[float] = None) -> int:
+        return int(((at or time.monotonic()) - started) * 1000)
+
+    async def events():
+        # SPEED: a cached reel finishes immediately, before any pipeline work
+        cached = await _recognition_cache.aget(media_id)
+        if cached is not None:
+            yield _sse("stage", {"stage": "cache", "status": "hit", "elapsed_ms": elapsed_ms()})
+            try:
+                yield _sse("result", {**_replay_cached_recognition(cached), "elapsed_ms": elapsed_ms()})
+            except HTTPException as e:
+                yield _sse("error", {"status_code": e.status_code, "detail": e.detail, "elapsed_ms": elapsed_ms()})
+            return
+
+        queue = _progress.subscribe(media_id)
+
+        async def run() -> None:
+            try:
+                result = await recognize_url(url, media_id)
+                queue.put_nowait({"final": "result", **result})
+            except HTTPException as e:
+                queue.put_nowait({"final": "error", "status_code": e.status_code, "detail": e.detail})
+            except Exception as e:
+                queue.put_nowait({"final": "error", "status_code": 500, "detail": str(e)})
+
+        task = asyncio.ensure_future(run())
+        try:
+            yield _sse("stage", {"stage": "cache", "status": "miss", "elapsed_ms": elapsed_ms()})
+            while True:
+                event = await queue.get()
+                final = event.pop("final", None)
+                if final:
+                    yield _sse(final, {**event, "elapsed_ms": elapsed_ms()})
+                    break
+                at = event.pop("at")
+                yield _sse("stage", {**event, "elapsed_ms": elapsed_ms(at)})
+        finally:
+            # Client went away: stop waiting (the shared flight keeps running for other callers)
+            task.cancel()
+            _progress.unsubscribe(media_id, queue)
+
+    headers = {**limit.headers(), "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+# --- Asynchronous recognition jobs (return a job ID now, poll or long-poll for the result) ---
+_job_store = jobs.create_job_store(
+    settings.JOB_STORE,
+    sqlite_path=settings.JOB_SQLITE_PATH,
+    ttl=settings.JOB_TTL,
+)
+_job_queue = BackgroundQueue(
+    max_concurrency=settings.JOB_WORKERS,
+    max_pending=settings.JOB_QUEUE_SIZE,
+    name="recognize-jobs",
+)
+# Jobs finishing in this worker wake local long-polls immediately; other workers poll the store
+_job_done_events: dict[str, asyncio.Event] = {}
+
+# Long-poll limits (seconds): stay under common 30s proxy timeouts
+JOB_MAX_WAIT = 25
+JOB_POLL_INTERVAL = 0.5
+
+def _job_view(job: dict) -> dict:
+    view = {"job_id": job["id"], "status": job["status"], "url": job["url"], "created_at": job["created_at"]}
+    for field in ("result", "status_code", "error"):
+        if job.get(field) is not None:
+            view[field] = job[field]
+    return view
+
+JOB_INTERRUPTED_DETAIL = "Server restarted before the recognition finished. Please retry."
+
+async def _run_recognition_job(job_id: str, url: str, media_id: str) -> None:
+    _job_store.update(job_id, status=jobs.RUNNING)
     try:
-        # 2. ASK SHAZAM (Audio Fingerprinting) with Retry Logic
-        logger.debug("Fingerprinting with Shazam: %s", audio_filename)
-        shazam = Shazam()
-        
-        # Retry logic for Shazam API (handles connection timeouts on serverless)
-        out = None
-        max_retries = 3
-        for attempt in range(max_retries):
+        result = await recognize_url(url, media_id)
+        _job_store.update(job_id, status=jobs.DONE, result=result)
+    except asyncio.CancelledError:
+        # Cancelled at shutdown: fail it now rather than leave it "running" in a shared store until the TTL
+        _job_store.update(job_id, status=jobs.FAILED, status_code=503, error=JOB_INTERRUPTED_DETAIL)
+        raise
+    except HTTPException as e:
+        _job_store.update(job_id, status=jobs.FAILED, status_code=e.status_code, error=e.detail)
+    except Exception as e:
+        logger.error("Recognition job %s failed: %s", job_id, e)
+        _job_store.update(job_id, status=jobs.FAILED, status_code=500, error=str(e))
+    finally:
+        event = _job_done_events.pop(job_id, None)
+        if event:
+            event.set()
+
+async def _shutdown_jobs() -> None:
+    """Cancel this worker's jobs and fail the ones that never got to run."""
+    await _job_queue.close()
+    # Running jobs removed their events on the way out; what's left was still queued
+    for job_id in list(_job_done_events):
+        _job_store.update(job_id, status=jobs.FAILED, status_code=503, error=JOB_INTERRUPTED_DETAIL)
+        _job_done_events.pop(job_id).set()
+
+@app.post("/recognize/jobs", status_code=202)
+async def create_recognition_job(req: ReelRequest, request: Request, response: Response) -> dict:
+    """Queue a recognition and return its job ID immediately."""
+    limit = await recognize_limiter.ahit(_client_ip(request))
+    if not limit.allowed:
+        raise _rate_limit_error(limit)
+    response.headers.update(limit.headers())
+    _check_recognize_config()
+
+    media_id = canonical_media_id(req.url)
+    now = time.time()
+    job = {"id": uuid4().hex, "status": jobs.QUEUED, "url": req.url, "media_id": media_id, "created_at": now, "updated_at": now}
+
+    # SPEED: a cached reel completes the job on the spot
+    cached = await _recognition_cache.aget(media_id)
+    if cached is not None:
+        if cached.get("status_code"):
+            job.update(status=jobs.FAILED, status_code=cached["status_code"], error=cached.get("error"))
+        else:
+            job.update(status=jobs.DONE, result=cached)
+        _job_store.create(job)
+        return _job_view(job)
+
+    _job_store.create(job)
+    _job_done_events[job["id"]] = asyncio.Event()
+    if not _job_queue.submit(lambda: _run_recognition_job(job["id"], req.url, media_id)):
+        _job_done_events.pop(job["id"], None)
+        _job_store.update(job["id"], status=jobs.FAILED, status_code=503, error="Job queue is full.")
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy recognizing other reels. Please retry shortly.",
+            headers={"Retry-After": str(_download_executor.retry_after())},
+        )
+    response.headers["Location"] = f"/recognize/jobs/{job['id']}"
+    return _job_view(job)
+
+@app.get("/recognize/jobs/{job_id}")
+async def get_recognition_job(job_id: str, wait: float = 0) -> dict:
+    """Job status and result. `wait` (seconds, max 25) long-polls until the job finishes."""
+    deadline = time.monotonic() + min(max(wait, 0), JOB_MAX_WAIT)
+    while True:
+        job = _job_store.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found (unknown or expired).")
+        remaining = deadline - time.monotonic()
+        if job["status"] in jobs.FINISHED or remaining <= 0:
+            return _job_view(job)
+
+        event = _job_done_events.get(job_id)
+        try:
+            if event is not None:
+                await asyncio.wait_for(event.wait(), remaining)
+            else:
+                await asyncio.sleep(min(JOB_POLL_INTERVAL, remaining))
+        except asyncio.TimeoutError:
+            pass
+
+class RecognizeBatchRequest(BaseModel):
+    urls: list[str]
+
+@app.post("/recognize_batch")
+async def recognize_batch(req: RecognizeBatchRequest, request: Request):
+    """Recognize many reels; one NDJSON line per URL, streamed in completion order."""
+    if not req.urls:
+        raise HTTPException(status_code=400, detail="No URLs given.")
+    if len(req.urls) > settings.RECOGNIZE_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"Too many URLs ({len(req.urls)}). Max {settings.RECOGNIZE_BATCH_MAX} per request.")
+    _check_recognize_config()
+
+    # Dedupe: links to the same reel share one run (and one rate limit charge)
+    by_media: dict[str, list[int]] = {}
+    for index, url in enumerate(req.urls):
+        by_media.setdefault(canonical_media_id(url), []).append(index)
+
+    client_ip = _client_ip(request)
+    logger.debug("Batch of %d URLs (%d unique) from %s", len(req.urls), len(by_media), client_ip)
+    semaphore = asyncio.Semaphore(settings.RECOGNIZE_BATCH_CONCURRENCY)
+    # Lock waiters queue in task order, so shared-backend hits still land in request order
+    charge_order = asyncio.Lock()
+
+    async def run(media_id: str, url: str) -> tuple[str, dict]:
+        async with charge_order:
+            limit = await recognize_limiter.ahit(client_ip)
+        if not limit.allowed:
+            return media_id, {"success": False, "status_code": 429, "error": _rate_limit_error(limit).detail}
+        async with semaphore:
             try:
-                out = await shazam.recognize(audio_filename)
-                break  # Success, exit retry loop
-            except Exception as shazam_error:
-                if attempt < max_retries - 1:
-                    wait_time = attempt + 1  # SPEED: Faster backoff: 1s, 2s
-                    logger.warning("Shazam attempt %d failed: %s. Retrying in %ds...", attempt + 1, shazam_error, wait_time)
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.error("Shazam failed after %d attempts: %s", max_retries, shazam_error)
-                    raise shazam_error
+                return media_id, await recognize_url(url, media_id)
+            except HTTPException as e:
+                return media_id, {"success": False, "status_code": e.status_code, "error": e.detail}
+            except Exception as e:
+                logger.error("Batch recognition failed for %s: %s", url, e)
+                return media_id, {"success": False, "status_code": 500, "error": str(e)}
+
+    async def lines():
+        # Charge the limiter in request order so the first reels win when the quota runs out
+        tasks = [asyncio.ensure_future(run(media_id, req.urls[indices[0]])) for media_id, indices in by_media.items()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                media_id, result = await next_done
+                for index in by_media[media_id]:
+                    yield json.dumps({"index": index, "url": req.urls[index], "media_id": media_id, **result}) + "\n"
+        finally:
+            # Client went away: stop waiting (shared flights keep running for other callers)
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+async def _recognize_media(url: str, media_id: str) -> dict:
+    """Download -> Shazam -> Spotify pipeline for one reel. Caches the final outcome."""
+    with STAGE_SECONDS.time(pipeline="recognize", stage="total"):
+        return await _run_recognition_pipeline(url, media_id)
+
+async def _run_recognition_pipeline(url: str, media_id: str) -> dict:
+    # Stage events for /recognize/stream subscribers of this reel (runs in the flight's own task context)
+    _progress.bind(media_id)
+
+    # 1. DOWNLOAD AUDIO (bounded pool: shed load with 503 + Retry-After instead of queueing forever)
+    try:
+        report("queue", "start", in_flight=_download_executor.in_flight)
+        audio = await _download(url)
+    except QueueFullError as e:
+        logger.warning("Download queue full (%d in flight). Rejecting %s", _download_executor.in_flight, url)
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy recognizing other reels. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    if not audio:
+        # Return 422 (Unprocessable Entity) instead of 500 so frontend handles it gracefully
+        await _cache_recognition(media_id, {"success": False, "error": DOWNLOAD_FAILED_DETAIL, "status_code": 422})
+        raise HTTPException(status_code=422, detail=DOWNLOAD_FAILED_DETAIL)
+
+    try:
+        # 2. ASK SHAZAM (Audio Fingerprinting), escalating the audio window until it matches
+        out, window = await _recognize_progressive(shazam_client, audio)
         
         if not out:
             raise Exception("Shazam recognition returned no data")
         
         # Cleanup audio immediately
-        if os.path.exists(audio_filename): os.remove(audio_filename)
+        _cleanup_audio(audio)
 
         # 3. PARSE SHAZAM RESULT
         if not out.get('matches'):
             logger.debug("Shazam found no matches.")
-            return {"success": False, "error": "Could not identify song from audio"}
+            return await _cache_recognition(media_id, {"success": False, "error": "Could not identify song from audio"})
 
         track_info = out['track']
         shazam_title = track_info['title']
         shazam_artist = track_info['subtitle']
         
-        logger.debug("Shazam Match: %s by %s", shazam_title, shazam_artist)
+        logger.debug("Shazam Match: %s by %s (%s window)", shazam_title, shazam_artist, f"{window:.1f}s" if window is not None else "file")
 
         # 4. VERIFY WITH SPOTIFY (Get Playable URI)
         # We still search Spotify to get the URI for the frontend player/saving
-        return search_spotify_strict(shazam_title, shazam_artist)
+        report("spotify", "start")
+        with STAGE_SECONDS.time(pipeline="recognize", stage="spotify"):
+            result = await search_spotify_strict(shazam_title, shazam_artist)
+        report("spotify", "done", matched=bool(result.get("success")))
+        if result.get("success") and window is not None:
+            # Report which audio window matched so the schedule can be tuned (copy: result may be cached)
+            result = {**result, "match_window": round(window, 1)}
+        return await _cache_recognition(media_id, result)
 
     except Exception as e:
         error_msg = str(e)
         logger.error("Recognition Error: %s", error_msg)
         
         # Cleanup audio if it still exists
-        if audio_filename and os.path.exists(audio_filename): 
-            try: os.remove(audio_filename)
-            except OSError: pass
+        _cleanup_audio(audio)
             
         # Return a more descriptive error based on the exception
         if "quota" in error_msg.lower():
@@ -193,124 +738,407 @@ async def recognize_reel(req: ReelRequest, request: Request):
         else:
             raise HTTPException(status_code=500, detail=f"Backend Error: {error_msg}")
 
-def download_audio(url: str) -> Optional[str]:
-    """Downloads audio to /tmp. Tries without cookies first (public posts), then with cookies."""
+async def _recognize_progressive(shazam: Shazam, audio: Union[str, StreamSource]) -> tuple[Optional[dict], Optional[float]]:
+    """Fingerprint escalating windows (settings.RECOGNITION_WINDOWS) until Shazam returns matches.
+
+    Returns the last Shazam response and the seconds of audio it was computed from
+    (None for a downloaded file: up to FILE_CLIP_SECONDS, its real length isn't known here).
+    """
+    if isinstance(audio, str):
+        logger.debug("Fingerprinting with Shazam: %s", audio)
+        return await _shazam_recognize(shazam, audio), None
+
+    out = None
+    fingerprinted = 0.0
+    for end in settings.RECOGNITION_WINDOWS:
+        window = audio.pending(end)
+        if window is not None:
+            report("decode", "start", window=end)
+            try:
+                # Download pool keeps ffmpeg processes bounded; the job only returns PCM (picklable
+                # in process mode) and the source is extended here
+                with STAGE_SECONDS.time(pipeline="recognize", stage="decode"):
+                    chunk = await _download_executor.run(
+                        _decode_window, audio.media_url, audio.headers, audio.cookies, *window,
+                    )
+                audio.append(chunk, window[1])
+            except QueueFullError:
+                logger.warning("Download queue full. Fingerprinting the %.1fs already decoded", audio.seconds)
+            report("decode", "done", seconds=round(audio.seconds, 1))
+        if out is not None and audio.seconds <= fingerprinted:
+            break  # Media ended, nothing new to fingerprint
+
+        fingerprinted = audio.seconds
+        logger.debug("Fingerprinting with Shazam: %.1fs window (in memory)", fingerprinted)
+        out = await _shazam_recognize(shazam, audio.wav())
+        if out and out.get('matches'):
+            break  # SPEED: Stop downloading and fingerprinting as soon as we have a match
+
+    return out, fingerprinted
+
+def _decode_window(media_url: str, headers: dict, cookies: str, start: float, duration: float) -> Optional[bytes]:
+    with _fetch_slot():
+        return decode_stream_to_pcm(media_url, headers, cookies, start, duration)
+
+async def _shazam_recognize(shazam: Shazam, audio: Union[str, bytes]) -> Optional[dict]:
+    """Retry logic for Shazam API (handles connection timeouts on serverless)."""
+    out = None
+    max_retries = 3
+    for attempt in range(max_retries):
+        try:
+            report("shazam", "start", attempt=attempt + 1)
+            with STAGE_SECONDS.time(pipeline="recognize", stage="shazam"):
+                out = await shazam.recognize(audio)
+            report("shazam", "done", attempt=attempt + 1, matched=bool(out and out.get('matches')))
+            break  # Success, exit retry loop
+        except Exception as shazam_error:
+            report("shazam", "failed", attempt=attempt + 1)
+            if attempt < max_retries - 1:
+                SHAZAM_RETRIES.inc()
+                wait_time = attempt + 1  # SPEED: Faster backoff: 1s, 2s
+                logger.warning("Shazam attempt %d failed: %s. Retrying in %ds...", attempt + 1, shazam_error, wait_time)
+                await asyncio.sleep(wait_time)
+            else:
+                logger.error("Shazam failed after %d attempts: %s", max_retries, shazam_error)
+                raise shazam_error
+    return out
+
+def _cleanup_audio(audio: Union[str, StreamSource, None]) -> None:
+    """Remove a downloaded /tmp file. In-memory audio needs no cleanup."""
+    if isinstance(audio, str) and os.path.exists(audio):
+        try: os.remove(audio)
+        except OSError: pass
+
+# --- Download hedging (race cookieless vs. cookie-authenticated attempts) ---
+_hedge_stats = HedgeStats(min_cookie_win_rate=settings.DOWNLOAD_HEDGE_MIN_COOKIE_WIN_PCT / 100)
+# Legs are only submitted holding a fetch slot, so at most DOWNLOAD_WORKERS of them are ever queued or running
+_hedge_pool = ThreadPoolExecutor(max_workers=settings.DOWNLOAD_HEDGE_WORKERS, thread_name_prefix="stash-hedge")
+
+async def _download(url: str) -> Optional[Union[str, StreamSource]]:
+    """download_audio in the download pool. In process mode the worker's metrics come back with the audio."""
+    if not _download_executor.use_processes:
+        return await _download_executor.run(download_audio, url)
+    audio, recorded, hedge_outcomes = await _download_executor.run(_download_in_worker, url)
+    metrics.merge(recorded)
+    _hedge_stats.merge(hedge_outcomes)
+    return audio
+
+def _download_in_worker(url: str) -> tuple:
+    """Process pool entry point: the audio plus the counters/histograms/hedge outcomes this worker recorded."""
+    audio = download_audio(url)
+    # Also picks up stragglers from earlier jobs (e.g. a hedged loser that finished after its job returned)
+    return audio, metrics.drain(), _hedge_stats.drain()
+
+def download_audio(url: str) -> Optional[Union[str, StreamSource]]:
+    """Fetches the first seconds of audio. Tries without cookies first (public posts), then with cookies.
+
+    On platforms where cookies often win, both attempts are raced with a short stagger instead.
+    Returns an in-memory StreamSource (first window decoded) in streaming mode, or a /tmp file path otherwise.
+    """
+    with profile_thread():
+        return _download_audio(url)
+
+def _download_audio(url: str) -> Optional[Union[str, StreamSource]]:
+    report("queue", "done")
+    platform = media_platform(url)
+    if settings.DOWNLOAD_HEDGE_ENABLED and _has_cookies_for(url) and _hedge_stats.should_hedge(platform):
+        return _race_downloads(url, platform)
     
     # Try WITHOUT cookies first (works for public posts)
-    result = _download_with_options(url, use_cookies=False)
-    
-    # If failed, retry WITH cookies (for private/restricted posts)
+    with _fetch_slot():
+        result = _fetch_audio(url, use_cookies=False)
+    return _cookie_retry(url, platform, result)
+
+def _cookie_retry(url: str, platform: str, result: Optional[Union[str, StreamSource]]) -> Optional[Union[str, StreamSource]]:
+    """Record a cookieless result, or retry WITH cookies if it failed (private/restricted posts)."""
+    outcome = COOKIELESS
     if not result:
         logger.warning("Cookieless download failed. Retrying with authentication...")
-        result = _download_with_options(url, use_cookies=True)
-    
+        COOKIE_FALLBACKS.inc(platform=platform, mode="sequential")
+        with _fetch_slot():
+            result = _fetch_audio(url, use_cookies=True)
+        outcome = COOKIES
+
+    _hedge_stats.record(platform, outcome if result else FAILED)
     return result
 
-def _download_with_options(url: str, use_cookies: bool = False) -> Optional[str]:
+def _run_leg(url: str, use_cookies: bool, cancel: threading.Event) -> Optional[Union[str, StreamSource]]:
+    """Hedged leg body. Its submitter acquired the fetch slot; the leg keeps it until it really finishes."""
+    try:
+        return _fetch_audio(url, use_cookies, cancel)
+    finally:
+        _fetch_slots.release()
+
+def _submit_leg(url: str, use_cookies: bool, cancel: threading.Event):
+    # Legs run in copies of this context so their progress events still reach the request's subscribers
+    try:
+        return _hedge_pool.submit(contextvars.copy_context().run, _run_leg, url, use_cookies, cancel)
+    except BaseException:
+        _fetch_slots.release()
+        raise
+
+def _race_downloads(url: str, platform: str) -> Optional[Union[str, StreamSource]]:
+    """Start the cookieless attempt, then the cookie attempt after a stagger. First audio wins, the loser is cancelled."""
+    cancel = {COOKIELESS: threading.Event(), COOKIES: threading.Event()}
+    _fetch_slots.acquire()
+    cookieless = _submit_leg(url, False, cancel[COOKIELESS])
+    legs = {cookieless: COOKIELESS}
+
+    # Public posts usually finish inside the stagger, so the cookie attempt never starts
+    done, _ = wait(legs, timeout=settings.DOWNLOAD_HEDGE_DELAY_MS / 1000)
+    if done:
+        result = _leg_result(done.pop())
+        if result:
+            _hedge_stats.record(platform, COOKIELESS)
+            return result
+        logger.warning("Cookieless download failed. Retrying with authentication...")
+        legs = {}
+        _fetch_slots.acquire()
+    elif not _fetch_slots.acquire(False):
+        # Every download slot is busy: hedging would exceed DOWNLOAD_WORKERS, so wait and retry in turn
+        logger.debug("No spare download slot to hedge with. Waiting for the cookieless download...")
+        return _cookie_retry(url, platform, _leg_result(cookieless))
+    else:
+        logger.debug("Cookieless download still running after %dms. Hedging with cookies...", settings.DOWNLOAD_HEDGE_DELAY_MS)
+    COOKIE_FALLBACKS.inc(platform=platform, mode="hedged")
+    legs[_submit_leg(url, True, cancel[COOKIES])] = COOKIES
+
+    result, winner = None, FAILED
+    pending = set(legs)
+    while pending and result is None:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for leg in done:
+            audio = _leg_result(leg)
+            if audio and result is None:
+                result, winner = audio, legs[leg]
+            else:
+                _cleanup_audio(audio)
+
+    for leg in pending:
+        cancel[legs[leg]].set()
+        leg.add_done_callback(lambda f: _cleanup_audio(_leg_result(f)))
+
+    if result is not None:
+        logger.debug("%s download won the race for %s", winner.capitalize(), platform)
+    _hedge_stats.record(platform, winner)
+    return result
+
+def _leg_result(leg) -> Optional[Union[str, StreamSource]]:
+    try:
+        return leg.result()
+    except Exception as e:
+        logger.error("Download Error: %s", e)
+        return None
+
+def _has_cookies_for(url: str) -> bool:
+    """Whether a cookie download of this URL would have an account to use (same rules as _select_cookie_file)."""
+    return _cookie_accounts(url) is not None
+
+def _fetch_audio(url: str, use_cookies: bool = False, cancel: Optional[threading.Event] = None) -> Optional[Union[str, StreamSource]]:
+    """Stream-decode in memory when possible, otherwise download an mp3 to /tmp."""
+    with profile_thread():  # hedged legs run on their own threads
+        if settings.STREAM_AUDIO and shutil.which("ffmpeg") is not None:
+            return _stream_with_options(url, use_cookies=use_cookies, cancel=cancel)
+        return _download_with_options(url, use_cookies=use_cookies, cancel=cancel)
+
+# Warmed YoutubeDL instances, keyed by option profile (mode x platform x cookies x ffmpeg)
+_ytdl_pool = YoutubeDLPool(max_idle_per_profile=settings.YTDLP_POOL_SIZE)
+
+# Cookie files are written once per account and reused (the content never changes at runtime)
+_written_cookie_files: set[str] = set()
+_cookie_file_lock = threading.Lock()
+
+def _build_ydl_opts() -> dict:
+    """Base yt_dlp options shared by the streaming and file download paths."""
+    return {
+        'quiet': False, 
+        'no_warnings': False,
+        'nocheckcertificate': True,
+        'http_headers': {
+            'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0 Mobile/15E148 Safari/604.1',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Sec-Fetch-Mode': 'navigate',
+        }
+    }
+
+def _cookie_accounts(url: str) -> Optional[tuple[list[str], str, str]]:
+    """(cookie accounts, platform name, file prefix) to use for the URL, or None if there are none."""
+    # Detect platform from URL
+    is_youtube = 'youtube.com' in url or 'youtu.be' in url
+    is_instagram = 'instagram.com' in url
+
+    # Select cookies based on URL type
+    if is_youtube and settings.YTDLP_COOKIES_YOUTUBE:
+        return settings.YTDLP_COOKIES_YOUTUBE, "YouTube", "youtube"
+    if is_instagram and settings.YTDLP_COOKIES_INSTAGRAM:
+        return settings.YTDLP_COOKIES_INSTAGRAM, "Instagram", "instagram"
+    if settings.YTDLP_COOKIES_INSTAGRAM:
+        # Fallback to Instagram cookies for other platforms (TikTok, etc.)
+        return settings.YTDLP_COOKIES_INSTAGRAM, "General", "instagram"
+    return None
+
+def _select_cookie_file(url: str, use_cookies: bool = False) -> Optional[str]:
+    """Pick a cookie account (rotation) for the URL's platform and return its cookie file."""
+    if not use_cookies:
+        logger.debug("Trying cookieless download (public post)...")
+        return None
+
+    selected = _cookie_accounts(url)
+    if selected is None:
+        logger.debug("No cookies available for this platform")
+        return None
+    accounts, platform_name, prefix = selected
+
+    index = random.randrange(len(accounts))
+    cookie_file = f'/tmp/{prefix}_cookies_{index}.txt'
+    try:
+        with _cookie_file_lock:
+            if cookie_file not in _written_cookie_files:
+                with open(cookie_file, 'w') as f:
+                    f.write(accounts[index])
+                _written_cookie_files.add(cookie_file)
+    except Exception as e:
+        logger.warning("Cookie file creation failed: %s", e)
+        return None
+
+    logger.debug("Using %s cookies for download", platform_name)
+    return cookie_file
+
+def _stream_with_options(url: str, use_cookies: bool = False, cancel: Optional[threading.Event] = None) -> Optional[Union[str, StreamSource]]:
+    """Resolve the media stream with yt_dlp and decode it straight to PCM in memory (no /tmp files)."""
+    platform = media_platform(url)
+    cookiefile = _select_cookie_file(url, use_cookies)
+
+    def build_opts() -> dict:
+        ydl_opts = _build_ydl_opts()
+        ydl_opts['format'] = 'worstaudio/worst'  # SPEED: Lowest quality is fine for fingerprinting
+        return ydl_opts
+
+    try:
+        report("download", "start", cookies=use_cookies)
+        profile = ("stream", platform, cookiefile is not None)
+        with _ytdl_pool.acquire(profile, build_opts, platform, cookiefile=cookiefile, cancel=cancel) as ydl:
+            with STAGE_SECONDS.time(pipeline="recognize", stage="download"):
+                info = ydl.extract_info(url, download=False)
+            # Cookies (account + any set during extraction) must be read before the instance goes back to the pool
+            stream = select_stream(info or {}, ydl.cookiejar)
+        report("download", "done", cookies=use_cookies)
+    except Exception as e:
+        logger.error("Download Error: %s", e)
+        report("download", "failed", cookies=use_cookies)
+        return None
+
+    if cancel and cancel.is_set():
+        return None
+
+    if stream:
+        source = StreamSource(*stream)
+        # SPEED: Only decode the first window now; later windows are decoded only if Shazam needs them
+        report("decode", "start", window=settings.RECOGNITION_WINDOWS[0], cookies=use_cookies)
+        with STAGE_SECONDS.time(pipeline="recognize", stage="decode"):
+            decoded = source.extend(settings.RECOGNITION_WINDOWS[0], cancel=cancel)
+        if decoded:
+            report("decode", "done", seconds=round(source.seconds, 1), cookies=use_cookies)
+            return source
+        report("decode", "failed", cookies=use_cookies)
+        if cancel and cancel.is_set():
+            return None
+
+    # Extraction worked but the stream can't be piped (e.g. DASH fragments): use yt_dlp's downloader
+    logger.warning("In-memory decode unavailable for %s. Falling back to file download...", url)
+    return _download_with_options(url, use_cookies=use_cookies, cancel=cancel)
+
+def _download_with_options(url: str, use_cookies: bool = False, cancel: Optional[threading.Event] = None) -> Optional[str]:
     """Internal function to download with or without cookies."""
     try:
         filename = f"/tmp/temp_{uuid4().hex}"
         has_ffmpeg = shutil.which("ffmpeg") is not None
-        
-        # Detect platform from URL
-        is_youtube = 'youtube.com' in url or 'youtu.be' in url
-        is_instagram = 'instagram.com' in url
-        
-        ydl_opts = {
-            'quiet': False, 
-            'no_warnings': False,
-            'nocheckcertificate': True,
-            # SPEED: Only download first 15 seconds (Shazam identifies in ~5s)
-            'download_ranges': lambda info, ydl: [{'start_time': 0, 'end_time': 15}],
-            'force_keyframes_at_cuts': True,
-            'http_headers': {
-                'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0 Mobile/15E148 Safari/604.1',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Sec-Fetch-Mode': 'navigate',
-            }
-        }
+        platform = media_platform(url)
+        cookiefile = _select_cookie_file(url, use_cookies)
 
-        # Add cookies with rotation support based on platform
-        if use_cookies:
-            cookies_content = None
-            platform_name = ""
-            
-            # Select cookies based on URL type
-            if is_youtube and settings.YTDLP_COOKIES_YOUTUBE:
-                cookies_content = random.choice(settings.YTDLP_COOKIES_YOUTUBE)
-                platform_name = "YouTube"
-                cookie_file = '/tmp/youtube_cookies.txt'
-            elif is_instagram and settings.YTDLP_COOKIES_INSTAGRAM:
-                cookies_content = random.choice(settings.YTDLP_COOKIES_INSTAGRAM)
-                platform_name = "Instagram"
-                cookie_file = '/tmp/instagram_cookies.txt'
-            elif settings.YTDLP_COOKIES_INSTAGRAM:
-                # Fallback to Instagram cookies for other platforms (TikTok, etc.)
-                cookies_content = random.choice(settings.YTDLP_COOKIES_INSTAGRAM)
-                platform_name = "General"
-                cookie_file = '/tmp/cookies.txt'
-            
-            if cookies_content:
-                try:
-                    with open(cookie_file, 'w') as f:
-                        f.write(cookies_content)
-                    ydl_opts['cookiefile'] = cookie_file
-                    logger.debug("Using %s cookies for download", platform_name)
-                except Exception as e:
-                    logger.warning("Cookie file creation failed: %s", e)
-            else:
-                logger.debug("No cookies available for %s", platform_name or 'this platform')
-        else:
-            logger.debug("Trying cookieless download (public post)...")
-
-        if has_ffmpeg:
-            ydl_opts.update({
-                'format': 'worstaudio/worst',  # SPEED: Lowest quality is fine for fingerprinting
-                'outtmpl': filename,
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '64',  # SPEED: 64kbps is enough for Shazam
-                }],
-            })
-        else:
+        def build_opts() -> dict:
+            ydl_opts = _build_ydl_opts()
             ydl_opts.update({
-                'format': 'bestaudio',
-                'outtmpl': f"{filename}.%(ext)s",
+                # SPEED: Only download first 15 seconds (Shazam identifies in ~5s)
+                'download_ranges': lambda info, ydl: [{'start_time': 0, 'end_time': FILE_CLIP_SECONDS}],
+                'force_keyframes_at_cuts': True,
             })
+            if has_ffmpeg:
+                ydl_opts.update({
+                    'format': 'worstaudio/worst',  # SPEED: Lowest quality is fine for fingerprinting
+                    'postprocessors': [{
+                        'key': 'FFmpegExtractAudio',
+                        'preferredcodec': 'mp3',
+                        'preferredquality': '64',  # SPEED: 64kbps is enough for Shazam
+                    }],
+                })
+            else:
+                ydl_opts['format'] = 'bestaudio'
+            return ydl_opts
 
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+        # Per-request output path is applied to the pooled instance, not baked into the profile
+        outtmpl = filename if has_ffmpeg else f"{filename}.%(ext)s"
+        profile = ("file", platform, cookiefile is not None, has_ffmpeg)
+        # File mode downloads and converts in one step, so "download" covers the ffmpeg decode too
+        report("download", "start", cookies=use_cookies, mode="file")
+        with _ytdl_pool.acquire(profile, build_opts, platform, outtmpl=outtmpl, cookiefile=cookiefile, cancel=cancel) as ydl:
+            with STAGE_SECONDS.time(pipeline="recognize", stage="download"):
+                ydl.download([url])
         
         files = glob.glob(f"{filename}*")
+        report("download", "done" if files else "failed", cookies=use_cookies, mode="file")
         return files[0] if files else None
     except Exception as e:
         logger.error("Download Error: %s", e)
+        report("download", "failed", cookies=use_cookies, mode="file")
         return None
 
-def search_spotify_strict(track: str, artist: str) -> dict:
+async def search_spotify_strict(track: str, artist: str) -> dict:
     """Search Spotify for a track, prioritizing exact artist matches and sorting by popularity."""
     # Check cache first
-    cached = _get_cached_spotify(track, artist)
+    cached = await _get_cached_spotify(track, artist)
     if cached:
         return cached
 
     query = f"{track} {artist}" 
     
-    current_sp = sp or get_spotify_client()
-    if not current_sp:
+    if not spotify_client.configured:
         raise HTTPException(status_code=503, detail="Backend Error: Spotify client is not initialized.")
         
     try:
-        results = current_sp.search(q=query, type='track', limit=10)  # Get more results to filter
+        results = await spotify_client.search(q=query, type='track', limit=10)  # Get more results to filter
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Backend Error: Spotify search failed. {str(e)}")
         
     items = results['tracks']['items']
     
-    if not items: return {"success": False, "error": "Not found on Spotify"}
+    if not items:
+        result = {"success": False, "error": "Not found on Spotify"}
+        await _set_cached_spotify(track, artist, result)
+        return result
+
+    best = _best_spotify_match(items, artist)
+    
+    logger.debug("Spotify Match (Popularity %d): %s by %s", best['popularity'], best['name'], best['artists'][0]['name'])
+
+    result = {
+        "success": True,
+        "track": best['name'],
+        "artist": best['artists'][0]['name'],
+        "album_art": best['album']['images'][0]['url'],
+        "spotify_uri": best['uri'],
+        "spotify_url": best['external_urls']['spotify'],
+        "preview_url": best.get('preview_url'), 
+        "confidence": 0.99
+    }
+
+    # Cache the result
+    await _set_cached_spotify(track, artist, result)
+    return result
 
+def _best_spotify_match(items: list[dict], artist: str) -> dict:
+    """Pick the best search result: exact artist match, then partial, then anything; most popular wins."""
     # IMPROVED MATCHING: Prioritize exact artist matches
     exact_matches = []
     partial_matches = []
@@ -330,29 +1158,19 @@ def search_spotify_strict(track: str, artist: str) -> dict:
     
     # SORT BY POPULARITY (Fixes the "Cover Song" issue)
     candidates.sort(key=lambda x: x['popularity'], reverse=True)
-    best = candidates[0]
-    
-    logger.debug("Spotify Match (Popularity %d): %s by %s", best['popularity'], best['name'], best['artists'][0]['name'])
-
-    result = {
-        "success": True,
-        "track": best['name'],
-        "artist": best['artists'][0]['name'],
-        "album_art": best['album']['images'][0]['url'],
-        "spotify_uri": best['uri'],
-        "spotify_url": best['external_urls']['spotify'],
-        "preview_url": best.get('preview_url'), 
-        "confidence": 0.99
-    }
-
-    # Cache the result
-    _set_cached_spotify(track, artist, result)
-    return result
+    return candidates[0]
 
 class SaveWebTrackRequest(BaseModel):
     token: str
     track_id: str
     playlist_id: str
+    defer_genre: Optional[bool] = None  # None = server default (DEFER_GENRE_ENRICHMENT)
+
+class SaveTracksRequest(BaseModel):
+    token: str
+    track_ids: list[str]
+    playlist_id: str = "1"
+    defer_genre: Optional[bool] = None
 
 class RemoveTrackRequest(BaseModel):
     token: str
@@ -360,10 +1178,158 @@ class RemoveTrackRequest(BaseModel):
     playlist_id: str = "1"  # Default to liked songs
 
 # Helper: AI Genre Detection
+# --- Genre cache (genres don't change: long TTL, keyed by Spotify track ID and by normalized name) ---
+_genre_cache = make_cache(
+    _cache_backend,
+    maxsize=settings.GENRE_CACHE_SIZE,
+    ttl=settings.GENRE_CACHE_TTL,
+    negative_ttl=settings.GENRE_FAILURE_TTL,
+    name="genre",
+)
+_genre_flights = SingleFlight(name="genre")
+
+UNKNOWN_GENRE = "Unknown"
+
+async def get_track_genre(
+    track_name: str,
+    artist_name: str,
+    track_id: Optional[str] = None,
+    artist_ids: Optional[list[str]] = None,
+) -> str:
+    """Genre for a track: cache, then Spotify artist genres, then Gemini (at most once per track across concurrent saves)."""
+    name_key = "name:" + _spotify_cache_key(track_name, artist_name)
+    id_key = f"id:{track_id}" if track_id else None
+
+    for key in filter(None, (id_key, name_key)):
+        genre = await _genre_cache.aget(key)
+        if genre is not None:
+            if key == name_key and id_key and genre != UNKNOWN_GENRE:
+                await _genre_cache.aset(id_key, genre)  # "Unknown" stays a short-lived name entry, retried after it expires
+            return genre
+
+    genre = await _genre_flights.do(
+        name_key, lambda: _detect_and_cache_genre(track_name, artist_name, name_key, artist_ids or [])
+    )
+    if id_key and genre != UNKNOWN_GENRE:
+        await _genre_cache.aset(id_key, genre)
+    return genre
+
+async def _detect_and_cache_genre(track_name: str, artist_name: str, name_key: str, artist_ids: list[str]) -> str:
+    # SPEED: Spotify's own artist genres are one batched, cached API call away; Gemini only when they're empty
+    genre = await _genre_from_spotify_artists(artist_ids)
+    if genre is None:
+        genre = await _genre_batcher.submit((track_name, artist_name))
+    if genre == UNKNOWN_GENRE:
+        # Gemini failed: retry after a short TTL instead of pinning "Unknown"
+        await _genre_cache.aset_negative(name_key, genre)
+    else:
+        await _genre_cache.aset(name_key, genre)
+    return genre
+
+# --- Spotify artist genres (tags per artist ID, fetched 50 per /artists?ids= call across concurrent saves) ---
+_artist_genre_cache = make_cache(
+    _cache_backend,
+    maxsize=settings.ARTIST_GENRE_CACHE_SIZE,
+    ttl=settings.ARTIST_GENRE_CACHE_TTL,
+    name="artist-genres",
+)
+
+async def _fetch_artist_genres(ids: list[str]) -> list[list[str]]:
+    artists = await spotify_client.artists(dict.fromkeys(ids))
+    by_id = {artist["id"]: artist.get("genres", []) for artist in artists if artist}
+    return [by_id.get(artist_id, []) for artist_id in ids]
+
+async def _fetch_artist_genres_single(artist_id: str) -> list[str]:
+    return (await spotify_client.get(f"artists/{artist_id}")).get("genres", [])
+
+_artist_batcher = MicroBatcher(
+    _fetch_artist_genres,
+    _fetch_artist_genres_single,
+    max_batch=50,  # Spotify's /artists limit
+    max_wait=settings.GENRE_BATCH_WAIT_MS / 1000,
+    name="spotify-artists",
+)
+
+async def get_artist_genres(ids: list[str]) -> list[list[str]]:
+    """Spotify genre tags for each artist ID (same order), from cache or batched lookups."""
+    cached = [await _artist_genre_cache.aget(artist_id) for artist_id in ids]
+    missing = list(dict.fromkeys(artist_id for artist_id, tags in zip(ids, cached) if tags is None))
+    fetched = dict(zip(missing, await asyncio.gather(*(_artist_batcher.submit(artist_id) for artist_id in missing))))
+    for artist_id, tags in fetched.items():
+        await _artist_genre_cache.aset(artist_id, tags)
+    return [tags if tags is not None else fetched[artist_id] for artist_id, tags in zip(ids, cached)]
+
+async def _genre_from_spotify_artists(artist_ids: list[str]) -> Optional[str]:
+    """Stash genre from the track's artists' Spotify tags, or None when Spotify has nothing usable."""
+    if not artist_ids or not spotify_client.configured:
+        return None
+    try:
+        genre = map_spotify_genres(await get_artist_genres(artist_ids))
+    except Exception as e:
+        logger.warning("Spotify artist genre lookup failed: %s", e)
+        return None
+    if genre:
+        logger.debug("Genre from Spotify artist tags: %s", genre)
+    return genre
+
+# --- Deferred genre enrichment (non-smart_sort saves respond first, genre lands in the cache later) ---
+_genre_enrichment = BackgroundQueue(
+    max_concurrency=settings.GENRE_ENRICHMENT_CONCURRENCY,
+    max_pending=settings.GENRE_ENRICHMENT_QUEUE_SIZE,
+    name="genre-enrichment",
+)
+
+def _defer_genre(playlist_id: str, requested: Optional[bool]) -> bool:
+    """Whether a save can skip waiting for the genre (everything except smart_sort)."""
+    if playlist_id == "smart_sort":
+        return False
+    return settings.DEFER_GENRE_ENRICHMENT if requested is None else requested
+
+# Upper bound on how long a queued lookup is reported as pending
+GENRE_PENDING_TTL = 600
+
+def _cached_track_genre(track_id: str) -> Optional[str]:
+    """Genre already known for a Spotify track ID (no network calls)."""
+    return _genre_cache.get(f"id:{track_id}")
+
+async def _schedule_genre_enrichment(track_name: str, artist_name: str, track_id: str, artist_ids: list[str]) -> bool:
+    """Queue a background genre lookup. Runs on the event loop."""
+    pending_key = f"pending:{track_id}"
+    # Marker so GET /track_genre can report "pending" from any worker sharing the cache backend.
+    # Written before the lookup is queued, so its own delete can't land first.
+    await _genre_cache.aset(pending_key, True, ttl=GENRE_PENDING_TTL)
+    if not _genre_enrichment.submit(lambda: _enrich_genre(track_name, artist_name, track_id, artist_ids)):
+        await _genre_cache.adelete(pending_key)
+        return False
+    return True
+
+async def _enrich_genre(track_name: str, artist_name: str, track_id: str, artist_ids: list[str]) -> None:
+    try:
+        genre = await get_track_genre(track_name, artist_name, track_id, artist_ids)
+        logger.info("Genre (deferred) for %s: %s", track_id, genre)
+    finally:
+        await _genre_cache.adelete(f"pending:{track_id}")
+
+@app.get("/track_genre/{track_id}")
+async def track_genre(track_id: str) -> dict:
+    """Follow-up for saves made with deferred genre enrichment."""
+    # SPEED: async, so the poll reads the genre cache on the loop that _enrich_genre writes it from
+    genre = await _genre_cache.aget(f"id:{track_id}")
+    if genre is not None and genre != UNKNOWN_GENRE:
+        return {"track_id": track_id, "status": "ready", "genre": genre}
+    if await _genre_cache.aget(f"pending:{track_id}"):
+        return {"track_id": track_id, "status": "pending", "genre": None}
+    if genre == UNKNOWN_GENRE:
+        return {"track_id": track_id, "status": "ready", "genre": genre}
+    raise HTTPException(status_code=404, detail="No genre lookup known for this track.")
+
+def _gemini_url() -> str:
+    return f"{settings.GEMINI_API_URL.rstrip('/')}/models/gemini-1.5-flash:generateContent?key={settings.GEMINI_API_KEY}"
+
 def detect_genre_with_gemini(track_name: str, artist_name: str) -> str:
     """Detect music genre using Gemini AI."""
     try:
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={settings.GEMINI_API_KEY}"
+        url = _gemini_url()
         prompt = f"What is the primary music genre of the song '{track_name}' by '{artist_name}'? Return only ONE word (e.g., Techno, House, Pop, Rock, Ambient). Do not write sentences."
         
         payload = {
@@ -372,15 +1338,107 @@ def detect_genre_with_gemini(track_name: str, artist_name: str) -> str:
             }]
         }
         
-        response = requests.post(url, json=payload)
+        with STAGE_SECONDS.time(pipeline="gemini", stage="genre"):
+            response = requests.post(url, json=payload)
         response.raise_for_status()
         data = response.json()
         
-        vibe = data['candidates'][0]['content']['parts'][0]['text'].strip().replace(".", "")
-        return vibe
+        return _gemini_genre(data['candidates'][0]['content']['parts'][0]['text'])
     except Exception as e:
         logger.warning("Gemini Genre Error: %s", e)
-        return "Unknown"
+        return UNKNOWN_GENRE
+
+def detect_genres_with_gemini(songs: list[tuple[str, str]]) -> list[Optional[str]]:
+    """Classify several (track, artist) pairs in one Gemini request. None marks an entry to retry alone."""
+    url = _gemini_url()
+    listing = "\n".join(f"{n}. '{track}' by '{artist}'" for n, (track, artist) in enumerate(songs, 1))
+    prompt = (
+        f"For each numbered song below, give its primary music genre as ONE word (e.g., Techno, House, Pop, Rock, Ambient). "
+        f"Return only a JSON array of exactly {len(songs)} strings in the same order.\n{listing}"
+    )
+
+    payload = {
+        "contents": [{
+            "parts": [{"text": prompt}]
+        }],
+        "generationConfig": {"responseMimeType": "application/json"},
+    }
+
+    with STAGE_SECONDS.time(pipeline="gemini", stage="genre_batch"):
+        response = requests.post(url, json=payload)
+    response.raise_for_status()
+    data = response.json()
+
+    text = data['candidates'][0]['content']['parts'][0]['text'].strip()
+    genres = json.loads(text.removeprefix("```json").removeprefix("```").removesuffix("```"))
+    if not isinstance(genres, list) or len(genres) != len(songs):
+        raise ValueError(f"Gemini returned {genres!r} for {len(songs)} songs")
+    return [
+        _gemini_genre(genre) if isinstance(genre, str) and 0 < len(genre.strip()) <= 40 else None
+        for genre in genres
+    ]
+
+def _gemini_genre(answer: str) -> str:
+    """Gemini's one-word genre in the same vocabulary as Spotify artist tags ("Rap" -> "Hip-Hop"); unmapped words kept."""
+    word = answer.strip().replace(".", "")
+    return map_genre_tag(word) or word
+
+async def _gemini_genre_batch(songs: list[tuple[str, str]]) -> list[Optional[str]]:
+    return await asyncio.to_thread(detect_genres_with_gemini, songs)
+
+async def _gemini_genre_single(song: tuple[str, str]) -> str:
+    return await asyncio.to_thread(detect_genre_with_gemini, *song)
+
+# SPEED: genre lookups arriving within a few ms share one Gemini request (malformed entries retried alone)
+_genre_batcher = MicroBatcher(
+    _gemini_genre_batch,
+    _gemini_genre_single,
+    max_batch=settings.GENRE_BATCH_SIZE,
+    max_wait=settings.GENRE_BATCH_WAIT_MS / 1000,
+    name="gemini-genre",
+)
+
+# --- Per-user playlist index for smart_sort ("stash: <genre>" -> playlist ID, updated in place on create) ---
+_playlist_index_cache = make_cache(
+    _cache_backend,
+    maxsize=settings.PLAYLIST_INDEX_CACHE_SIZE,
+    ttl=settings.PLAYLIST_INDEX_TTL,
+    name="playlist-index",
+)
+# Striped locks: one user's concurrent smart sorts must not both create the same playlist
+_playlist_locks = [threading.Lock() for _ in range(64)]
+
+STASH_PLAYLIST_PREFIX = "stash: "
+
+def _load_playlist_index(user_sp: spotipy.Spotify, user_id: str) -> dict:
+    """Lowercased Stash playlist names -> IDs across every page of the user's own playlists."""
+    index = {}
+    page = user_sp.current_user_playlists(limit=50)
+    while page:
+        for p in page['items']:
+            if not p or not p['name'].lower().startswith(STASH_PLAYLIST_PREFIX):
+                continue
+            if (p.get('owner') or {}).get('id', user_id) != user_id:
+                continue  # Followed playlists can't be added to
+            index.setdefault(p['name'].lower(), p['id'])
+        page = user_sp.next(page) if page.get('next') else None
+    return index
+
+def resolve_stash_playlist(user_sp: spotipy.Spotify, user_id: str, playlist_name: str) -> tuple[str, bool]:
+    """ID of the user's playlist with this name, creating it if missing. Returns (playlist_id, created)."""
+    key = playlist_name.lower()
+    with _playlist_locks[hash(user_id) % len(_playlist_locks)]:
+        index = _playlist_index_cache.get(user_id)
+        if index is None:
+            index = _load_playlist_index(user_sp, user_id)
+            _playlist_index_cache.set(user_id, index)
+        if key in index:
+            return index[key], False
+
+        new_playlist = user_sp.user_playlist_create(user_id, playlist_name, public=False)
+        index[key] = new_playlist['id']
+        _playlist_index_cache.set(user_id, index)
+        return new_playlist['id'], True
 
 class AnalyzeVibeRequest(BaseModel):
     songs: list[str] # List of "Song - Artist" strings
@@ -393,7 +1451,7 @@ def analyze_vibe_summary(request: AnalyzeVibeRequest) -> dict:
         return {"vibe": "No music yet! Start stashing to find your vibe."}
     
     try:
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={settings.GEMINI_API_KEY}"
+        url = _gemini_url()
         song_list = ", ".join(request.songs[:20]) # Limit to last 20 to save tokens
         prompt = f"Here is a user's recently liked music: {song_list}. In one short, fun sentence (max 10 words), describe their current 'music vibe' or mood. Be creative like Spotify Wrapped. Example: 'Melancholic late-night techno drive by yourself.'"
         
@@ -403,7 +1461,8 @@ def analyze_vibe_summary(request: AnalyzeVibeRequest) -> dict:
             }]
         }
         
-        res = requests.post(url, json=payload)
+        with STAGE_SECONDS.time(pipeline="gemini", stage="vibe"):
+            res = requests.post(url, json=payload)
         res.raise_for_status()
         data = res.json()
         
@@ -418,10 +1477,11 @@ def analyze_vibe_summary(request: AnalyzeVibeRequest) -> dict:
 def save_track_to_spotify(request: SaveWebTrackRequest) -> dict:
     """Save track to Spotify library or playlist."""
     logger.debug("Saving Track: %s to Playlist: %s", request.track_id, request.playlist_id)
+    started = mark = time.perf_counter()
     
     try:
         # 1. Initialize User Context
-        user_sp = spotipy.Spotify(auth=request.token)
+        user_sp = _user_spotify(request.token)
         user_id = user_sp.current_user()['id']
         
         target_playlist_id = request.playlist_id
@@ -430,38 +1490,45 @@ def save_track_to_spotify(request: SaveWebTrackRequest) -> dict:
         track_info = user_sp.track(request.track_id)
         track_name = track_info['name']
         artist_name = track_info['artists'][0]['name']
+        mark = _stage_done("save_track", "spotify_lookup", mark)
 
         # 2. Detect Genre (Always run this now for Analytics)
-        genre = detect_genre_with_gemini(track_name, artist_name)
-        logger.info("Genre: %s", genre)
+        # SPEED: only smart_sort needs the genre before saving; other saves can enrich it in the background
+        if _defer_genre(request.playlist_id, request.defer_genre):
+            genre = _cached_track_genre(request.track_id)
+        else:
+            # Cached per track; sync endpoint runs in a worker thread, so hop onto the loop for the lookup
+            genre = anyio.from_thread.run(
+                get_track_genre, track_name, artist_name, request.track_id, track_artist_ids(track_info)
+            )
+        logger.info("Genre: %s", genre if genre is not None else "(deferred)")
+        mark = _stage_done("save_track", "genre", mark)
         
-        playlist_name = "Stash: " + genre
+        playlist_name = f"Stash: {genre}"
 
         # 3. Smart Sort Logic (Playlist overriding)
         if request.playlist_id == "smart_sort":
             logger.info("Smart Sort Engaged.")
             
-            # Find/Create Playlist
-            playlists = user_sp.current_user_playlists(limit=50)
-            existing_id = None
-            for p in playlists['items']:
-                if p['name'].lower() == playlist_name.lower():
-                    existing_id = p['id']
-                    break
-            
-            if existing_id:
-                target_playlist_id = existing_id
-                logger.info("Found existing playlist: %s", playlist_name)
-            else:
-                new_playlist = user_sp.user_playlist_create(user_id, playlist_name, public=False)
-                target_playlist_id = new_playlist['id']
+            # Find/Create Playlist (SPEED: per-user index, no playlist listing once it's warm)
+            target_playlist_id, created = resolve_stash_playlist(user_sp, user_id, playlist_name)
+            if created:
                 logger.info("Created new playlist: %s", playlist_name)
+            else:
+                logger.info("Found existing playlist: %s", playlist_name)
+            mark = _stage_done("save_track", "playlist", mark)
 
         # 4. Add Track to Target Playlist
         final_playlist_name = "Liked Songs"
         
         if target_playlist_id and target_playlist_id != '1':
-             user_sp.playlist_add_items(target_playlist_id, [f"spotify:track:{request.track_id}"])
+             try:
+                 user_sp.playlist_add_items(target_playlist_id, [f"spotify:track:{request.track_id}"])
+             except Exception:
+                 if request.playlist_id == "smart_sort":
+                     # The indexed playlist may be gone; rebuild the index on the next save
+                     _playlist_index_cache.delete(user_id)
+                 raise
              
              # If it was Smart Sort, we already have the name
              if request.playlist_id == "smart_sort":
@@ -478,18 +1545,176 @@ def save_track_to_spotify(request: SaveWebTrackRequest) -> dict:
         else:
              user_sp.current_user_saved_tracks_add([request.track_id])
              logger.info("Added to Liked Songs")
+        _stage_done("save_track", "add", mark)
 
+        genre_pending = False
+        if genre is None:
+            genre_pending = anyio.from_thread.run(
+                _schedule_genre_enrichment, track_name, artist_name, request.track_id, track_artist_ids(track_info)
+            )
+
+        _stage_done("save_track", "total", started)
         return {
             "success": True, 
             "playlist_id": target_playlist_id, 
             "playlist_name": final_playlist_name,
-            "genre": genre 
+            "genre": genre,
+            "genre_pending": genre_pending,  # poll GET /track_genre/{track_id}
         }
 
     except Exception as e:
         logger.error("Save Error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+# Spotify per-call limits
+TRACKS_PER_LOOKUP = 50
+ITEMS_PER_PLAYLIST_ADD = 100
+ITEMS_PER_LIBRARY_ADD = 50
+
+# Spotify track IDs are 22 base62 characters; one malformed ID makes Spotify reject its whole lookup
+_SPOTIFY_TRACK_ID = re.compile(r"^[0-9A-Za-z]{22}$")
+
+def _lookup_tracks(user_sp: spotipy.Spotify, track_ids: list[str]) -> list[Optional[dict]]:
+    """Track metadata for up to TRACKS_PER_LOOKUP IDs (None = not found). A rejected batch is retried per ID."""
+    try:
+        return user_sp.tracks(track_ids)['tracks']
+    except spotipy.SpotifyException as e:
+        if e.http_status != 400 or len(track_ids) == 1:
+            raise
+        logger.warning("Track lookup rejected (%s). Retrying %d IDs one by one", e, len(track_ids))
+    found = []
+    for track_id in track_ids:
+        try:
+            found.append(user_sp.track(track_id))
+        except spotipy.SpotifyException as e:
+            if e.http_status not in (400, 404):
+                raise
+            found.append(None)
+    return found
+
+async def _resolve_genres(tracks: list[dict]) -> list[str]:
+    """Genres for many tracks at once; artist lookups and Gemini calls batch across them."""
+    return await asyncio.gather(*(
+        get_track_genre(t['name'], t['artists'][0]['name'], t['id'], track_artist_ids(t)) for t in tracks
+    ))
+
+async def _schedule_genre_enrichments(tracks: list[dict]) -> list[bool]:
+    """Queue background genre lookups for several tracks. Runs on the event loop."""
+    return [
+        await _schedule_genre_enrichment(t['name'], t['artists'][0]['name'], t['id'], track_artist_ids(t)) for t in tracks
+    ]
+
+@app.post("/save_tracks")
+def save_tracks_to_spotify(request: SaveTracksRequest) -> dict:
+    """Save many tracks: batched metadata, bulk genres, one add call per playlist chunk."""
+    track_ids = list(dict.fromkeys(request.track_ids))
+    if not track_ids:
+        raise HTTPException(status_code=400, detail="No track IDs given.")
+    if len(track_ids) > settings.SAVE_TRACKS_MAX:
+        raise HTTPException(status_code=400, detail=f"Too many tracks ({len(track_ids)}). Max {settings.SAVE_TRACKS_MAX} per request.")
+    logger.debug("Saving %d tracks to Playlist: %s", len(track_ids), request.playlist_id)
+
+    smart_sort = request.playlist_id == "smart_sort"
+    results: dict[str, dict] = {}
+    valid_ids = []
+    for track_id in track_ids:
+        if _SPOTIFY_TRACK_ID.match(track_id):
+            valid_ids.append(track_id)
+        else:
+            results[track_id] = {"track_id": track_id, "success": False, "error": "Invalid Spotify track ID"}
+
+    try:
+        # 1. Initialize User Context + track metadata (50 per request)
+        user_sp = _user_spotify(request.token)
+        user_id = user_sp.current_user()['id']
+
+        tracks: dict[str, dict] = {}
+        for start in range(0, len(valid_ids), TRACKS_PER_LOOKUP):
+            chunk = valid_ids[start:start + TRACKS_PER_LOOKUP]
+            for track_id, track_info in zip(chunk, _lookup_tracks(user_sp, chunk)):
+                if track_info:
+                    tracks[track_id] = track_info
+                else:
+                    results[track_id] = {"track_id": track_id, "success": False, "error": "Track not found on Spotify"}
+
+        # 2. Genres in bulk (deferred for non-smart_sort saves when enabled)
+        if _defer_genre(request.playlist_id, request.defer_genre):
+            genres = {track_id: _cached_track_genre(track_id) for track_id in tracks}
+        else:
+            genres = dict(zip(tracks, anyio.from_thread.run(_resolve_genres, list(tracks.values()))))
+
+        # 3. Group tracks by destination playlist
+        groups: dict[str, list[str]] = {}
+        playlist_names: dict[str, str] = {}
+        for track_id in tracks:
+            if smart_sort:
+                playlist_name = f"Stash: {genres[track_id]}"
+                try:
+                    playlist_id, _ = resolve_stash_playlist(user_sp, user_id, playlist_name)
+                except Exception as e:
+                    results[track_id] = {"track_id": track_id, "success": False, "error": str(e)}
+                    continue
+                playlist_names[playlist_id] = playlist_name
+            else:
+                playlist_id = request.playlist_id if request.playlist_id not in ("", "1") else "1"
+            groups.setdefault(playlist_id, []).append(track_id)
+
+        for playlist_id in groups:
+            if playlist_id == "1":
+                playlist_names[playlist_id] = "Liked Songs"
+            elif playlist_id not in playlist_names:
+                try:
+                    playlist_names[playlist_id] = user_sp.playlist(playlist_id, fields="name")['name']
+                except Exception:
+                    playlist_names[playlist_id] = "Selected Playlist"
+    except Exception as e:
+        logger.error("Batch Save Error: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    # 4. Add in chunks (100 per playlist call, 50 per library call)
+    for playlist_id, group in groups.items():
+        liked = playlist_id == "1"
+        size = ITEMS_PER_LIBRARY_ADD if liked else ITEMS_PER_PLAYLIST_ADD
+        for start in range(0, len(group), size):
+            chunk = group[start:start + size]
+            try:
+                if liked:
+                    user_sp.current_user_saved_tracks_add(chunk)
+                else:
+                    user_sp.playlist_add_items(playlist_id, [f"spotify:track:{track_id}" for track_id in chunk])
+            except Exception as e:
+                logger.error("Batch Save Error (%s): %s", playlist_id, e)
+                if smart_sort and not liked:
+                    _playlist_index_cache.delete(user_id)
+                for track_id in chunk:
+                    results[track_id] = {"track_id": track_id, "success": False, "error": str(e)}
+                continue
+            for track_id in chunk:
+                results[track_id] = {
+                    "track_id": track_id,
+                    "success": True,
+                    "playlist_id": playlist_id,
+                    "playlist_name": playlist_names[playlist_id],
+                    "genre": genres[track_id],
+                    "genre_pending": False,
+                }
+        logger.info("Added %d tracks to %s (%s)", len(group), playlist_names[playlist_id], playlist_id)
+
+    # 5. Background genre lookups for saved tracks whose genre isn't known yet
+    pending = [track_id for track_id, r in results.items() if r["success"] and r["genre"] is None]
+    if pending:
+        scheduled = anyio.from_thread.run(_schedule_genre_enrichments, [tracks[t] for t in pending])
+        for track_id, queued in zip(pending, scheduled):
+            results[track_id]["genre_pending"] = queued
+
+    saved = sum(1 for r in results.values() if r["success"])
+    return {
+        "success": saved == len(track_ids),
+        "saved": saved,
+        "failed": len(track_ids) - saved,
+        "results": [results[track_id] for track_id in track_ids],
+    }
+
 @app.post("/remove_track")
 def remove_track_from_spotify(request: RemoveTrackRequest) -> dict:
     """Remove track from Spotify library and/or playlist."""
@@ -497,7 +1722,7 @@ def remove_track_from_spotify(request: RemoveTrackRequest) -> dict:
     
     try:
         # Initialize User Context
-        user_sp = spotipy.Spotify(auth=request.token)
+        user_sp = _user_spotify(request.token)
         
         # Always remove from Liked Songs
         try:
@@ -0,0 +1,140 @@
+"""
+Recognition job stores for Stash API.
+Backs the asynchronous job API (POST /recognize/jobs, GET /recognize/jobs/{id}):
+
+- MemoryJobStore: in-process (default, per worker)
+- SQLiteJobStore: on-disk file, so any worker on the host can answer a poll
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+from api.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED = (DONE, FAILED)
+
+
+class JobStore(ABC):
+    """Job records keyed by job ID. Records are plain JSON-serializable dicts."""
+
+    name = "jobs"
+
+    @abstractmethod
+    def create(self, job: dict) -> None:
+        """Store a new job record (must include "id")."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[dict]:
+        """Return the job record, or None if unknown/expired."""
+
+    @abstractmethod
+    def update(self, job_id: str, **fields: Any) -> None:
+        """Merge fields into a job record."""
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryJobStore(JobStore):
+    """In-process store; jobs expire `ttl` seconds after they were created."""
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600) -> None:
+        self._jobs = TTLCache(maxsize=maxsize, ttl=ttl, name="jobs")
+        self._lock = threading.Lock()
+
+    def create(self, job: dict) -> None:
+        with self._lock:
+            self._jobs.set(job["id"], dict(job))
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields, updated_at=time.time())
+
+
+class SQLiteJobStore(JobStore):
+    """On-disk store shared by every worker process on a host (WAL mode)."""
+
+    name = "sqlite"
+
+    # Purge expired jobs every N creates instead of on every write
+    PURGE_EVERY = 200
+
+    def __init__(self, path: str, ttl: float = 3600) -> None:
+        self.path = path
+        self.ttl = ttl
+        self._conn = sqlite3.connect(path, timeout=1.0, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._creates = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def create(self, job: dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, data, expires_at) VALUES (?, ?, ?)",
+                (job["id"], json.dumps(job), time.time() + self.ttl),
+            )
+            self._creates += 1
+            if self._creates % self.PURGE_EVERY == 0:
+                self._conn.execute("DELETE FROM jobs WHERE expires_at <= ?", (time.time(),))
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM jobs WHERE id = ? AND expires_at > ?", (job_id, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row:
+                    job = {**json.loads(row[0]), **fields, "updated_at": time.time()}
+                    self._conn.execute("UPDATE jobs SET data = ? WHERE id = ?", (json.dumps(job), job_id))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_job_store(kind: str, sqlite_path: str = "", ttl: float = 3600, maxsize: int = 10000) -> JobStore:
+    """Build the configured job store. Falls back to memory if SQLite can't be opened."""
+    kind = kind.lower()
+    if kind == "sqlite":
+        try:
+            return SQLiteJobStore(sqlite_path, ttl=ttl)
+        except Exception as e:
+            logger.error("Job store 'sqlite' unavailable (%s). Falling back to in-memory jobs.", e)
+    elif kind != "memory":
+        logger.warning("Unknown JOB_STORE '%s'. Using in-memory jobs.", kind)
+    return MemoryJobStore(maxsize=maxsize, ttl=ttl)
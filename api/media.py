@@ -0,0 +1,103 @@
+"""
+Media URL normalization for Stash API.
+Folds the different ways a reel/short can be shared into one stable media ID.
+"""
+
+import re
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# Query params added by share sheets / analytics that never change the media
+TRACKING_PARAMS = {
+    "igsh", "igshid", "si", "feature", "fbclid", "gclid", "utm_source", "utm_medium",
+    "utm_campaign", "utm_term", "utm_content", "_r", "_t", "is_from_webapp", "sender_device",
+}
+
+# instagram.com/reel/X, /reels/X, /p/X, /tv/X and /<username>/reel/X all point at shortcode X;
+# /reels/audio/<id> is an audio page listing many reels, not a reel
+_INSTAGRAM_PATH = re.compile(r"^/(?:[\w.]+/)?(?:reels?|p|tv)/(?!audio(?:/|$))([A-Za-z0-9_-]+)(?:/|$)")
+_YOUTUBE_PATH = re.compile(r"^/(?:shorts|embed|live|v)/([A-Za-z0-9_-]{11})")
+_YOUTUBE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+_TIKTOK_PATH = re.compile(r"/(?:video|photo|v)/(\d+)")
+
+
+def _host(netloc: str) -> str:
+    host = netloc.lower().rsplit("@", 1)[-1].split(":", 1)[0]
+    for prefix in ("www.", "m.", "mobile.", "music."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return host
+
+
+def media_platform(url: str) -> str:
+    """Platform name for a shared URL: 'instagram', 'youtube', 'tiktok' or 'other'.
+
+    A fixed set on purpose: it keys pooled YoutubeDL profiles, hedge stats and
+    metric labels, which must not grow with every host a client sends.
+    """
+    raw = url.strip()
+    host = _host(urlsplit(raw if "://" in raw else f"https://{raw}").netloc)
+    if host in ("instagram.com", "instagr.am"):
+        return "instagram"
+    if host in ("youtube.com", "youtube-nocookie.com", "youtu.be"):
+        return "youtube"
+    if host.endswith("tiktok.com"):
+        return "tiktok"
+    return "other"
+
+
+def canonical_media_id(url: str) -> str:
+    """Return a platform-scoped media ID (e.g. 'instagram:C0dE') for a shared URL.
+
+    Unknown hosts fall back to the URL with scheme, tracking params and
+    trailing slashes stripped, so identical links still share a key.
+    """
+    raw = url.strip()
+    if "://" not in raw:
+        raw = f"https://{raw}"
+    parts = urlsplit(raw)
+    host = _host(parts.netloc)
+    path = parts.path or "/"
+
+    media_id = _platform_media_id(host, path, parts.query)
+    if media_id:
+        return media_id
+
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query) if k.lower() not in TRACKING_PARAMS
+    ))
+    normalized = f"{host}{path.rstrip('/')}"
+    return f"url:{normalized}?{query}" if query else f"url:{normalized}"
+
+
+def _platform_media_id(host: str, path: str, query: str) -> Optional[str]:
+    if host in ("instagram.com", "instagr.am"):
+        match = _INSTAGRAM_PATH.match(path)
+        if match:
+            return f"instagram:{match.group(1)}"
+
+    elif host in ("youtube.com", "youtube-nocookie.com"):
+        video_id = dict(parse_qsl(query)).get("v", "")
+        if _YOUTUBE_ID.match(video_id):
+            return f"youtube:{video_id}"
+        match = _YOUTUBE_PATH.match(path)
+        if match:
+            return f"youtube:{match.group(1)}"
+
+    elif host == "youtu.be":
+        video_id = path.strip("/").split("/", 1)[0]
+        if _YOUTUBE_ID.match(video_id):
+            return f"youtube:{video_id}"
+
+    elif host.endswith("tiktok.com"):
+        match = _TIKTOK_PATH.search(path)
+        if match:
+            return f"tiktok:{match.group(1)}"
+        # vm.tiktok.com/<code> and tiktok.com/t/<code> short links can't be resolved offline
+        segments = [s for s in path.split("/") if s]
+        if host in ("vm.tiktok.com", "vt.tiktok.com") and segments:
+            return f"tiktok-short:{segments[0]}"
+        if len(segments) >= 2 and segments[0] == "t":
+            return f"tiktok-short:{segments[1]}"
+
+    return None
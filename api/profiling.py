@@ -0,0 +1,251 @@
+"""
+On-demand profiling of single requests for Stash API.
+A sampler thread records the stacks of one request's asyncio tasks and of the worker
+threads it hands work to, then writes them as folded stacks (flamegraph.pl / speedscope
+input) named after the request ID. Other requests' tasks and threads are not sampled.
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+# Session of the profiled request running in this context (None = not profiled)
+_session: ContextVar[Optional["ProfileSession"]] = ContextVar("stash_profile", default=None)
+
+_SAFE_ID = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+def _thread_stack(frame) -> List[str]:
+    """Root-first frame names of a thread's current stack."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+def _await_stack(coro) -> List[str]:
+    """Root-first frame names of a suspended coroutine, following its await chain."""
+    names = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        names.append(_frame_name(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return names
+
+
+class ProfileSession:
+    """Samples one request: its tasks while they run on the loop or wait, plus its worker threads."""
+
+    def __init__(self, profile_id: str, path: str, interval: float, root_task: "asyncio.Task", meta: Dict[str, Any]) -> None:
+        self.profile_id = profile_id
+        self.path = path
+        self.interval = interval
+        self.meta = meta
+        self.loop = root_task.get_loop()
+        self.loop_thread = threading.get_ident()
+        self.tasks: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet([root_task])
+        self.threads: Dict[int, List[Any]] = {}  # ident -> [thread name, refcount]
+        self.samples: Counter = Counter()
+        self.ticks = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._started = time.time()
+
+    def add_task(self, task: "asyncio.Task") -> None:
+        with self._lock:
+            self.tasks.add(task)
+
+    def add_thread(self) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            entry = self.threads.setdefault(ident, [threading.current_thread().name, 0])
+            entry[1] += 1
+
+    def remove_thread(self) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            entry = self.threads.get(ident)
+            if entry:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self.threads[ident]
+
+    def start(self) -> None:
+        threading.Thread(target=self._run, name=f"stash-profile-{self.profile_id}", daemon=True).start()
+
+    def stop(self) -> None:
+        """Stop sampling; the sampler thread writes the profile (the caller never blocks on it)."""
+        self.meta["duration_s"] = round(time.time() - self._started, 3)
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception as e:  # a racing frame/task must not kill the sampler
+                logger.debug("Profile sample skipped: %s", e)
+        try:
+            self._write()
+        except OSError as e:
+            logger.error("Could not write profile %s: %s", self.profile_id, e)
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+        with self._lock:
+            tasks = list(self.tasks)
+            threads = [(ident, name) for ident, (name, _) in self.threads.items()]
+        self.ticks += 1
+
+        running = asyncio.current_task(self.loop)
+        for task in tasks:
+            if task.done():
+                continue
+            if task is running:
+                frame = frames.get(self.loop_thread)
+                if frame is not None:
+                    self._record(["event-loop", *_thread_stack(frame)])
+            else:
+                # Suspended coroutine: where this task is awaiting (network, queue, lock...)
+                self._record(["awaiting", *_await_stack(task.get_coro())])
+
+        for ident, name in threads:
+            frame = frames.get(ident)
+            if frame is not None:
+                self._record([f"thread {name}", *_thread_stack(frame)])
+
+    def _record(self, stack: List[str]) -> None:
+        self.samples[";".join(stack)] += 1
+
+    def _write(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        meta = {
+            **self.meta,
+            "profile_id": self.profile_id,
+            "started_at": self._started,
+            "interval_ms": self.interval * 1000,
+            "ticks": self.ticks,
+            "samples": sum(self.samples.values()),
+        }
+        with open(os.path.splitext(self.path)[0] + ".json", "w") as f:
+            json.dump(meta, f, indent=2)
+        logger.info("Wrote profile %s (%d samples) to %s", self.profile_id, meta["samples"], self.path)
+
+
+class RequestProfiler:
+    """Opt-in per-request profiling: enabled by config, triggered by a secret header.
+
+    One profile runs at a time, so sampling overhead stays bounded; a second
+    request asking for a profile is served normally without one.
+    """
+
+    HEADER = "X-Stash-Profile"
+
+    def __init__(self, enabled: bool, token: str, directory: str, interval_ms: int = 5) -> None:
+        if enabled and not token:
+            logger.warning("PROFILING_ENABLED is set but PROFILING_TOKEN is empty. Profiling stays off.")
+        self.enabled = enabled and bool(token)
+        self.token = token
+        self.directory = directory
+        self.interval = max(1, interval_ms) / 1000
+        self._active = 0
+        self.profiles = 0
+        self.busy = 0
+
+    def install(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Route task creation through the profiler so a profiled request's child tasks are sampled too."""
+        if not self.enabled:
+            return
+        previous = loop.get_task_factory()
+
+        def task_factory(loop: asyncio.AbstractEventLoop, coro, **kwargs: Any) -> "asyncio.Task":
+            task = previous(loop, coro, **kwargs) if previous else asyncio.Task(coro, loop=loop, **kwargs)
+            context = kwargs.get("context")
+            session = context.get(_session) if context is not None else _session.get()
+            if session is not None:
+                session.add_task(task)
+            return task
+
+        loop.set_task_factory(task_factory)
+
+    def requested(self, headers: Mapping[str, str]) -> Optional[str]:
+        """Profile ID for this request if it asked for (and may have) a profile, else None."""
+        if not self.enabled:
+            return None
+        token = headers.get(self.HEADER)
+        if not token or not hmac.compare_digest(token.encode(), self.token.encode()):
+            return None
+        if self._active:
+            self.busy += 1
+            logger.warning("Profile requested while another is running. Serving unprofiled.")
+            return None
+        request_id = headers.get("X-Request-ID", "")
+        return request_id if _SAFE_ID.match(request_id) else uuid4().hex
+
+    @contextmanager
+    def profile(self, profile_id: str, **meta: Any) -> Iterator[str]:
+        """Sample the current task (and its children / worker threads) until the block exits."""
+        session = ProfileSession(
+            profile_id,
+            os.path.join(self.directory, f"{profile_id}.folded"),
+            self.interval,
+            asyncio.current_task(),
+            meta,
+        )
+        token = _session.set(session)
+        self._active += 1
+        self.profiles += 1
+        session.start()
+        try:
+            yield session.path
+        finally:
+            session.stop()
+            self._active -= 1
+            _session.reset(token)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "active": self._active,
+            "profiles": self.profiles,
+            "busy": self.busy,
+        }
+
+
+@contextmanager
+def profile_thread() -> Iterator[None]:
+    """Sample the calling worker thread for the profiled request bound to this context, if any."""
+    session = _session.get()
+    if session is None:
+        yield
+        return
+    session.add_thread()
+    try:
+        yield
+    finally:
+        session.remove_thread()
@@ -0,0 +1,70 @@
+"""
+Pipeline stage progress for Stash API.
+Recognition code calls `report(stage, status)`; subscribers (SSE clients) of the same
+media ID receive the events. Works from the event loop and from worker threads.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Reporter bound to the recognition running in this context (None = nobody listening)
+_reporter: contextvars.ContextVar[Optional[Callable[..., None]]] = contextvars.ContextVar("stash_progress", default=None)
+
+
+class ProgressHub:
+    """Fans stage events out to per-subscriber queues, keyed by media ID."""
+
+    def __init__(self) -> None:
+        self._subscribers: Dict[str, List["asyncio.Queue[dict]"]] = {}
+        self.events = 0
+
+    def subscribe(self, key: str) -> "asyncio.Queue[dict]":
+        queue: "asyncio.Queue[dict]" = asyncio.Queue()
+        self._subscribers.setdefault(key, []).append(queue)
+        return queue
+
+    def unsubscribe(self, key: str, queue: "asyncio.Queue[dict]") -> None:
+        queues = self._subscribers.get(key)
+        if queues and queue in queues:
+            queues.remove(queue)
+            if not queues:
+                del self._subscribers[key]
+
+    def emit(self, key: str, event: dict) -> None:
+        """Deliver an event. Must run on the event loop thread."""
+        for queue in self._subscribers.get(key, ()):
+            queue.put_nowait(event)
+        self.events += 1
+
+    def bind(self, key: str) -> contextvars.Token:
+        """Route `report()` calls in this context (and threads it propagates to) to `key`'s subscribers."""
+        loop = asyncio.get_running_loop()
+        loop_thread = threading.get_ident()
+
+        def reporter(stage: str, status: str, **data: Any) -> None:
+            if not self._subscribers.get(key):
+                return
+            event = {"stage": stage, "status": status, "at": time.monotonic(), **data}
+            if threading.get_ident() == loop_thread:
+                self.emit(key, event)
+            else:
+                loop.call_soon_threadsafe(self.emit, key, event)
+
+        return _reporter.set(reporter)
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self._subscribers),
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "events": self.events,
+        }
+
+
+def report(stage: str, status: str, **data: Any) -> None:
+    """Report a pipeline stage transition. No-op when no recognition is bound to this context."""
+    reporter = _reporter.get()
+    if reporter is not None:
+        reporter(stage, status, **data)
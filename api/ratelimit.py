@@ -0,0 +1,167 @@
+"""
+Sliding-window rate limiter for Stash API.
+Constant memory per key: each client keeps two counters (current and previous window)
+instead of a timestamp per request. Optionally shares counters through a cache backend.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from api.cache_backends import CacheBackend
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitDecision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: int  # seconds until a hit is allowed again (no hits left), else until the window rolls over
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(self.reset_after),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.reset_after)
+        return headers
+
+
+class SlidingWindowLimiter:
+    """Sliding-window counter: `limit` hits per `window` seconds per key.
+
+    The previous window's count is weighted by how much of it still overlaps
+    the sliding window, which approximates a true sliding log closely without
+    storing timestamps. Rejected hits are not charged.
+
+    With a `backend`, counters live in the shared store and are charged with its
+    atomic `incr`, so the limit holds across workers and instances. Async code
+    calls `ahit`, which keeps those round trips off the event loop.
+    """
+
+    def __init__(self, limit: int, window: float, backend: Optional[CacheBackend] = None, name: str = "ratelimit") -> None:
+        self.limit = limit
+        self.window = window
+        self.backend = backend
+        self.name = name
+        # key -> [window index, current count, previous count]
+        self._counters: Dict[str, List[int]] = {}
+        self.allowed = 0
+        self.rejected = 0
+        self.backend_errors = 0
+        self.swept = 0
+
+    def hit(self, key: str, now: Optional[float] = None) -> RateLimitDecision:
+        """Charge one hit for `key` if it is under the limit."""
+        now = time.time() if now is None else now
+        index = int(now // self.window)
+        elapsed = (now % self.window) / self.window
+
+        if self.backend is not None:
+            try:
+                current, previous = self._hit_shared(key, index, elapsed)
+            except Exception as e:
+                current, previous = self._shared_failed(key, index, elapsed, e)
+        else:
+            current, previous = self._hit_local(key, index, elapsed)
+        return self._decide(now, index, elapsed, current, previous)
+
+    async def ahit(self, key: str, now: Optional[float] = None) -> RateLimitDecision:
+        """`hit` for async callers: shared-backend round trips run in a thread, off the event loop."""
+        if self.backend is None:
+            return self.hit(key, now)
+        now = time.time() if now is None else now
+        index = int(now // self.window)
+        elapsed = (now % self.window) / self.window
+        try:
+            current, previous = await asyncio.to_thread(self._hit_shared, key, index, elapsed)
+        except Exception as e:
+            current, previous = self._shared_failed(key, index, elapsed, e)
+        return self._decide(now, index, elapsed, current, previous)
+
+    def _shared_failed(self, key: str, index: int, elapsed: float, error: Exception) -> tuple[int, int]:
+        # Fail open on the local counters rather than failing the request
+        self.backend_errors += 1
+        logger.warning("Shared rate limiter unavailable, using local counters: %s", error)
+        return self._hit_local(key, index, elapsed)
+
+    def _decide(self, now: float, index: int, elapsed: float, current: int, previous: int) -> RateLimitDecision:
+        estimate = previous * (1 - elapsed) + current
+        allowed = estimate <= self.limit
+        if allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        remaining = max(0, math.floor(self.limit - estimate))
+        if remaining:
+            reset_after = max(1, math.ceil((index + 1) * self.window - now))
+        else:
+            charged = current if allowed else current - 1
+            reset_after = max(1, math.floor(self._next_allowed(index, charged, previous) - now) + 1)
+        return RateLimitDecision(allowed, self.limit, remaining, reset_after)
+
+    def _next_allowed(self, index: int, current: int, previous: int) -> float:
+        """Earliest time one more hit fits, given the charged counts of this window and the previous one.
+
+        The previous window's weight fades out across this window, so that can be
+        well before or (if this window is full) after the window rolls over.
+        """
+        start = index * self.window
+        if current + 1 <= self.limit:
+            if previous <= 0:
+                return start
+            # previous * (1 - elapsed) + current + 1 <= limit
+            elapsed = max(0.0, 1 - (self.limit - current - 1) / previous)
+            if elapsed < 1:
+                return start + elapsed * self.window
+        # Next window: this one's count becomes the fading previous one
+        elapsed = max(0.0, 1 - (self.limit - 1) / current) if current > 0 else 0.0
+        return start + self.window + elapsed * self.window
+
+    def _hit_local(self, key: str, index: int, elapsed: float) -> tuple[int, int]:
+        counters = self._counters.get(key)
+        if counters is None or counters[0] < index - 1:
+            counters = self._counters[key] = [index, 0, 0]
+        elif counters[0] == index - 1:
+            counters[:] = [index, 0, counters[1]]
+
+        current, previous = counters[1] + 1, counters[2]
+        if previous * (1 - elapsed) + current <= self.limit:
+            counters[1] = current
+        return current, previous
+
+    def _hit_shared(self, key: str, index: int, elapsed: float) -> tuple[int, int]:
+        prefix = f"stash:{self.name}:{key}"
+        # Counters outlive their window by one more so the next window can weight them
+        current = self.backend.incr(f"{prefix}:{index}", 1, ttl=self.window * 2)
+        previous = int(self.backend.get(f"{prefix}:{index - 1}") or 0)
+        if previous * (1 - elapsed) + current > self.limit:
+            self.backend.incr(f"{prefix}:{index}", -1)
+        return current, previous
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop local keys whose counters no longer affect any decision."""
+        index = int((time.time() if now is None else now) // self.window)
+        idle = [key for key, counters in self._counters.items() if counters[0] < index - 1]
+        for key in idle:
+            del self._counters[key]
+        self.swept += len(idle)
+        return len(idle)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "mode": self.backend.name if self.backend is not None else "local",
+            "limit": self.limit,
+            "window": self.window,
+            "keys": len(self._counters),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "swept": self.swept,
+            "backend_errors": self.backend_errors,
+        }
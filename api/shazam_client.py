@@ -0,0 +1,38 @@
+"""
+Long-lived Shazam client for Stash API.
+shazamio's default HTTP client opens a new session (and TLS handshake) per request;
+this one routes every call through a shared keepalive session.
+"""
+
+from typing import Any, Dict, List, Optional, Union
+from urllib.parse import urlsplit, urlunsplit
+
+from shazamio import Shazam
+from shazamio.exceptions import BadMethod
+from shazamio.interfaces.client import HTTPClientInterface
+from shazamio.utils import validate_json
+
+from api.http import PooledSession
+
+
+class PooledShazamHTTPClient(HTTPClientInterface):
+    """shazamio HTTP client backed by a PooledSession. Retries are left to the caller."""
+
+    def __init__(self, session: PooledSession, base_url: Optional[str] = None) -> None:
+        self.session = session
+        # Replaces scheme://host of shazamio's hardcoded URLs (local stand-ins)
+        self.base_url = urlsplit(base_url) if base_url else None
+
+    async def request(self, method: str, url: str, *args, **kwargs) -> Union[List[Any], Dict[str, Any]]:
+        if method.upper() not in ("GET", "POST"):
+            raise BadMethod("Accept only GET/POST")
+        if self.base_url:
+            url = urlunsplit(urlsplit(url)._replace(scheme=self.base_url.scheme, netloc=self.base_url.netloc))
+        session = await self.session.get()
+        async with session.request(method.upper(), url, **kwargs) as resp:
+            return await validate_json(resp, *args)
+
+
+def create_shazam(session: PooledSession, base_url: Optional[str] = None) -> Shazam:
+    """Build the app-scoped Shazam client on top of a pooled session."""
+    return Shazam(http_client=PooledShazamHTTPClient(session, base_url))
@@ -0,0 +1,54 @@
+"""
+Single-flight request coalescing for Stash API.
+Concurrent callers asking for the same key share one in-flight execution.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Deduplicates concurrent async work by key.
+
+    The first caller for a key starts the work; everyone else arriving before
+    it finishes awaits the same future and receives the same result or error.
+    """
+
+    def __init__(self, name: str = "singleflight") -> None:
+        self.name = name
+        self._inflight: Dict[str, "asyncio.Future[Any]"] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        # Shield: one caller disconnecting must not cancel the work for the others
+        return await asyncio.shield(future)
+
+    def _forget(self, key: str, future: "asyncio.Future[Any]") -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every waiter went away
+        if not future.cancelled():
+            future.exception()
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
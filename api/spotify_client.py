@@ -0,0 +1,166 @@
+"""
+Async Spotify Web API client for Stash API (client-credentials flow).
+Keeps Spotify round trips off the event loop's critical path: requests go through a
+pooled aiohttp session and the app token is cached and refreshed ahead of expiry.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import aiohttp
+
+from api.http import PooledSession
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URL = "https://accounts.spotify.com/api/token"
+API_URL = "https://api.spotify.com/v1"
+
+# Statuses worth retrying (rate limit, transient upstream/proxy failures)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class SpotifyAPIError(Exception):
+    """Non-2xx response from the Spotify Web API."""
+
+    def __init__(self, status: int, message: str, retry_after: Optional[int] = None) -> None:
+        super().__init__(f"Spotify API error {status}: {message}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AsyncSpotifyClient:
+    """Read-only Spotify client using an app (client-credentials) token."""
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        session: PooledSession,
+        refresh_margin: float = 120,
+        api_url: str = API_URL,
+        token_url: str = TOKEN_URL,
+        status_retries: int = 3,
+        backoff_factor: float = 0.3,
+        max_retry_after: float = 10,
+    ) -> None:
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.session = session
+        self.refresh_margin = refresh_margin
+        self.api_url = api_url.rstrip("/")
+        self.token_url = token_url
+        # Same retry budget spotipy used before this client: 3 retries, 0.3s exponential backoff
+        self.status_retries = status_retries
+        self.backoff_factor = backoff_factor
+        # A longer Retry-After fails fast (with retry_after set) instead of holding the request
+        self.max_retry_after = max_retry_after
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self.token_refreshes = 0
+        self.retries = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.client_id and self.client_secret)
+
+    async def _access_token(self) -> str:
+        """Cached app token, refreshed `refresh_margin` seconds before it expires."""
+        if self._token and time.monotonic() < self._expires_at - self.refresh_margin:
+            return self._token
+
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            # Another coroutine may have refreshed while we waited for the lock
+            if self._token and time.monotonic() < self._expires_at - self.refresh_margin:
+                return self._token
+
+            session = await self.session.get()
+            async with session.post(
+                self.token_url,
+                data={"grant_type": "client_credentials"},
+                auth=aiohttp.BasicAuth(self.client_id, self.client_secret),
+            ) as resp:
+                payload = await _json_or_none(resp)
+                if resp.status != 200 or not isinstance(payload, dict):
+                    raise SpotifyAPIError(resp.status, f"credentials rejected: {payload}")
+
+            self._token = payload["access_token"]
+            self._expires_at = time.monotonic() + int(payload.get("expires_in", 3600))
+            self.token_refreshes += 1
+            logger.debug("Refreshed Spotify app token (expires in %ss)", payload.get("expires_in"))
+            return self._token
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """GET an API path. A 401 forces one token refresh and retry; 429 and 5xx responses are
+        retried up to `status_retries` times, waiting Retry-After or an exponential backoff."""
+        refreshed = False
+        retries = 0
+        while True:
+            token = await self._access_token()
+            session = await self.session.get()
+            async with session.get(
+                f"{self.api_url}/{path.lstrip('/')}",
+                params=params,
+                headers={"Authorization": f"Bearer {token}"},
+            ) as resp:
+                if resp.status == 401 and not refreshed:
+                    refreshed = True
+                    self._token = None
+                    continue
+                status = resp.status
+                payload = await _json_or_none(resp)
+                if status < 400:
+                    if payload is None:
+                        raise SpotifyAPIError(status, "response was not JSON")
+                    return payload
+                retry_after = resp.headers.get("Retry-After")
+                retry_after = int(retry_after) if retry_after and retry_after.isdigit() else None
+                message = payload.get("error", {}).get("message", "") if isinstance(payload, dict) else ""
+
+            delay = self._retry_delay(status, retry_after, retries)
+            if delay is None:
+                raise SpotifyAPIError(status, message, retry_after)
+            retries += 1
+            self.retries += 1
+            logger.warning("Spotify %s returned %d. Retry %d in %.1fs", path, status, retries, delay)
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, status: int, retry_after: Optional[int], retries: int) -> Optional[float]:
+        """Seconds to wait before retrying this response, or None to give up."""
+        if status not in RETRY_STATUSES or retries >= self.status_retries:
+            return None
+        if status == 429 and retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        return self.backoff_factor * (2 ** retries)
+
+    async def search(self, q: str, type: str = "track", limit: int = 10) -> Dict[str, Any]:
+        return await self.get("search", {"q": q, "type": type, "limit": limit})
+
+    async def track(self, track_id: str) -> Dict[str, Any]:
+        return await self.get(f"tracks/{track_id}")
+
+    async def tracks(self, track_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Fetch many tracks, 50 IDs per request (Spotify's limit). Unknown IDs come back as None."""
+        return await self._batched("tracks", "tracks", list(track_ids), 50)
+
+    async def artists(self, artist_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Fetch many artists, 50 IDs per request (Spotify's limit)."""
+        return await self._batched("artists", "artists", list(artist_ids), 50)
+
+    async def _batched(self, path: str, key: str, ids: List[str], size: int) -> List[Dict[str, Any]]:
+        chunks = [ids[i:i + size] for i in range(0, len(ids), size)]
+        pages = await asyncio.gather(*(self.get(path, {"ids": ",".join(chunk)}) for chunk in chunks))
+        return [item for page in pages for item in page.get(key, [])]
+
+
+async def _json_or_none(resp: aiohttp.ClientResponse) -> Any:
+    """Decoded JSON body, or None if it isn't JSON (e.g. an HTML error page from a proxy)."""
+    try:
+        return await resp.json(content_type=None)
+    except ValueError:
+        return None
@@ -0,0 +1,72 @@
+"""
+Background task queue for Stash API.
+Runs fire-and-forget work (e.g. genre enrichment) off the request path with bounded concurrency.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundQueue:
+    """Fire-and-forget coroutines with a concurrency cap and a bounded backlog.
+
+    `submit` must be called on the event loop thread. Work past `max_pending`
+    is dropped (and counted) rather than queued without bound.
+    """
+
+    def __init__(self, max_concurrency: int, max_pending: int, name: str = "background") -> None:
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.name = name
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def submit(self, fn: Callable[[], Awaitable[Any]]) -> bool:
+        """Schedule fn(). Returns False if the backlog is full."""
+        if len(self._tasks) >= self.max_pending:
+            self.dropped += 1
+            logger.warning("%s queue full (%d pending), dropping task", self.name, len(self._tasks))
+            return False
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        task = asyncio.ensure_future(self._run(fn))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _run(self, fn: Callable[[], Awaitable[Any]]) -> None:
+        async with self._semaphore:
+            self.running += 1
+            try:
+                await fn()
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.warning("%s task failed: %s", self.name, e)
+            finally:
+                self.running -= 1
+
+    async def close(self) -> None:
+        """Cancel outstanding work (on shutdown) and wait for its cleanup to run."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "max_concurrency": self.max_concurrency,
+            "pending": len(self._tasks),
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
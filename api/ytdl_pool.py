@@ -0,0 +1,147 @@
+"""
+Pool of pre-initialized yt_dlp.YoutubeDL instances for Stash API.
+Building a YoutubeDL registers every extractor and postprocessor; reusing warmed
+instances per option profile skips that setup on the request path.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Hashable, Iterator, List, Optional
+
+import yt_dlp
+
+logger = logging.getLogger(__name__)
+
+# yt_dlp extractor keys to instantiate up front, per platform
+WARM_EXTRACTORS = {
+    "instagram": "Instagram",
+    "youtube": "Youtube",
+    "tiktok": "TikTok",
+}
+
+
+class _PooledYoutubeDL:
+    """A YoutubeDL plus the per-request state its permanent hooks read from."""
+
+    def __init__(self, ydl: yt_dlp.YoutubeDL) -> None:
+        self.ydl = ydl
+        self.cancel: Optional[threading.Event] = None
+        ydl.add_progress_hook(self._check_cancelled)
+
+    def _check_cancelled(self, _progress: dict) -> None:
+        if self.cancel and self.cancel.is_set():
+            raise yt_dlp.utils.DownloadCancelled("Another download attempt already won")
+
+    def prepare(self, outtmpl: Optional[str], cookiefile: Optional[str], cancel: Optional[threading.Event]) -> None:
+        """Apply per-request values without rebuilding the instance."""
+        if outtmpl:
+            self.ydl.params['outtmpl']['default'] = outtmpl
+        # Never leak cookies set by a previous request (or a previous account) into this one
+        self.ydl.cookiejar.clear()
+        if cookiefile:
+            self.ydl.cookiejar.load(cookiefile, ignore_discard=True, ignore_expires=True)
+        self.cancel = cancel
+
+    def reset(self) -> None:
+        self.cancel = None
+        self.ydl.cookiejar.clear()
+
+
+class YoutubeDLPool:
+    """Thread-safe pool of warmed YoutubeDL instances keyed by option profile.
+
+    An instance is used by one thread at a time; `acquire` checks one out and
+    returns it on exit. Instances that raised something other than a normal
+    download error are dropped instead of being reused.
+    """
+
+    def __init__(self, max_idle_per_profile: int = 4) -> None:
+        self.max_idle_per_profile = max_idle_per_profile
+        self._idle: Dict[Hashable, List[_PooledYoutubeDL]] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def _create(self, profile: Hashable, build_opts: Callable[[], dict], platform: str) -> _PooledYoutubeDL:
+        ydl = yt_dlp.YoutubeDL(build_opts())
+        extractor = WARM_EXTRACTORS.get(platform)
+        if extractor:
+            try:
+                ydl.get_info_extractor(extractor)
+            except Exception as e:
+                logger.debug("Extractor warmup failed for %s: %s", extractor, e)
+        with self._lock:
+            self.created += 1
+        logger.debug("Created YoutubeDL for profile %s", profile)
+        return _PooledYoutubeDL(ydl)
+
+    @contextmanager
+    def acquire(
+        self,
+        profile: Hashable,
+        build_opts: Callable[[], dict],
+        platform: str = "",
+        outtmpl: Optional[str] = None,
+        cookiefile: Optional[str] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Iterator[yt_dlp.YoutubeDL]:
+        with self._lock:
+            idle = self._idle.get(profile)
+            pooled = idle.pop() if idle else None
+            if pooled:
+                self.reused += 1
+        if pooled is None:
+            pooled = self._create(profile, build_opts, platform)
+
+        reusable = True
+        try:
+            pooled.prepare(outtmpl, cookiefile, cancel)
+            yield pooled.ydl
+        except (yt_dlp.utils.DownloadError, yt_dlp.utils.DownloadCancelled):
+            raise
+        except BaseException:
+            reusable = False
+            raise
+        finally:
+            self._release(profile, pooled, reusable)
+
+    def _release(self, profile: Hashable, pooled: _PooledYoutubeDL, reusable: bool) -> None:
+        if reusable:
+            try:
+                pooled.reset()
+            except Exception:
+                reusable = False
+        with self._lock:
+            idle = self._idle.setdefault(profile, [])
+            if reusable and len(idle) < self.max_idle_per_profile:
+                idle.append(pooled)
+                return
+            self.discarded += 1
+        try:
+            pooled.ydl.close()
+        except Exception:
+            pass
+
+    def clear(self) -> None:
+        with self._lock:
+            pooled = [p for idle in self._idle.values() for p in idle]
+            self._idle.clear()
+        for p in pooled:
+            try:
+                p.ydl.close()
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            idle = sum(len(v) for v in self._idle.values())
+            profiles = len(self._idle)
+        return {
+            "profiles": profiles,
+            "idle": idle,
+            "created": self.created,
+            "reused": self.reused,
+            "discarded": self.discarded,
+        }
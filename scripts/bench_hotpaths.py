@@ -0,0 +1,288 @@
+"""
+Benchmark: CPU-only request-path hot spots, checked against stored baselines.
+
+Covers Spotify result matching (_best_spotify_match on full 50-item pages), the
+Spotify cache helpers on a 100k-entry cache (hit, miss, set with LRU eviction),
+the /recognize rate limiter with 100k client IPs (hit and idle sweep) and
+_load_numbered_cookies with many cookie accounts.
+
+Timings are also expressed relative to a fixed pure-Python calibration loop, so
+baselines recorded on one machine stay comparable on another. The run fails (exit
+code 1) if any benchmark's relative cost grows past --threshold.
+
+Usage: python scripts/bench_hotpaths.py [--update-baseline] [--threshold 0.25] [--only name,...]
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import string
+import sys
+import time
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Size the app's caches before api.config reads the environment
+CACHE_KEYS = 100_000
+os.environ["CACHE_BACKEND"] = "memory"
+os.environ["SPOTIFY_CACHE_SIZE"] = str(CACHE_KEYS)
+os.environ["SPOTIFY_CACHE_MAX_BYTES"] = str(1 << 30)
+
+import logging  # noqa: E402
+
+logging.disable(logging.CRITICAL)  # the helpers log cache hits at debug level
+
+from api import index  # noqa: E402
+from api.config import _load_numbered_cookies  # noqa: E402
+from api.ratelimit import SlidingWindowLimiter  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_hotpaths_baseline.json")
+
+# name -> setup() returning op(i); op is timed per call
+BENCHMARKS: Dict[str, Callable[[random.Random], Callable[[int], object]]] = {}
+
+
+def benchmark(fn: Callable[[random.Random], Callable[[int], object]]) -> Callable[[random.Random], Callable[[int], object]]:
+    BENCHMARKS[fn.__name__.removeprefix("bench_")] = fn
+    return fn
+
+
+def _words(rng: random.Random, n: int) -> str:
+    return " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(n))
+
+
+def _spotify_item(rng: random.Random, artist: str) -> dict:
+    return {
+        "name": _words(rng, 3).title(),
+        "artists": [{"name": artist}, {"name": _words(rng, 2).title()}],
+        "popularity": rng.randint(0, 100),
+        "album": {"images": [{"url": f"https://i.scdn.co/image/{rng.getrandbits(64):x}"}]},
+        "uri": f"spotify:track:{rng.getrandbits(80):x}",
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{rng.getrandbits(80):x}"},
+    }
+
+
+def _search_pages(rng: random.Random, count: int) -> List[tuple[list, str]]:
+    """Full (limit=50) result pages: a few exact artist hits, some covers/features, the rest noise."""
+    pages = []
+    for _ in range(count):
+        artist = _words(rng, 2).title()
+        items = []
+        for _ in range(50):
+            roll = rng.random()
+            if roll < 0.1:
+                name = artist
+            elif roll < 0.3:
+                name = f"{artist} feat. {_words(rng, 1).title()}"
+            else:
+                name = _words(rng, 2).title()
+            items.append(_spotify_item(rng, name))
+        pages.append((items, artist))
+    return pages
+
+
+@benchmark
+def bench_best_spotify_match(rng: random.Random) -> Callable[[int], object]:
+    pages = _search_pages(rng, 64)
+    return lambda i: index._best_spotify_match(*pages[i % len(pages)])
+
+
+@benchmark
+def bench_best_spotify_match_no_artist(rng: random.Random) -> Callable[[int], object]:
+    # No artist matches: every item is a candidate for the popularity sort
+    pages = [(items, "Nobody At All") for items, _ in _search_pages(rng, 64)]
+    return lambda i: index._best_spotify_match(*pages[i % len(pages)])
+
+
+def _cached_result(track: str, artist: str, i: int) -> dict:
+    return {
+        "success": True,
+        "track": track,
+        "artist": artist,
+        "album_art": f"https://i.scdn.co/image/{i:040x}",
+        "spotify_uri": f"spotify:track:{i:022x}",
+        "spotify_url": f"https://open.spotify.com/track/{i:022x}",
+        "preview_url": None,
+    }
+
+
+def _run(coro):
+    """Drive a coroutine that never suspends (the in-memory cache helpers) without an event loop."""
+    try:
+        coro.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("coroutine suspended")
+
+
+def _filled_spotify_cache(rng: random.Random) -> List[tuple[str, str]]:
+    index._spotify_cache.clear()
+    pairs = [(f"{_words(rng, 3).title()} {i}", _words(rng, 2).title()) for i in range(CACHE_KEYS)]
+    for i, (track, artist) in enumerate(pairs):
+        if i % 10:
+            _run(index._set_cached_spotify(track, artist, _cached_result(track, artist, i)))
+        else:
+            _run(index._set_cached_spotify(track, artist, {"success": False, "error": "Not found on Spotify"}))
+    return pairs
+
+
+@benchmark
+def bench_spotify_cache_hit(rng: random.Random) -> Callable[[int], object]:
+    pairs = _filled_spotify_cache(rng)
+    order = [pairs[rng.randrange(len(pairs))] for _ in range(4096)]
+    return lambda i: _run(index._get_cached_spotify(*order[i % len(order)]))
+
+
+@benchmark
+def bench_spotify_cache_miss(rng: random.Random) -> Callable[[int], object]:
+    _filled_spotify_cache(rng)
+    misses = [(f"Unknown Song {n}", "Unknown Artist") for n in range(4096)]
+    return lambda i: _run(index._get_cached_spotify(*misses[i % len(misses)]))
+
+
+@benchmark
+def bench_spotify_cache_set_evict(rng: random.Random) -> Callable[[int], object]:
+    # Cache is full, so every new key evicts the least recently used one
+    _filled_spotify_cache(rng)
+    return lambda i: _run(index._set_cached_spotify(f"New Song {i}", "New Artist", _cached_result(f"New Song {i}", "New Artist", i)))
+
+
+def _random_ips(rng: random.Random, count: int) -> List[str]:
+    return [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}" for _ in range(count)]
+
+
+@benchmark
+def bench_rate_limit_hit(rng: random.Random) -> Callable[[int], object]:
+    # Limit high enough that no client ever flips to rejected: every round times the same path
+    limiter = SlidingWindowLimiter(limit=10**9, window=86400, name="bench")
+    ips = _random_ips(rng, CACHE_KEYS)
+    now = time.time()
+    for ip in ips:
+        limiter.hit(ip, now)
+    # Returning clients spread across the whole 100k-key table
+    return lambda i: limiter.hit(ips[(i * 7919) % len(ips)], now)
+
+
+@benchmark
+def bench_rate_limit_sweep(rng: random.Random) -> Callable[[int], object]:
+    limiter = SlidingWindowLimiter(limit=10, window=60, name="bench")
+    ips = _random_ips(rng, CACHE_KEYS)
+    now = time.time()
+    for ip in ips:
+        limiter.hit(ip, now)
+
+    def op(i: int) -> object:
+        # Nothing is idle yet: measures the scan the periodic sweep pays on every tick
+        return limiter.sweep(now)
+
+    return op
+
+
+@benchmark
+def bench_load_numbered_cookies(rng: random.Random) -> Callable[[int], object]:
+    for n in range(1, 51):
+        os.environ[f"BENCH_COOKIES_{n}"] = "# Netscape HTTP Cookie File\n" + _words(rng, 400)
+    os.environ["BENCH_COOKIES"] = os.environ["BENCH_COOKIES_1"]  # duplicates are skipped
+    os.environ["BENCH_LEGACY_COOKIES"] = "# Netscape HTTP Cookie File\n" + _words(rng, 400)
+    return lambda i: _load_numbered_cookies("BENCH_COOKIES", ["BENCH_LEGACY_COOKIES"])
+
+
+def calibration_op(i: int) -> int:
+    """Fixed pure-Python work used to normalize timings across machines."""
+    total = 0
+    for n in range(200):
+        total += (n * i) % 7
+    return total
+
+
+def measure(op: Callable[[int], object], min_time: float, repeat: int) -> float:
+    """Fastest nanoseconds per call over `repeat` rounds of at least `min_time` seconds each."""
+    # Like timeit: a gen-2 collection over a 100k-entry cache would swamp the op being measured
+    gc.collect()
+    gc.disable()
+    try:
+        return _measure(op, min_time, repeat)
+    finally:
+        gc.enable()
+
+
+def _measure(op: Callable[[int], object], min_time: float, repeat: int) -> float:
+    number = 1
+    while True:
+        start = time.perf_counter_ns()
+        for i in range(number):
+            op(i)
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= min_time * 1e9:
+            break
+        number *= 2
+    rounds = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter_ns()
+        for i in range(number):
+            op(i)
+        rounds.append((time.perf_counter_ns() - start) / number)
+    return min(rounds)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--only", type=lambda v: v.split(","), help=f"comma-separated subset of {','.join(BENCHMARKS)}")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs. baseline (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="record this run as the new baseline")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per measurement round")
+    parser.add_argument("--repeat", type=int, default=5, help="measurement rounds per benchmark (fastest is kept, as timeit advises)")
+    args = parser.parse_args()
+
+    names = args.only or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    calibration_ns = measure(calibration_op, args.min_time, args.repeat)
+    results = {}
+    for name in names:
+        op = BENCHMARKS[name](random.Random(name))
+        op(0)  # warm up
+        ns = measure(op, args.min_time, args.repeat)
+        results[name] = {"ns_per_op": round(ns, 1), "relative": round(ns / calibration_ns, 4)}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("benchmarks", {})
+
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        change = result["relative"] / base["relative"] - 1
+        result["change_vs_baseline"] = round(change, 4)
+        if change > args.threshold:
+            regressions.append(name)
+
+    print(json.dumps({
+        "calibration_ns": round(calibration_ns, 1),
+        "threshold": args.threshold,
+        "benchmarks": results,
+        "regressions": regressions,
+    }, indent=2))
+
+    if args.update_baseline:
+        merged = {**baseline, **{name: {"relative": r["relative"], "ns_per_op": r["ns_per_op"]} for name, r in results.items()}}
+        with open(args.baseline, "w") as f:
+            json.dump({"calibration_ns": round(calibration_ns, 1), "benchmarks": merged}, f, indent=2, sort_keys=True)
+            f.write("\n")
+    elif regressions:
+        print(f"Regressed beyond {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
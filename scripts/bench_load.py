@@ -0,0 +1,486 @@
+"""
+Benchmark: hermetic end-to-end load test of the API against local stand-ins.
+
+Starts fake servers for the media host (reel page + audio stream), Shazam, Spotify
+(token, search, tracks, artists, playlists) and Gemini, each with injectable latency
+and errors, then runs the real app (uvicorn subprocess) pointed at them. Nothing
+leaves 127.0.0.1. /recognize, /save_track and /analyze_vibe are driven at increasing
+concurrency; p50/p95/p99 latency, throughput and the app's peak RSS are printed as
+JSON so runs can be diffed between commits.
+
+Usage: python scripts/bench_load.py [--concurrency 1,4,16] [--requests 50]
+           [--latency-ms shazam=150,spotify=30] [--error-rate shazam=0.05] [--output run.json]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from typing import Callable, Dict, List, Optional
+
+from aiohttp import ClientSession, ClientTimeout, web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = ("recognize", "save_track", "analyze_vibe")
+
+# Rough production latencies (ms) of each upstream; override with --latency-ms
+DEFAULT_LATENCY_MS = {"media": 80, "shazam": 300, "spotify": 40, "gemini": 400}
+
+CATALOGUE_SIZE = 50
+CLIP_SECONDS = 15
+
+
+def track_id(n: int) -> str:
+    return f"bench{n:017d}"  # 22 chars, base62 like a real Spotify ID
+
+
+def artist_id(n: int) -> str:
+    return f"artist{n:016d}"
+
+
+def catalogue_track(n: int) -> dict:
+    n %= CATALOGUE_SIZE
+    artist = {"id": artist_id(n % 10), "name": f"Bench Artist {n % 10}"}
+    return {
+        "id": track_id(n),
+        "name": f"Bench Track {n}",
+        "uri": f"spotify:track:{track_id(n)}",
+        "popularity": 50 + n % 50,
+        "artists": [artist],
+        "album": {"name": f"Bench Album {n}", "images": [{"url": f"https://img.invalid/{n}.jpg"}]},
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id(n)}"},
+        "preview_url": None,
+    }
+
+
+# --- Fake upstreams ---
+
+def parse_overrides(value: str, cast: Callable[[str], float]) -> Dict[str, float]:
+    """'shazam=150,spotify=30' -> {'shazam': 150.0, 'spotify': 30.0}"""
+    overrides = {}
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        name, _, number = part.partition("=")
+        if name not in DEFAULT_LATENCY_MS:
+            raise SystemExit(f"Unknown upstream '{name}' (expected one of {', '.join(DEFAULT_LATENCY_MS)})")
+        overrides[name] = cast(number)
+    return overrides
+
+
+def free_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    return sock
+
+
+class Upstream:
+    """One fake service: an aiohttp app whose every response is delayed and sometimes failed."""
+
+    def __init__(self, name: str, latency_ms: float, jitter: float, error_rate: float, rng: random.Random) -> None:
+        self.name = name
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rng = rng
+        self.app = web.Application(middlewares=[self._inject])
+        self.requests = 0
+        self.injected_errors = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    @web.middleware
+    async def _inject(self, request: web.Request, handler):
+        self.requests += 1
+        spread = self.latency_ms * self.jitter
+        delay = max(0.0, self.latency_ms + self.rng.uniform(-spread, spread)) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+        if self.rng.random() < self.error_rate:
+            self.injected_errors += 1
+            return web.json_response({"error": {"status": 503, "message": f"injected {self.name} error"}}, status=503)
+        return await handler(request)
+
+    async def start(self) -> str:
+        sock = free_socket()
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.SockSite(self._runner, sock).start()
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+    def stats(self) -> dict:
+        return {"latency_ms": self.latency_ms, "error_rate": self.error_rate,
+                "requests": self.requests, "injected_errors": self.injected_errors}
+
+
+def write_clip(path: str) -> None:
+    """A few seconds of 16 kHz mono tones, enough for ffmpeg and the Shazam signature code."""
+    rate = 16000
+    frames = bytearray()
+    for i in range(rate * CLIP_SECONDS):
+        freq = 220 * (1 + (i // (rate // 2)) % 8)
+        sample = int(8000 * math.sin(2 * math.pi * freq * i / rate))
+        frames += sample.to_bytes(2, "little", signed=True)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(bytes(frames))
+
+
+def media_routes(upstream: Upstream, clip_path: str) -> None:
+    async def reel_page(request: web.Request) -> web.Response:
+        n = request.match_info["n"]
+        html = (
+            f"<html><head><title>Reel {n}</title>"
+            f'<meta property="og:title" content="Reel {n}"></head>'
+            f'<body><audio controls><source src="/media/{n}.wav" type="audio/wav"></audio></body></html>'
+        )
+        return web.Response(text=html, content_type="text/html")
+
+    async def stream(request: web.Request) -> web.FileResponse:
+        return web.FileResponse(clip_path, headers={"Content-Type": "audio/wav"})
+
+    upstream.app.router.add_get("/reel/{n}", reel_page)
+    upstream.app.router.add_get("/media/{n}.wav", stream)
+
+
+def shazam_routes(upstream: Upstream) -> None:
+    served = 0
+
+    async def tag(request: web.Request) -> web.Response:
+        nonlocal served
+        await request.read()
+        track = catalogue_track(served)
+        served += 1
+        return web.json_response({
+            "matches": [{"id": str(served)}],
+            "track": {"key": str(served), "title": track["name"], "subtitle": track["artists"][0]["name"]},
+        })
+
+    upstream.app.router.add_post("/discovery/v5/{tail:.*}", tag)
+
+
+def spotify_routes(upstream: Upstream) -> None:
+    by_query = {f"{t['name']} {t['artists'][0]['name']}": t for t in map(catalogue_track, range(CATALOGUE_SIZE))}
+    playlists: Dict[str, List[dict]] = {}  # user -> playlists they own
+
+    def user_of(request: web.Request) -> str:
+        return "user-" + request.headers.get("Authorization", "").rsplit(" ", 1)[-1]
+
+    async def token(request: web.Request) -> web.Response:
+        await request.post()
+        return web.json_response({"access_token": "bench-app-token", "token_type": "Bearer", "expires_in": 3600})
+
+    async def search(request: web.Request) -> web.Response:
+        hit = by_query.get(request.query.get("q", ""))
+        decoy = catalogue_track(upstream.rng.randrange(CATALOGUE_SIZE))
+        return web.json_response({"tracks": {"items": [hit, decoy] if hit else []}})
+
+    async def track(request: web.Request) -> web.Response:
+        n = int(request.match_info["id"].removeprefix("bench"))
+        return web.json_response(catalogue_track(n))
+
+    async def artists(request: web.Request) -> web.Response:
+        ids = request.query.get("ids", "").split(",")
+        # Half the artists carry Spotify tags; the rest fall through to Gemini
+        return web.json_response({"artists": [
+            {"id": a, "name": a, "genres": ["melodic techno"] if int(a.removeprefix("artist")) % 2 else []} for a in ids
+        ]})
+
+    async def me(request: web.Request) -> web.Response:
+        return web.json_response({"id": user_of(request)})
+
+    async def my_playlists(request: web.Request) -> web.Response:
+        items = playlists.get(user_of(request), [])
+        return web.json_response({"items": items, "next": None, "total": len(items)})
+
+    async def create_playlist(request: web.Request) -> web.Response:
+        body = await request.json()
+        user = request.match_info["user"]
+        playlist = {"id": f"pl{len(playlists.get(user, []))}{abs(hash(user)) % 10**8}", "name": body["name"], "owner": {"id": user}}
+        playlists.setdefault(user, []).append(playlist)
+        return web.json_response(playlist, status=201)
+
+    async def playlist(request: web.Request) -> web.Response:
+        return web.json_response({"id": request.match_info["id"], "name": "Bench Playlist"})
+
+    async def add_items(request: web.Request) -> web.Response:
+        await request.read()
+        return web.json_response({"snapshot_id": "bench"}, status=201)
+
+    async def library(request: web.Request) -> web.Response:
+        return web.Response(status=200)
+
+    router = upstream.app.router
+    router.add_post("/api/token", token)
+    router.add_get("/v1/search", search)
+    router.add_get("/v1/tracks/{id}", track)
+    router.add_get("/v1/artists", artists)
+    router.add_get("/v1/me/", me)
+    router.add_get("/v1/me", me)
+    router.add_get("/v1/me/playlists", my_playlists)
+    router.add_post("/v1/users/{user}/playlists", create_playlist)
+    router.add_get("/v1/playlists/{id}", playlist)
+    router.add_post("/v1/playlists/{id}/tracks", add_items)
+    router.add_post("/v1/playlists/{id}/items", add_items)
+    router.add_put("/v1/me/tracks", library)
+    router.add_put("/v1/me/library", library)
+
+
+def gemini_routes(upstream: Upstream) -> None:
+    async def generate(request: web.Request) -> web.Response:
+        payload = await request.json()
+        prompt = payload["contents"][0]["parts"][0]["text"]
+        batch = re.search(r"exactly (\d+) strings", prompt)
+        if batch:
+            text = json.dumps(["Techno"] * int(batch.group(1)))
+        elif "genre" in prompt:
+            text = "Techno"
+        else:
+            text = "Benchmarking beats at full throttle."
+        return web.json_response({"candidates": [{"content": {"parts": [{"text": text}]}}]})
+
+    upstream.app.router.add_post("/v1beta/models/{model}", generate)
+
+
+# --- App under test ---
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    """Peak resident set size of a process (Linux /proc only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def start_app(urls: Dict[str, str], extra_env: Dict[str, str], show_logs: bool = False) -> tuple[subprocess.Popen, str]:
+    sock = free_socket()
+    port = sock.getsockname()[1]
+    sock.close()
+    env = {
+        **os.environ,
+        "SPOTIFY_CLIENT_ID": "bench",
+        "SPOTIFY_CLIENT_SECRET": "bench",
+        "GEMINI_API_KEY": "bench",
+        "SPOTIFY_API_URL": f"{urls['spotify']}/v1",
+        "SPOTIFY_TOKEN_URL": f"{urls['spotify']}/api/token",
+        "GEMINI_API_URL": f"{urls['gemini']}/v1beta",
+        "SHAZAM_API_URL": urls["shazam"],
+        "RATE_LIMIT_PER_DAY": str(10**9),
+        "YTDLP_COOKIES": "",
+        "YTDLP_COOKIES_INSTAGRAM": "",
+        "YTDLP_COOKIES_YOUTUBE": "",
+        "PYTHONPATH": ROOT,
+        **extra_env,
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.index:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=None if show_logs else subprocess.DEVNULL,
+    )
+    return proc, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(session: ClientSession, base: str, proc: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"App exited during startup (code {proc.returncode})")
+        try:
+            async with session.get(f"{base}/") as resp:
+                if resp.status == 200:
+                    return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise SystemExit("App did not become ready")
+
+
+# --- Load driver ---
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(endpoint: str, concurrency: int, elapsed: float, latencies: List[float], statuses: Dict[str, int]) -> dict:
+    ordered = sorted(latencies)
+    ms = lambda s: round(s * 1000, 2)  # noqa: E731
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "statuses": statuses,
+        "errors": sum(n for code, n in statuses.items() if not code.startswith("2")),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "p50": ms(percentile(ordered, 50)),
+            "p95": ms(percentile(ordered, 95)),
+            "p99": ms(percentile(ordered, 99)),
+            "mean": ms(sum(ordered) / len(ordered)),
+            "max": ms(ordered[-1]),
+        },
+    }
+
+
+def request_factory(endpoint: str, base: str, media_url: str, args: argparse.Namespace) -> Callable[[int], tuple[str, dict]]:
+    """seq -> (url, json body) for one request."""
+    if endpoint == "recognize":
+        # Unique reel per request: measures the cold path, not the recognition cache
+        run = f"{time.time_ns():x}"
+        return lambda seq: (f"{base}/recognize", {"url": f"{media_url}/reel/{run}{seq}"})
+    if endpoint == "save_track":
+        return lambda seq: (f"{base}/save_track", {
+            "token": f"u{seq % args.users}",
+            "track_id": track_id(seq % CATALOGUE_SIZE),
+            "playlist_id": args.playlist,
+        })
+    songs = [f"Bench Track {n} - Bench Artist {n % 10}" for n in range(20)]
+    return lambda seq: (f"{base}/analyze_vibe", {"songs": songs})
+
+
+async def run_level(
+    session: ClientSession, endpoint: str, make: Callable[[int], tuple[str, dict]], concurrency: int, first: int, total: int
+) -> dict:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    next_seq = iter(range(first, first + total))
+
+    async def worker() -> None:
+        for seq in next_seq:
+            url, body = make(seq)
+            start = time.perf_counter()
+            try:
+                async with session.post(url, json=body) as resp:
+                    await resp.read()
+                    code = str(resp.status)
+            except Exception as e:
+                code = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[code] = statuses.get(code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(endpoint, concurrency, time.perf_counter() - started, latencies, statuses)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+async def main_async(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    latency = {**DEFAULT_LATENCY_MS, **parse_overrides(args.latency_ms, float)}
+    error_rate = parse_overrides(args.error_rate, float)
+    upstreams = {name: Upstream(name, latency[name], args.jitter, error_rate.get(name, 0.0), rng) for name in DEFAULT_LATENCY_MS}
+
+    clip = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+    clip.close()
+    write_clip(clip.name)
+    media_routes(upstreams["media"], clip.name)
+    shazam_routes(upstreams["shazam"])
+    spotify_routes(upstreams["spotify"])
+    gemini_routes(upstreams["gemini"])
+
+    urls = {name: await upstream.start() for name, upstream in upstreams.items()}
+    app_env = dict(item.split("=", 1) for item in args.env)
+    proc, base = start_app(urls, app_env, show_logs=args.app_logs)
+    results = []
+    try:
+        timeout = ClientTimeout(total=args.timeout)
+        async with ClientSession(timeout=timeout) as session:
+            await wait_ready(session, base, proc)
+            startup_rss = peak_rss_mb(proc.pid)
+            for endpoint in args.endpoints:
+                make = request_factory(endpoint, base, urls["media"], args)
+                # Sequence numbers continue across levels, so later levels don't replay earlier reels
+                for level, concurrency in enumerate(args.concurrency):
+                    result = await run_level(session, endpoint, make, concurrency, level * args.requests, args.requests)
+                    result["peak_rss_mb"] = peak_rss_mb(proc.pid)
+                    results.append(result)
+                    print(f"{endpoint} c={concurrency}: p50={result['latency_ms']['p50']}ms "
+                          f"p99={result['latency_ms']['p99']}ms {result['throughput_rps']} req/s "
+                          f"errors={result['errors']}", file=sys.stderr)
+            peak_rss = peak_rss_mb(proc.pid)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        for upstream in upstreams.values():
+            await upstream.stop()
+        os.remove(clip.name)
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "requests_per_level": args.requests,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "playlist": args.playlist,
+            "seed": args.seed,
+            "app_env": app_env,
+        },
+        "upstreams": {name: upstream.stats() for name, upstream in upstreams.items()},
+        "startup_rss_mb": startup_rss,
+        "peak_rss_mb": peak_rss,
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--endpoints", type=lambda v: v.split(","), default=list(ENDPOINTS),
+                        help=f"comma-separated subset of {','.join(ENDPOINTS)}")
+    parser.add_argument("--concurrency", type=lambda v: [int(c) for c in v.split(",")], default=[1, 4, 16],
+                        help="comma-separated concurrency levels, run in order")
+    parser.add_argument("--requests", type=int, default=50, help="requests per endpoint per concurrency level")
+    parser.add_argument("--latency-ms", default="", help="per-upstream base latency, e.g. shazam=150,spotify=30")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency jitter as a fraction of the base latency")
+    parser.add_argument("--error-rate", default="", help="per-upstream injected 503 rate, e.g. shazam=0.05")
+    parser.add_argument("--users", type=int, default=10, help="distinct Spotify users for /save_track")
+    parser.add_argument("--playlist", default="smart_sort", help="playlist_id for /save_track ('1' = Liked Songs)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra app setting (repeatable)")
+    parser.add_argument("--app-logs", action="store_true", help="pass the app's stderr through")
+    parser.add_argument("--timeout", type=float, default=120, help="per-request client timeout (s)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    report = asyncio.run(main_async(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
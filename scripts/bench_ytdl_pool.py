@@ -0,0 +1,98 @@
+"""
+Benchmark: per-request yt_dlp setup cost, fresh YoutubeDL vs. the warmed pool.
+
+Runs offline (no downloads) — it measures only what happens before the first
+network request: building the YoutubeDL, instantiating the extractor and
+applying per-request outtmpl/cookies.
+
+Usage: python scripts/bench_ytdl_pool.py [iterations]
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yt_dlp  # noqa: E402
+
+from api.ytdl_pool import YoutubeDLPool  # noqa: E402
+
+COOKIES = "# Netscape HTTP Cookie File\n.instagram.com\tTRUE\t/\tTRUE\t2147483647\tsessionid\tbench\n"
+
+
+def base_opts() -> dict:
+    return {
+        'quiet': True,
+        'no_warnings': True,
+        'nocheckcertificate': True,
+        'format': 'worstaudio/worst',
+        'postprocessors': [{'key': 'FFmpegExtractAudio', 'preferredcodec': 'mp3', 'preferredquality': '64'}],
+    }
+
+
+def bench_fresh(iterations: int, cookie_file: str) -> list[float]:
+    timings = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        opts = base_opts()
+        opts['outtmpl'] = f"/tmp/bench_{i}"
+        opts['cookiefile'] = cookie_file
+        ydl = yt_dlp.YoutubeDL(opts)
+        ydl.get_info_extractor("Instagram")
+        _ = ydl.cookiejar
+        timings.append(time.perf_counter() - start)
+        ydl.params.pop('cookiefile')  # don't write the jar back on close
+        ydl.close()
+    return timings
+
+
+def bench_pool(iterations: int, cookie_file: str) -> list[float]:
+    pool = YoutubeDLPool(max_idle_per_profile=1)
+    profile = ("file", "instagram", True, True)
+    timings = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        with pool.acquire(profile, base_opts, "instagram", outtmpl=f"/tmp/bench_{i}", cookiefile=cookie_file) as ydl:
+            ydl.get_info_extractor("Instagram")
+            timings.append(time.perf_counter() - start)
+    pool.clear()
+    return timings
+
+
+def summarize(timings: list[float]) -> dict:
+    ordered = sorted(timings)
+    return {
+        "mean_ms": round(statistics.mean(timings) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1] * 1000, 3),
+        "first_ms": round(timings[0] * 1000, 3),
+    }
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write(COOKIES)
+        cookie_file = f.name
+    try:
+        # Warm imports/lazy extractor loading so neither side pays them
+        bench_fresh(2, cookie_file)
+        fresh = summarize(bench_fresh(iterations, cookie_file))
+        pooled = summarize(bench_pool(iterations, cookie_file))
+    finally:
+        os.remove(cookie_file)
+
+    print(json.dumps({
+        "iterations": iterations,
+        "fresh_youtubedl": fresh,
+        "pooled_youtubedl": pooled,
+        "speedup_p50": round(fresh["p50_ms"] / pooled["p50_ms"], 1) if pooled["p50_ms"] else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Stream selection hands ffmpeg every cookie the extractor's jar holds for the media URL."""
+
+import http.cookiejar
+
+from yt_dlp.cookies import YoutubeDLCookieJar
+
+from api.audio import StreamSource, select_stream
+
+
+def _cookie(name: str, value: str, domain: str) -> http.cookiejar.Cookie:
+    return http.cookiejar.Cookie(
+        0, name, value, None, False, domain, True, domain.startswith("."), "/", True,
+        True, None, False, None, None, {},
+    )
+
+
+def _jar(*cookies: http.cookiejar.Cookie) -> YoutubeDLCookieJar:
+    jar = YoutubeDLCookieJar()
+    for cookie in cookies:
+        jar.set_cookie(cookie)
+    return jar
+
+
+INFO = {
+    "url": "https://media.instagram.com/v/clip.mp4",
+    "protocol": "https",
+    "acodec": "aac",
+    "http_headers": {"User-Agent": "test"},
+    "cookies": "sessionid=abc; csrftoken=def; Domain=.instagram.com",  # what ffmpeg must NOT get
+}
+
+
+def test_every_cookie_for_the_media_url_gets_its_own_line():
+    jar = _jar(
+        _cookie("sessionid", "abc", ".instagram.com"),
+        _cookie("csrftoken", "def", ".instagram.com"),
+        _cookie("other", "x", ".example.com"),
+    )
+    url, headers, cookies = select_stream(INFO, jar)
+    assert (url, headers) == (INFO["url"], {"User-Agent": "test"})
+    lines = cookies.split("\r\n")
+    assert lines[-1] == ""
+    assert sorted(lines[:-1]) == [
+        "csrftoken=def; path=/; domain=.instagram.com;",
+        "sessionid=abc; path=/; domain=.instagram.com;",
+    ]
+
+
+def test_no_jar_or_no_matching_cookies_sends_none():
+    assert select_stream(INFO)[2] == ""
+    assert select_stream(INFO, _jar(_cookie("other", "x", ".example.com")))[2] == ""
+
+
+def test_unpipeable_formats_are_skipped():
+    info = {"requested_formats": [
+        {"url": "https://a/video", "acodec": "none", "protocol": "https"},
+        {"url": "https://a/dash", "acodec": "opus", "protocol": "http_dash_segments"},
+        {"url": "https://a/audio", "acodec": "opus", "protocol": "https"},
+    ]}
+    assert select_stream(info)[0] == "https://a/audio"
+    assert select_stream({"url": "https://a/dash", "protocol": "http_dash_segments"}) is None
+
+
+def test_stream_source_append_marks_short_reads_exhausted():
+    source = StreamSource("https://a/audio")
+    assert source.pending(5) == (0, 5)
+    assert source.append(b"\0" * 32000 * 5, 5)
+    assert source.pending(10) == (5.0, 5.0)
+    assert source.append(b"\0" * 32000, 5)  # media ended after 1 more second
+    assert source.exhausted and source.pending(15) is None
@@ -0,0 +1,115 @@
+"""MicroBatcher: when batches flush, and which items fall back to single calls."""
+
+import asyncio
+
+import pytest
+
+from api.batcher import MicroBatcher
+
+
+class Calls:
+    """batch_fn / item_fn stand-ins that record what they were asked for."""
+
+    def __init__(self, batch_results=None, batch_error=None, item_error=None) -> None:
+        self.batches = []
+        self.singles = []
+        self.batch_results = batch_results
+        self.batch_error = batch_error
+        self.item_error = item_error
+
+    async def batch(self, items):
+        self.batches.append(list(items))
+        if self.batch_error:
+            raise self.batch_error
+        if self.batch_results is not None:
+            return self.batch_results(items)
+        return [f"batch:{item}" for item in items]
+
+    async def single(self, item):
+        self.singles.append(item)
+        if self.item_error and item in self.item_error:
+            raise self.item_error[item]
+        return f"single:{item}"
+
+
+def test_flushes_as_soon_as_the_batch_is_full():
+    calls = Calls()
+    batcher = MicroBatcher(calls.batch, calls.single, max_batch=3, max_wait=10, name="test")
+
+    async def scenario():
+        started = asyncio.get_running_loop().time()
+        results = await asyncio.gather(*(batcher.submit(n) for n in range(6)))
+        return results, asyncio.get_running_loop().time() - started
+
+    results, took = asyncio.run(scenario())
+    assert calls.batches == [[0, 1, 2], [3, 4, 5]]
+    assert results == [f"batch:{n}" for n in range(6)]
+    assert took < 1  # full batches never wait for the 10s timer
+    assert batcher.stats() == {"name": "test", "pending": 0, "items": 6, "batches": 2, "fallbacks": 0, "avg_batch": 3.0}
+
+
+def test_flushes_a_partial_batch_after_max_wait():
+    calls = Calls()
+    batcher = MicroBatcher(calls.batch, calls.single, max_batch=50, max_wait=0.05, name="test")
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        first = asyncio.ensure_future(batcher.submit("a"))
+        await asyncio.sleep(0.02)
+        second = asyncio.ensure_future(batcher.submit("b"))  # joins the window opened by "a"
+        await asyncio.sleep(0.01)
+        assert not first.done() and calls.batches == []
+        results = await asyncio.gather(first, second)
+        return results, loop.time() - started
+
+    results, took = asyncio.run(scenario())
+    assert results == ["batch:a", "batch:b"]
+    assert calls.batches == [["a", "b"]]
+    assert 0.05 <= took < 0.5  # timed from the first item, not the last
+    assert calls.singles == []
+
+
+def test_none_results_fall_back_to_single_calls_for_those_items_only():
+    calls = Calls(batch_results=lambda items: [None if item % 2 else f"batch:{item}" for item in items])
+    batcher = MicroBatcher(calls.batch, calls.single, max_batch=4, max_wait=0.01, name="test")
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit(n) for n in range(4)))
+
+    assert asyncio.run(scenario()) == ["batch:0", "single:1", "batch:2", "single:3"]
+    assert calls.singles == [1, 3]
+    assert batcher.stats()["fallbacks"] == 2
+
+
+@pytest.mark.parametrize("calls", [
+    Calls(batch_error=RuntimeError("batch endpoint down")),
+    Calls(batch_results=lambda items: ["only one"]),  # wrong result count is treated as a failed batch
+], ids=["raises", "short"])
+def test_failed_batch_retries_every_item_singly(calls):
+    batcher = MicroBatcher(calls.batch, calls.single, max_batch=3, max_wait=0.01, name="test")
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit(n) for n in range(3)))
+
+    assert asyncio.run(scenario()) == ["single:0", "single:1", "single:2"]
+    assert sorted(calls.singles) == [0, 1, 2]
+
+
+def test_single_call_errors_reach_only_their_own_caller():
+    calls = Calls(batch_error=RuntimeError("batch endpoint down"), item_error={1: ValueError("bad item")})
+    batcher = MicroBatcher(calls.batch, calls.single, max_batch=3, max_wait=0.01, name="test")
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit(n) for n in range(3)), return_exceptions=True)
+
+    first, second, third = asyncio.run(scenario())
+    assert (first, third) == ("single:0", "single:2")
+    assert isinstance(second, ValueError)
+
+
+def test_max_batch_of_one_skips_batching():
+    calls = Calls()
+    batcher = MicroBatcher(calls.batch, calls.single, max_batch=1, name="test")
+    assert asyncio.run(batcher.submit("x")) == "single:x"
+    assert calls.batches == []
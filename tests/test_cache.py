@@ -0,0 +1,61 @@
+"""TTLCache / make_cache under concurrent access from several threads."""
+
+import threading
+
+from api.cache import TTLCache
+from api.cache_backends import MemoryBackend, make_cache
+
+
+def _hammer(cache, workers: int = 8, ops: int = 5000) -> list:
+    errors = []
+    start = threading.Barrier(workers)
+
+    def worker(n: int) -> None:
+        start.wait()
+        try:
+            for i in range(ops):
+                key = f"k{(i * 7 + n) % 300}"
+                cache.set(key, (n, i))
+                cache.get(key)
+                if i % 5 == 0:
+                    cache.delete(f"k{(i + n) % 300}")
+                if i % 11 == 0:
+                    cache.set_negative(f"neg{i % 50}", ())
+        except Exception as e:  # pragma: no cover - the failure being tested for
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
+
+
+def test_ttlcache_survives_concurrent_set_get_delete():
+    # Small maxsize + tiny negative TTL: constant eviction and expiry at the LRU end
+    cache = TTLCache(maxsize=64, ttl=60, negative_ttl=0.0001, max_bytes=64 * 1024)
+    assert _hammer(cache) == []
+    assert len(cache) <= 64
+    assert cache.bytes == sum(entry[2] for entry in cache._data.values())
+
+
+def test_ttlcache_incr_is_atomic_across_threads():
+    cache = TTLCache(maxsize=10, ttl=60)
+
+    def bump() -> None:
+        for _ in range(2000):
+            cache.incr("counter")
+
+    threads = [threading.Thread(target=bump) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.get("counter") == 16000
+
+
+def test_make_cache_memory_backend_is_thread_safe():
+    cache = make_cache(MemoryBackend(), name="test", maxsize=64, ttl=60, negative_ttl=0.0001)
+    assert _hammer(cache) == []
+    assert len(cache) <= 64
@@ -0,0 +1,186 @@
+"""RedisBackend against a minimal in-process stand-in for the redis client."""
+
+import asyncio
+import time
+
+import pytest
+import redis
+
+from api.cache_backends import BackendCache, MemoryBackend, RedisBackend, make_cache
+
+
+class FakeRedis:
+    """GET / SET (PX, NX) / DEL / INCRBY and pipelines, with a hand-driven clock in milliseconds."""
+
+    def __init__(self) -> None:
+        self.now_ms = 0
+        self.data = {}  # key -> (bytes value, expires_at_ms or None)
+        self.set_calls = []
+        self.closed = False
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= self.now_ms:
+            del self.data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        entry = self._live(key)
+        return entry[0] if entry else None
+
+    def set(self, key, value, px=None, nx=False):
+        self.set_calls.append((key, value, px, nx))
+        if nx and self._live(key):
+            return None
+        # redis-py sends str/int as bytes; GET returns bytes
+        self.data[key] = (str(value).encode(), self.now_ms + px if px else None)
+        return True
+
+    def delete(self, key):
+        return 1 if self.data.pop(key, None) else 0
+
+    def incrby(self, key, amount):
+        entry = self._live(key)
+        value = int(entry[0]) + amount if entry else amount
+        self.data[key] = (str(value).encode(), entry[1] if entry else None)
+        return value
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def close(self):
+        self.closed = True
+
+
+class FakePipeline:
+    def __init__(self, client: FakeRedis) -> None:
+        self.client = client
+        self.commands = []
+
+    def set(self, *args, **kwargs):
+        self.commands.append((self.client.set, args, kwargs))
+
+    def incrby(self, *args, **kwargs):
+        self.commands.append((self.client.incrby, args, kwargs))
+
+    def execute(self):
+        return [fn(*args, **kwargs) for fn, args, kwargs in self.commands]
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(redis.Redis, "from_url", classmethod(lambda cls, url, **kwargs: client))
+    return client
+
+
+def test_values_round_trip_as_json(fake):
+    backend = RedisBackend("redis://stand-in")
+    value = {"track": "Señorita", "artists": ("A", "B"), "popularity": 71, "preview_url": None}
+    backend.set("k", value, ttl=60)
+    assert fake.data["k"][0] == b'{"track":"Se\\u00f1orita","artists":["A","B"],"popularity":71,"preview_url":null}'
+    assert backend.get("k") == {**value, "artists": ["A", "B"]}  # tuples come back as lists
+    assert backend.get("missing") is None
+
+
+def test_ttl_is_sent_in_milliseconds_and_expires(fake):
+    backend = RedisBackend("redis://stand-in")
+    backend.set("k", "v", ttl=1.5)
+    backend.set("tiny", "v", ttl=0.0001)
+    assert [px for _, _, px, _ in fake.set_calls] == [1500, 1]  # never PX 0 (an error in Redis)
+    fake.now_ms = 1499
+    assert backend.get("k") == "v"
+    fake.now_ms = 1500
+    assert backend.get("k") is None
+
+
+def test_delete(fake):
+    backend = RedisBackend("redis://stand-in")
+    backend.set("k", [1, 2], ttl=60)
+    backend.delete("k")
+    backend.delete("never-set")
+    assert backend.get("k") is None
+
+
+def test_incr_creates_with_ttl_and_keeps_it(fake):
+    backend = RedisBackend("redis://stand-in")
+    assert backend.incr("hits", ttl=10) == 1
+    fake.now_ms = 5000
+    assert backend.incr("hits", 2, ttl=10) == 3  # second SET NX is a no-op: expiry stays at 10s
+    fake.now_ms = 10_000
+    assert backend.get("hits") is None
+    assert backend.incr("hits", ttl=10) == 1
+    backend.close()
+    assert fake.closed
+
+
+def test_make_cache_namespaces_keys_on_the_backend(fake):
+    cache = make_cache(RedisBackend("redis://stand-in"), name="spotify", maxsize=10, ttl=60, negative_ttl=5)
+    assert isinstance(cache, BackendCache)
+    cache.set("song|artist", {"success": True})
+    cache.set_negative("nope|nobody", {"success": False})
+    assert cache.get("song|artist") == {"success": True}
+    assert set(fake.data) == {"stash:spotify:song|artist", "stash:spotify:nope|nobody"}
+    assert fake.set_calls[-1][2] == 5000
+    assert cache.stats()["backend"] == "redis"
+
+
+def test_backend_errors_read_as_misses(fake, monkeypatch):
+    cache = make_cache(RedisBackend("redis://stand-in"), name="genre", maxsize=10, ttl=60)
+
+    def down(*args, **kwargs):
+        raise redis.ConnectionError("connection refused")
+
+    monkeypatch.setattr(fake, "get", down)
+    monkeypatch.setattr(fake, "set", down)
+    cache.set("k", "v")
+    assert cache.get("k") is None
+    assert cache.stats()["errors"] == 2
+
+
+def test_async_calls_leave_the_event_loop_free(fake, monkeypatch):
+    cache = make_cache(RedisBackend("redis://stand-in"), name="recognition", maxsize=10, ttl=60, negative_ttl=5)
+    get = fake.get
+
+    def slow_get(key):
+        time.sleep(0.2)  # a slow Redis round trip
+        return get(key)
+
+    monkeypatch.setattr(fake, "get", slow_get)
+
+    async def scenario():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        await cache.aset("reel", {"success": True})
+        await cache.aset_negative("gone", {"success": False})
+        value = await cache.aget("reel")
+        await cache.adelete("reel")
+        ticker.cancel()
+        return value, ticks, await cache.aget("reel")
+
+    value, ticks, deleted = asyncio.run(scenario())
+    assert value == {"success": True} and deleted is None
+    assert ticks >= 5  # the loop kept running while the read waited on Redis
+    assert fake.set_calls[-1][2] == 5000
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_memory_cache_async_calls_match_sync_ones():
+    cache = make_cache(MemoryBackend(), name="genre", maxsize=10, ttl=60, negative_ttl=5)
+
+    async def scenario():
+        await cache.aset("id:1", "Pop")
+        await cache.aset_negative("name:x", "Unknown")
+        await cache.adelete("name:x")
+        return await cache.aget("id:1"), await cache.aget("name:x")
+
+    assert asyncio.run(scenario()) == ("Pop", None)
+    assert cache.stats()["negative_sets"] == 1
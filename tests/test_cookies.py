@@ -0,0 +1,23 @@
+"""Hedging only races a cookie download when one would actually have cookies."""
+
+import pytest
+
+from api import index
+
+URLS = [
+    "https://www.instagram.com/reel/C0dE/",
+    "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+    "https://youtu.be/dQw4w9WgXcQ",
+    "https://www.tiktok.com/@someone/video/7234567890123456789",
+]
+
+
+@pytest.mark.parametrize("instagram, youtube", [([], []), (["ig"], []), ([], ["yt"]), (["ig"], ["yt"])])
+@pytest.mark.parametrize("url", URLS)
+def test_has_cookies_for_matches_cookie_selection(monkeypatch, url, instagram, youtube):
+    monkeypatch.setattr(index.settings, "YTDLP_COOKIES_INSTAGRAM", instagram)
+    monkeypatch.setattr(index.settings, "YTDLP_COOKIES_YOUTUBE", youtube)
+    selected = index._cookie_accounts(url)
+    assert index._has_cookies_for(url) == (selected is not None)
+    # YouTube and other platforms fall back to Instagram cookies
+    assert index._has_cookies_for(url) == bool(instagram or (youtube and "youtu" in url))
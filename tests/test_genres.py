@@ -0,0 +1,56 @@
+"""Gemini fallback genres: Stash vocabulary, and failures that don't stick to a track."""
+
+import asyncio
+
+import pytest
+
+from api import index
+from api.cache_backends import MemoryBackend, make_cache
+from api.genres import map_spotify_genres
+
+
+@pytest.mark.parametrize("answer, genre", [
+    ("Rap", "Hip-Hop"),
+    ("HipHop", "Hip-Hop"),
+    ("Hip-Hop.", "Hip-Hop"),
+    ("RnB", "R&B"),
+    ("Kpop\n", "K-Pop"),
+    ("Techno", "Techno"),
+    ("EDM", "Electronic"),
+    ("Shoegaze", "Shoegaze"),  # unmapped words are kept as Gemini wrote them
+])
+def test_gemini_genre_uses_stash_vocabulary(answer, genre):
+    assert index._gemini_genre(answer) == genre
+
+
+def test_gemini_and_spotify_agree():
+    assert index._gemini_genre("Rap") == map_spotify_genres([["hip hop", "rap"]])
+    assert index._gemini_genre("RnB") == map_spotify_genres([["contemporary r&b"]])
+
+
+def test_unknown_genre_is_not_pinned_to_the_track_id(monkeypatch):
+    cache = make_cache(MemoryBackend(), name="genre-test", maxsize=100, ttl=3600, negative_ttl=0.05)
+    monkeypatch.setattr(index, "_genre_cache", cache)
+    answers = [index.UNKNOWN_GENRE, "Pop"]
+    calls = []
+
+    async def no_artist_genres(artist_ids):
+        return None
+
+    async def gemini(song):
+        calls.append(song)
+        return answers[len(calls) - 1]
+
+    monkeypatch.setattr(index, "_genre_from_spotify_artists", no_artist_genres)
+    monkeypatch.setattr(index._genre_batcher, "submit", gemini)
+
+    async def scenario():
+        # Gemini fails once; the track is then saved by ID inside the short negative window
+        assert await index.get_track_genre("Song", "Artist") == index.UNKNOWN_GENRE
+        assert await index.get_track_genre("Song", "Artist", track_id="T1") == index.UNKNOWN_GENRE
+        await asyncio.sleep(0.1)  # negative TTL expires, Gemini has recovered
+        return await index.get_track_genre("Song", "Artist", track_id="T1")
+
+    assert asyncio.run(scenario()) == "Pop"
+    assert len(calls) == 2
+    assert cache.get("id:T1") == "Pop"
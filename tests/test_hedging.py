@@ -0,0 +1,73 @@
+"""Hedged downloads stay within the download bound and keep per-platform stats bounded."""
+
+import threading
+import time
+
+import pytest
+
+from api import index
+from api.hedging import COOKIELESS, COOKIES, HedgeStats
+
+
+class FakeFetch:
+    """Slow downloads that track how many run at once; cookieless ones fail on every other URL."""
+
+    def __init__(self) -> None:
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+        self.seconds = 0.15
+
+    def __call__(self, url, use_cookies=False, cancel=None):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            deadline = time.monotonic() + self.seconds
+            while time.monotonic() < deadline:
+                if cancel is not None and cancel.is_set():
+                    return None
+                time.sleep(0.005)
+            return None if not use_cookies and url.endswith(("1", "3", "5", "7", "9")) else f"{url}|{use_cookies}"
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+@pytest.fixture
+def fetch(monkeypatch):
+    fake = FakeFetch()
+    monkeypatch.setattr(index, "_fetch_audio", fake)
+    monkeypatch.setattr(index, "_fetch_slots", threading.BoundedSemaphore(3))
+    monkeypatch.setattr(index, "_hedge_stats", HedgeStats())
+    monkeypatch.setattr(index, "_has_cookies_for", lambda url: True)
+    monkeypatch.setattr(index.settings, "DOWNLOAD_HEDGE_ENABLED", True)
+    monkeypatch.setattr(index.settings, "DOWNLOAD_HEDGE_DELAY_MS", 10)
+    return fake
+
+
+def test_hedged_legs_never_exceed_download_slots(fetch):
+    results = {}
+
+    def download(n: int) -> None:
+        results[n] = index._download_audio(f"https://host-{n}.example.com/v/{n}")
+
+    threads = [threading.Thread(target=download, args=(n,)) for n in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # Losing legs wind down after their download returned; wait for them before checking
+    for _ in range(3):
+        index._fetch_slots.acquire(timeout=2)
+    assert fetch.peak <= 3
+    assert all(results[n] for n in range(12))  # odd URLs only work with cookies
+
+
+def test_hedge_stats_keyed_by_platform_not_host(fetch):
+    fetch.seconds = 0.001
+    for n in range(20):
+        index._download_audio(f"https://host-{n}.example.com/v/{n * 2}")
+    stats = index._hedge_stats.stats()
+    assert list(stats) == ["other"]
+    assert stats["other"][COOKIELESS] + stats["other"][COOKIES] == 20
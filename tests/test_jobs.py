@@ -0,0 +1,119 @@
+"""Recognition job stores (memory and SQLite), and jobs interrupted by shutdown."""
+
+import asyncio
+import time
+
+import pytest
+
+from api import index, jobs
+from api.tasks import BackgroundQueue
+
+
+def _stores(tmp_path, ttl: float = 60) -> dict:
+    return {
+        "memory": lambda: jobs.MemoryJobStore(ttl=ttl),
+        "sqlite": lambda: jobs.SQLiteJobStore(str(tmp_path / "jobs.db"), ttl=ttl),
+    }
+
+
+def _job(job_id: str = "j1") -> dict:
+    return {"id": job_id, "status": jobs.QUEUED, "url": "https://reel", "created_at": 1.0, "updated_at": 1.0}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = _stores(tmp_path)[request.param]()
+    yield store
+    store.close()
+
+
+def test_status_transitions_merge_fields(store):
+    store.create(_job())
+    assert store.get("j1")["status"] == jobs.QUEUED
+
+    store.update("j1", status=jobs.RUNNING)
+    running = store.get("j1")
+    assert running["status"] == jobs.RUNNING and running["updated_at"] > 1.0
+
+    store.update("j1", status=jobs.DONE, result={"success": True, "track": "Song"})
+    done = store.get("j1")
+    assert done["status"] in jobs.FINISHED
+    assert done["result"] == {"success": True, "track": "Song"}
+    assert (done["url"], done["created_at"]) == ("https://reel", 1.0)
+
+
+def test_get_returns_a_copy_and_unknown_jobs_are_ignored(store):
+    store.create(_job())
+    store.get("j1")["status"] = "tampered"
+    assert store.get("j1")["status"] == jobs.QUEUED
+    store.update("missing", status=jobs.DONE)
+    assert store.get("missing") is None
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_jobs_expire_after_ttl(kind, tmp_path):
+    store = _stores(tmp_path, ttl=0.05)[kind]()
+    store.create(_job())
+    store.update("j1", status=jobs.DONE)  # updates don't extend the lifetime
+    assert store.get("j1") is not None
+    time.sleep(0.1)
+    assert store.get("j1") is None
+    store.close()
+
+
+def test_sqlite_store_is_shared_by_workers_on_one_file(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    first, second = jobs.SQLiteJobStore(path), jobs.SQLiteJobStore(path)
+    first.create(_job())
+    second.update("j1", status=jobs.FAILED, status_code=422, error="Could not download audio.")
+    assert first.get("j1")["status_code"] == 422
+    first.close()
+    second.close()
+
+
+def test_sqlite_purges_expired_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs.SQLiteJobStore, "PURGE_EVERY", 3)
+    store = jobs.SQLiteJobStore(str(tmp_path / "jobs.db"), ttl=0.05)
+    store.create(_job("old"))
+    time.sleep(0.1)
+    store.create(_job("a"))
+    store.create(_job("b"))  # third create purges
+    assert [row[0] for row in store._conn.execute("SELECT id FROM jobs ORDER BY id")] == ["a", "b"]
+    store.close()
+
+
+def test_create_job_store_falls_back_to_memory(tmp_path):
+    assert isinstance(jobs.create_job_store("sqlite", sqlite_path=str(tmp_path / "missing" / "jobs.db")), jobs.MemoryJobStore)
+    assert isinstance(jobs.create_job_store("bogus"), jobs.MemoryJobStore)
+    assert isinstance(jobs.create_job_store("SQLite", sqlite_path=str(tmp_path / "jobs.db")), jobs.SQLiteJobStore)
+
+
+def test_shutdown_fails_running_and_queued_jobs(tmp_path, monkeypatch):
+    store = jobs.SQLiteJobStore(str(tmp_path / "jobs.db"))
+    queue = BackgroundQueue(max_concurrency=1, max_pending=10, name="test-jobs")
+    monkeypatch.setattr(index, "_job_store", store)
+    monkeypatch.setattr(index, "_job_queue", queue)
+    monkeypatch.setattr(index, "_job_done_events", {})
+
+    async def never_finishes(url, media_id):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(index, "recognize_url", never_finishes)
+
+    async def scenario():
+        for job_id in ("running", "queued"):
+            store.create(_job(job_id))
+            index._job_done_events[job_id] = asyncio.Event()
+            queue.submit(lambda job_id=job_id: index._run_recognition_job(job_id, "https://reel", job_id))
+        await asyncio.sleep(0.01)
+        assert store.get("running")["status"] == jobs.RUNNING
+        waiter = index._job_done_events["queued"]
+        await index._shutdown_jobs()
+        return waiter.is_set()
+
+    assert asyncio.run(scenario())  # a long-poll on the queued job wakes up
+    for job_id in ("running", "queued"):
+        job = store.get(job_id)
+        assert (job["status"], job["status_code"], job["error"]) == (jobs.FAILED, 503, index.JOB_INTERRUPTED_DETAIL)
+    assert index._job_done_events == {}
+    store.close()
@@ -0,0 +1,68 @@
+"""Shared reel/short URLs normalize to one media ID (the recognition cache key)."""
+
+import pytest
+
+from api.media import canonical_media_id, media_platform
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.instagram.com/reel/C0dE_x-1/",
+    "https://instagram.com/reels/C0dE_x-1",
+    "instagram.com/reel/C0dE_x-1/?igsh=abc123",
+    "https://www.instagram.com/p/C0dE_x-1/",
+    "https://www.instagram.com/tv/C0dE_x-1/",
+    "https://m.instagram.com/some.user_1/reel/C0dE_x-1/",
+    "https://instagr.am/reel/C0dE_x-1",
+])
+def test_instagram_shortcode(url):
+    assert canonical_media_id(url) == "instagram:C0dE_x-1"
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.instagram.com/reels/audio/1234567890/",
+    "https://www.instagram.com/reels/audio/",
+    "https://www.instagram.com/reels/",
+])
+def test_instagram_pages_that_are_not_reels(url):
+    media_id = canonical_media_id(url)
+    assert not media_id.startswith("instagram:")
+    assert media_id == canonical_media_id(url + "?igsh=x")
+
+
+def test_instagram_audio_pages_stay_distinct():
+    assert canonical_media_id("https://www.instagram.com/reels/audio/111/") != canonical_media_id("https://www.instagram.com/reels/audio/222/")
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ&si=share",
+    "https://youtu.be/dQw4w9WgXcQ?si=share",
+    "https://m.youtube.com/shorts/dQw4w9WgXcQ",
+    "https://music.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ",
+])
+def test_youtube_video_id(url):
+    assert canonical_media_id(url) == "youtube:dQw4w9WgXcQ"
+
+
+@pytest.mark.parametrize("url, media_id", [
+    ("https://www.tiktok.com/@someone/video/7234567890123456789?is_from_webapp=1", "tiktok:7234567890123456789"),
+    ("https://vm.tiktok.com/ZMabc123/", "tiktok-short:ZMabc123"),
+    ("https://www.tiktok.com/t/ZTabc123/", "tiktok-short:ZTabc123"),
+])
+def test_tiktok(url, media_id):
+    assert canonical_media_id(url) == media_id
+
+
+def test_unknown_host_strips_tracking_and_sorts_query():
+    assert canonical_media_id("https://Example.com/clip/?utm_source=x&b=2&a=1") == "url:example.com/clip?a=1&b=2"
+
+
+@pytest.mark.parametrize("url, platform", [
+    ("https://www.instagram.com/reel/X/", "instagram"),
+    ("youtu.be/dQw4w9WgXcQ", "youtube"),
+    ("https://vm.tiktok.com/ZMabc123/", "tiktok"),
+    ("https://example.com/a", "other"),
+    ("https://cdn-4711.example.net/a", "other"),
+])
+def test_media_platform(url, platform):
+    assert media_platform(url) == platform
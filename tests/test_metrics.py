@@ -0,0 +1,96 @@
+"""Metrics recorded in download worker processes and the in-flight request gauge."""
+
+import asyncio
+import pickle
+
+from api import index
+from api.hedging import COOKIELESS, COOKIES, HedgeStats
+from api.metrics import Counter, Registry
+
+
+def _registry() -> Registry:
+    registry = Registry()
+    registry.counter("fallbacks_total", "Fallbacks.", ["platform"])
+    registry.histogram("stage_seconds", "Stages.", ["stage"], buckets=(0.1, 1))
+    return registry
+
+
+def test_registry_drain_merges_into_parent():
+    parent, worker = _registry(), _registry()
+    counter, histogram = worker._metrics
+    counter.inc(platform="instagram")
+    counter.inc(platform="instagram")
+    histogram.observe(0.05, stage="download")
+    histogram.observe(0.5, stage="download")
+
+    # Crosses the process boundary as the job result
+    parent.merge(pickle.loads(pickle.dumps(worker.drain())))
+    parent.merge(worker.drain())  # Already drained: nothing is counted twice
+
+    rendered = parent.render()
+    assert 'fallbacks_total{platform="instagram"} 2' in rendered
+    assert 'stage_seconds_bucket{stage="download",le="0.1"} 1' in rendered
+    assert 'stage_seconds_bucket{stage="download",le="1"} 2' in rendered
+    assert 'stage_seconds_count{stage="download"} 2' in rendered
+    assert "fallbacks_total{" not in worker.render()
+
+
+def test_hedge_stats_drain_and_merge():
+    parent, worker = HedgeStats(min_samples=1), HedgeStats(min_samples=1)
+    worker.record("instagram", COOKIES)
+    worker.record("instagram", COOKIELESS)
+    parent.merge(worker.drain())
+    assert worker.drain() == []
+    assert parent.stats()["instagram"]["samples"] == 2
+    assert parent.stats()["instagram"][COOKIES] == 1
+
+
+def test_in_flight_counts_until_last_streamed_chunk():
+    seen = []
+
+    async def streaming_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"a", "more_body": True})
+        await send({"type": "http.response.body", "body": b"b", "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+        seen.append(("after body", index._in_flight_requests))
+
+    async def send(message):
+        seen.append((message.get("more_body", False), index._in_flight_requests))
+
+    async def main():
+        before = index._in_flight_requests
+        await index._InFlightMiddleware(streaming_app)({"type": "http"}, None, send)
+        return before
+
+    before = asyncio.run(main())
+    # Counted while every chunk is sent, released right after the final one
+    assert seen[:4] == [(False, before + 1), (True, before + 1), (True, before + 1), (False, before + 1)]
+    assert seen[4] == ("after body", before)
+    assert index._in_flight_requests == before
+
+
+def test_in_flight_released_when_app_raises():
+    async def failing_app(scope, receive, send):
+        raise RuntimeError("boom")
+
+    async def main():
+        before = index._in_flight_requests
+        try:
+            await index._InFlightMiddleware(failing_app)({"type": "http"}, None, None)
+        except RuntimeError:
+            pass
+        return before
+
+    assert asyncio.run(main()) == index._in_flight_requests
+
+
+def test_cookie_fallback_labels_do_not_grow_with_hosts(monkeypatch):
+    monkeypatch.setattr(index.settings, "DOWNLOAD_HEDGE_ENABLED", False)
+    monkeypatch.setattr(index, "_fetch_audio", lambda url, use_cookies=False, cancel=None: "clip.mp3" if use_cookies else None)
+    monkeypatch.setattr(index, "COOKIE_FALLBACKS", Counter("fallbacks_total", "Fallbacks.", ["platform", "mode"]))
+    monkeypatch.setattr(index, "_hedge_stats", HedgeStats())
+    for n in range(50):
+        index._download_audio(f"https://host-{n}.example.com/video/{n}")
+    index._download_audio("https://www.instagram.com/reel/C0dE/")
+    assert set(index.COOKIE_FALLBACKS._values) == {("other", "sequential"), ("instagram", "sequential")}
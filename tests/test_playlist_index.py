@@ -0,0 +1,89 @@
+"""resolve_stash_playlist from many threadpool threads, as save_track and /save_tracks call it."""
+
+import itertools
+import sys
+import threading
+
+import pytest
+
+from api import index
+from api.cache_backends import MemoryBackend, make_cache
+
+
+class FakeUserSpotify:
+    """Just the spotipy calls the playlist index makes, with one page of existing playlists per user."""
+
+    def __init__(self) -> None:
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.created = []
+
+    def current_user_playlists(self, limit: int = 50) -> dict:
+        return {"items": [{"name": "Stash: Pop", "id": "pop", "owner": {}}], "next": None}
+
+    def next(self, page: dict) -> None:
+        return None
+
+    def user_playlist_create(self, user_id: str, name: str, public: bool = False) -> dict:
+        with self._lock:
+            self.created.append((user_id, name))
+            return {"id": f"created-{next(self._ids)}"}
+
+
+@pytest.fixture
+def small_index_cache(monkeypatch):
+    # Far fewer slots than users, so lookups race with LRU eviction
+    cache = make_cache(MemoryBackend(), maxsize=8, ttl=600, name="playlist-index-test")
+    monkeypatch.setattr(index, "_playlist_index_cache", cache)
+    # Switch threads as often as possible so unlocked check-then-act sequences interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield cache
+    sys.setswitchinterval(interval)
+
+
+def test_resolve_stash_playlist_from_many_threads(small_index_cache):
+    user_sp = FakeUserSpotify()
+    errors = []
+    start = threading.Barrier(8)
+
+    def worker(n: int) -> None:
+        start.wait()
+        try:
+            for i in range(2000):
+                user_id = f"user{(i + n) % 40}"
+                playlist_id, created = index.resolve_stash_playlist(user_sp, user_id, "Stash: Pop")
+                assert (playlist_id, created) == ("pop", False)
+                if i % 3 == 0:
+                    # What save_track / /save_tracks do when a cached playlist turns out to be gone
+                    small_index_cache.delete(f"user{(i * 7 + n) % 40}")
+        except Exception as e:  # pragma: no cover - the failure being tested for
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert user_sp.created == []
+    assert len(small_index_cache) <= 8
+
+
+def test_concurrent_resolves_create_a_playlist_once(small_index_cache):
+    user_sp = FakeUserSpotify()
+    results = []
+    start = threading.Barrier(8)
+
+    def worker() -> None:
+        start.wait()
+        results.append(index.resolve_stash_playlist(user_sp, "user1", "Stash: Jazz"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert user_sp.created == [("user1", "Stash: Jazz")]
+    assert {playlist_id for playlist_id, _ in results} == {"created-0"}
+    assert sum(created for _, created in results) == 1
@@ -0,0 +1,154 @@
+"""SlidingWindowLimiter decisions and the Retry-After it tells clients to honor."""
+
+import asyncio
+import random
+import threading
+import time
+
+import pytest
+
+from api.cache_backends import MemoryBackend
+from api.ratelimit import SlidingWindowLimiter
+
+
+def _limiters(limit: int, window: float) -> list:
+    return [
+        SlidingWindowLimiter(limit, window, name="local"),
+        SlidingWindowLimiter(limit, window, backend=MemoryBackend(), name="shared"),
+    ]
+
+
+@pytest.mark.parametrize("limiter", _limiters(10, 100), ids=["local", "shared"])
+def test_retry_after_accounts_for_fading_previous_window(limiter):
+    for n in range(10):
+        assert limiter.hit("ip", 950 + n).allowed
+    rejected = limiter.hit("ip", 1001.1)
+    assert not rejected.allowed
+    # The previous window's 10 hits fade until 1010, not until this window ends at 1100
+    assert rejected.headers()["Retry-After"] == "9"
+    assert rejected.headers()["X-RateLimit-Reset"] == "9"
+    assert not limiter.hit("ip", 1001.1 + 8).allowed
+    assert limiter.hit("ip", 1001.1 + 9).allowed
+
+
+@pytest.mark.parametrize("limiter", _limiters(3, 60), ids=["local", "shared"])
+def test_retry_after_spans_into_next_window_when_this_one_is_full(limiter):
+    for n in range(3):
+        assert limiter.hit("ip", 10 + n).allowed
+    last = limiter.hit("ip", 13)
+    assert not last.allowed
+    # 3 hits in [0, 60): one more fits once they weigh <= 2, a third of the way into [60, 120) at t=80
+    assert last.reset_after == 68
+    assert limiter.hit("ip", 13 + last.reset_after).allowed
+
+
+@pytest.mark.parametrize("limit, window", [(1, 10), (3, 60), (10, 100), (50, 86400)])
+def test_client_retrying_after_retry_after_is_allowed(limit, window):
+    rng = random.Random(f"{limit}/{window}")
+    for limiter in _limiters(limit, window):
+        now = rng.uniform(0, window * 3)
+        for _ in range(300):
+            decision = limiter.hit("ip", now)
+            if decision.remaining == 0:
+                wait = int(decision.headers()["X-RateLimit-Reset"])
+                if not decision.allowed:
+                    assert decision.headers()["Retry-After"] == str(wait)
+                # Obeying the header works, and it isn't more than a second longer than needed
+                assert not _fits(limiter, now + wait - 1.01) or wait == 1
+                now += wait
+                assert limiter.hit("ip", now).allowed
+            now += rng.choice([0, 0, rng.uniform(0, window / limit), rng.uniform(0, window)])
+
+
+def _fits(limiter: SlidingWindowLimiter, at: float) -> bool:
+    """Whether a hit at `at` would be allowed, without charging it."""
+    index = int(at // limiter.window)
+    elapsed = (at % limiter.window) / limiter.window
+    counters = limiter._counters.get("ip")
+    if limiter.backend is not None:
+        prefix = f"stash:{limiter.name}:ip"
+        current = int(limiter.backend.get(f"{prefix}:{index}") or 0)
+        previous = int(limiter.backend.get(f"{prefix}:{index - 1}") or 0)
+    elif counters is None or counters[0] < index - 1:
+        current = previous = 0
+    elif counters[0] == index - 1:
+        current, previous = 0, counters[1]
+    else:
+        current, previous = counters[1], counters[2]
+    return previous * (1 - elapsed) + current + 1 <= limiter.limit
+
+
+def test_headers_while_hits_remain():
+    limiter = SlidingWindowLimiter(5, 60)
+    decision = limiter.hit("ip", 30)
+    assert decision.allowed and decision.remaining == 4
+    assert decision.headers() == {"X-RateLimit-Limit": "5", "X-RateLimit-Remaining": "4", "X-RateLimit-Reset": "30"}
+
+
+def test_rejected_hits_are_not_charged_and_sweep_drops_idle_keys():
+    limiter = SlidingWindowLimiter(2, 60)
+    assert [limiter.hit("ip", t).allowed for t in (1, 2, 3, 4)] == [True, True, False, False]
+    assert limiter._counters["ip"][1] == 2
+    assert limiter.sweep(100) == 0  # still weighs on the next window
+    assert limiter.sweep(200) == 1
+    assert limiter.stats()["rejected"] == 2
+
+
+class SlowBackend(MemoryBackend):
+    """Shared backend whose round trips block like a slow Redis, and that records the calling thread."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.threads = set()
+
+    def incr(self, key, amount=1, ttl=None):
+        self.threads.add(threading.get_ident())
+        time.sleep(0.05)
+        return super().incr(key, amount, ttl=ttl)
+
+
+def test_ahit_charges_the_shared_backend_off_the_event_loop():
+    backend = SlowBackend()
+    limiter = SlidingWindowLimiter(2, 60, backend=backend)
+
+    async def scenario():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        decisions = [await limiter.ahit("ip", 30 + n) for n in range(3)]
+        ticker.cancel()
+        return decisions, ticks
+
+    decisions, ticks = asyncio.run(scenario())
+    assert [d.allowed for d in decisions] == [True, True, False]
+    assert ticks >= 10  # ~0.2s of Redis waits never stalled the loop
+    assert threading.get_ident() not in backend.threads
+    assert decisions[2].headers() == limiter.hit("ip", 32).headers()  # same decision as the sync path
+
+
+def test_ahit_falls_back_to_local_counters_when_the_backend_fails(monkeypatch):
+    limiter = SlidingWindowLimiter(1, 60, backend=MemoryBackend())
+
+    def down(*args, **kwargs):
+        raise ConnectionError("connection refused")
+
+    monkeypatch.setattr(limiter.backend, "incr", down)
+    decisions = asyncio.run(_ahits(limiter, 2))
+    assert [d.allowed for d in decisions] == [True, False]
+    assert limiter.stats()["backend_errors"] == 2
+
+
+def test_ahit_without_a_backend_is_hit():
+    limiter = SlidingWindowLimiter(2, 60)
+    assert [d.allowed for d in asyncio.run(_ahits(limiter, 3))] == [True, True, False]
+    assert limiter._counters["ip"][1] == 2
+
+
+async def _ahits(limiter: SlidingWindowLimiter, count: int) -> list:
+    return [await limiter.ahit("ip", 30) for _ in range(count)]
@@ -0,0 +1,73 @@
+"""/save_tracks reports bad IDs per track instead of failing the 50-ID lookup they share."""
+
+import pytest
+import spotipy
+
+from api import index
+
+GOOD = [f"{n:022d}" for n in range(60)]
+
+
+class FakeUserSpotify:
+    """Like Spotify, rejects a whole /tracks lookup (400) if any ID in it is bad."""
+
+    def __init__(self, rejected: set) -> None:
+        self.rejected = rejected
+        self.saved = []
+        self.lookups = []
+
+    def current_user(self) -> dict:
+        return {"id": "user1"}
+
+    def tracks(self, track_ids: list) -> dict:
+        self.lookups.append(len(track_ids))
+        if self.rejected & set(track_ids):
+            raise spotipy.SpotifyException(400, -1, "invalid id")
+        return {"tracks": [{"id": t, "name": t, "artists": []} for t in track_ids]}
+
+    def track(self, track_id: str) -> dict:
+        self.lookups.append(1)
+        if track_id in self.rejected:
+            raise spotipy.SpotifyException(400, -1, "invalid id")
+        return {"id": track_id, "name": track_id, "artists": []}
+
+    def current_user_saved_tracks_add(self, track_ids: list) -> None:
+        self.saved.extend(track_ids)
+
+
+@pytest.fixture
+def user_sp(monkeypatch):
+    fake = FakeUserSpotify(rejected={GOOD[7]})
+    monkeypatch.setattr(index, "_user_spotify", lambda token: fake)
+    for track_id in GOOD:
+        index._genre_cache.set(f"id:{track_id}", "Pop")  # known genres: nothing left to enrich
+    return fake
+
+
+def _save(track_ids: list) -> dict:
+    return index.save_tracks_to_spotify(index.SaveTracksRequest(token="t", track_ids=track_ids, defer_genre=True))
+
+
+def test_malformed_ids_fail_alone(user_sp):
+    bad = ["not-a-track-id", "spotify:track:" + GOOD[0], GOOD[1] + "x"]
+    result = _save(GOOD[:3] + bad)
+    by_id = {r["track_id"]: r for r in result["results"]}
+    assert (result["saved"], result["failed"]) == (3, 3)
+    assert all(by_id[t]["error"] == "Invalid Spotify track ID" for t in bad)
+    assert user_sp.lookups == [3]  # malformed IDs never reach Spotify
+
+
+def test_rejected_lookup_is_retried_per_id(user_sp):
+    result = _save(GOOD)
+    by_id = {r["track_id"]: r for r in result["results"]}
+    assert (result["saved"], result["failed"]) == (59, 1)
+    assert by_id[GOOD[7]]["error"] == "Track not found on Spotify"
+    assert sorted(user_sp.saved) == sorted(t for t in GOOD if t != GOOD[7])
+    assert user_sp.lookups == [50] + [1] * 50 + [10]
+
+
+def test_batch_limit_comes_from_settings(user_sp, monkeypatch):
+    monkeypatch.setattr(index.settings, "SAVE_TRACKS_MAX", 2)
+    with pytest.raises(index.HTTPException) as e:
+        _save(GOOD[:3])
+    assert e.value.status_code == 400
@@ -0,0 +1,110 @@
+"""SingleFlight: one run per key for concurrent callers, shared errors, and callers going away."""
+
+import asyncio
+import gc
+
+import pytest
+
+from api.singleflight import SingleFlight
+
+
+class Work:
+    """A keyed job that counts its runs and finishes (or fails) when released."""
+
+    def __init__(self, error=None) -> None:
+        self.runs = 0
+        self.error = error
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.runs += 1
+        await self.release.wait()
+        if self.error:
+            raise self.error
+        return {"run": self.runs}
+
+
+def test_concurrent_callers_share_one_run_and_the_key_is_freed_after():
+    flights = SingleFlight(name="test")
+
+    async def scenario():
+        work = Work()
+        callers = [asyncio.ensure_future(flights.do("reel", work)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert len(flights) == 1
+        work.release.set()
+        results = await asyncio.gather(*callers)
+        assert len(flights) == 0
+
+        again = Work()
+        again.release.set()
+        return results, work.runs, await flights.do("reel", again), again.runs
+
+    results, runs, later, later_runs = asyncio.run(scenario())
+    assert runs == 1 and results == [{"run": 1}] * 5
+    assert all(result is results[0] for result in results)
+    assert later == {"run": 1} and later_runs == 1  # finished flights aren't cached
+    assert flights.stats() == {"name": "test", "in_flight": 0, "leaders": 2, "coalesced": 4}
+
+
+def test_an_error_reaches_every_waiter_and_is_not_cached():
+    flights = SingleFlight(name="test")
+
+    async def scenario():
+        work = Work(error=RuntimeError("shazam down"))
+        callers = [asyncio.ensure_future(flights.do("reel", work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        work.release.set()
+        outcomes = await asyncio.gather(*callers, return_exceptions=True)
+
+        retry = Work()
+        retry.release.set()
+        return outcomes, work.runs, await flights.do("reel", retry)
+
+    outcomes, runs, retried = asyncio.run(scenario())
+    assert runs == 1
+    assert all(isinstance(e, RuntimeError) and str(e) == "shazam down" for e in outcomes)
+    assert outcomes[0] is outcomes[1] is outcomes[2]
+    assert retried == {"run": 1}
+
+
+def test_cancelling_the_leader_leaves_the_run_to_the_other_waiters():
+    flights = SingleFlight(name="test")
+
+    async def scenario():
+        work = Work()
+        leader = asyncio.ensure_future(flights.do("reel", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.do("reel", work))
+        await asyncio.sleep(0)
+
+        leader.cancel()  # the leader's client disconnected
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert len(flights) == 1  # still running for the follower
+
+        work.release.set()
+        return await follower, work.runs
+
+    assert asyncio.run(scenario()) == ({"run": 1}, 1)
+
+
+def test_work_outlives_all_waiters_and_its_error_is_retrieved(caplog):
+    flights = SingleFlight(name="test")
+
+    async def scenario():
+        work = Work(error=RuntimeError("nobody is listening"))
+        waiters = [asyncio.ensure_future(flights.do("reel", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        work.release.set()
+        for _ in range(3):
+            await asyncio.sleep(0)
+        return work.runs
+
+    assert asyncio.run(scenario()) == 1
+    assert len(flights) == 0
+    gc.collect()
+    assert "exception was never retrieved" not in caplog.text
@@ -0,0 +1,88 @@
+"""AsyncSpotifyClient retry behavior against a local stand-in for the Spotify API."""
+
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from api.http import PooledSession
+from api.spotify_client import AsyncSpotifyClient, SpotifyAPIError
+
+
+def _run(responses: list, **client_kwargs) -> tuple[object, int, AsyncSpotifyClient]:
+    """GET tracks/x against a server replaying `responses` (status, body, headers). Returns (result or error, calls, client)."""
+    calls = 0
+
+    async def token(request: web.Request) -> web.Response:
+        return web.json_response({"access_token": "t", "expires_in": 3600})
+
+    async def api(request: web.Request) -> web.Response:
+        nonlocal calls
+        status, body, headers = responses[min(calls, len(responses) - 1)]
+        calls += 1
+        return web.Response(status=status, text=body, headers=headers, content_type="application/json")
+
+    async def main() -> tuple[object, AsyncSpotifyClient]:
+        app = web.Application()
+        app.router.add_post("/token", token)
+        app.router.add_get("/v1/tracks/x", api)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        session = PooledSession("spotify-test")
+        client = AsyncSpotifyClient(
+            "id", "secret", session, api_url=f"{base}/v1", token_url=f"{base}/token", backoff_factor=0.01, **client_kwargs,
+        )
+        try:
+            return await client.get("tracks/x"), client
+        except SpotifyAPIError as e:
+            return e, client
+        finally:
+            await session.close()
+            await runner.cleanup()
+
+    result, client = asyncio.run(main())
+    return result, calls, client
+
+
+OK = (200, '{"id": "x"}', {})
+
+
+def test_retries_5xx_then_succeeds():
+    result, calls, client = _run([(503, "", {}), (502, "<html>Bad Gateway</html>", {}), OK])
+    assert result == {"id": "x"}
+    assert calls == 3
+    assert client.retries == 2
+
+
+def test_honors_retry_after_on_429():
+    result, calls, _ = _run([(429, '{"error": {"message": "slow down"}}', {"Retry-After": "0"}), OK])
+    assert result == {"id": "x"}
+    assert calls == 2
+
+
+def test_long_retry_after_fails_fast_with_hint():
+    result, calls, _ = _run([(429, '{"error": {"message": "slow down"}}', {"Retry-After": "120"})])
+    assert isinstance(result, SpotifyAPIError)
+    assert (result.status, result.retry_after, calls) == (429, 120, 1)
+
+
+def test_gives_up_after_status_retries():
+    result, calls, _ = _run([(500, "", {})], status_retries=2)
+    assert isinstance(result, SpotifyAPIError)
+    assert (result.status, calls) == (500, 3)
+
+
+def test_client_errors_are_not_retried():
+    result, calls, _ = _run([(404, '{"error": {"message": "non existing id"}}', {})])
+    assert isinstance(result, SpotifyAPIError)
+    assert (result.status, calls) == (404, 1)
+    assert "non existing id" in str(result)
+
+
+@pytest.mark.parametrize("body", ["<html>oops</html>", ""])
+def test_non_json_success_body_raises_api_error(body):
+    result, _, _ = _run([(200, body, {})])
+    assert isinstance(result, SpotifyAPIError)